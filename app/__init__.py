@@ -1,24 +1,40 @@
 # app/__init__.py
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from config import Config
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy.exc import SQLAlchemyError, StatementError
+from config import config_by_name
+from app.routing import RoutingSession, replica_router
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
+    if config_class is None:
+        config_class = config_by_name[os.environ.get('APP_ENV') or 'default']
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Behind a reverse proxy, take the client address and scheme from its X-Forwarded-*
+    # headers, so per-IP rate limits see clients rather than the proxy
+    proxy_hops = app.config['TRUSTED_PROXY_HOPS']
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     CORS(app)
+    replica_router.init_app(app)
+    
+    from app.services.pool_monitor import pool_monitor
+    pool_monitor.init_app(app)
     
     # Register blueprints
     from app.api.auth import bp as auth_bp
@@ -36,8 +52,78 @@ def create_app(config_class=Config):
     from app.api.search import bp as search_bp
     app.register_blueprint(search_bp, url_prefix='/api/search')
     
+    # Initialize services (process-local caches and background workers)
+    from app.services.password_hasher import password_hasher
+    password_hasher.init_app(app)
+    
+    from app.services.user_cache import user_cache
+    user_cache.init_app(app)
+    
+    from app.services.token_revocations import token_revocations
+    token_revocations.init_app(app)
+    
+    from app.services.rate_limiter import rate_limiter
+    rate_limiter.init_app(app)
+    
+    from app.services.user_batch import user_batch
+    user_batch.init_app(app)
+    
+    from app.services.compression import response_compressor
+    response_compressor.init_app(app)
+    
+    from app.services.sqlite_writer import sqlite_writer
+    sqlite_writer.init_app(app)
+    
+    from app.services.amenity_catalog import amenity_catalog
+    amenity_catalog.init_app(app)
+    
+    from app.services.view_counter import view_counter
+    view_counter.init_app(app)
+    
+    from app.services.listing_purger import listing_purger
+    listing_purger.init_app(app)
+    
+    from app.services.change_feed import listing_change_feed
+    listing_change_feed.init_app(app)
+    
+    from app.services.leaderboard import leaderboard
+    leaderboard.init_app(app)
+    
+    from app.services.jobs import job_queue
+    job_queue.init_app(app)
+    
+    from app.query_plans import check_query_plans_command
+    app.cli.add_command(check_query_plans_command)
+    
+    from app.compact_keys import compact_keys_command
+    app.cli.add_command(compact_keys_command)
+    
+    from app.models.types import InvalidIdError
+    
+    @app.errorhandler(StatementError)
+    def invalid_id(e):
+        # Ids are bound as GUIDs, which reject anything that is not a UUID;
+        # no row can have such an id, so the lookup is a plain miss
+        if isinstance(e.orig, InvalidIdError):
+            return {"error": "Not found"}, 404
+        raise e
+    
     @app.route('/api/health')
     def health_check():
         return {"status": "healthy"}
     
+    @app.route('/api/health/compression')
+    def compression_stats():
+        # Per-worker totals: bytes saved against CPU spent, by endpoint
+        return {"endpoints": response_compressor.stats()}
+    
+    @app.route('/api/health/ready')
+    def readiness_check():
+        # Load balancers route traffic only once the database answers
+        try:
+            pool_monitor.ping()
+        except SQLAlchemyError as e:
+            return {"status": "unavailable", "details": str(e), "pools": pool_monitor.status()}, 503
+        return {"status": "ready", "pools": pool_monitor.status()}
+    
     return app
\ No newline at end of file
@@ -1,14 +1,35 @@
 # app/api/auth/routes.py
-from flask import request, jsonify
+from flask import current_app, request, jsonify
 from app import db, jwt
 from app.api.auth import bp
 from app.models.user import User
+from app.services.user_cache import user_cache
+from app.services.token_revocations import token_revocations
+from app.services.sqlite_writer import sqlite_writer
 from flask_jwt_extended import (
     create_access_token, create_refresh_token, jwt_required,
-    get_jwt_identity, get_jwt
+    get_jwt_identity, get_jwt, current_user
 )
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timezone
 
+@jwt.user_lookup_loader
+def load_current_user(jwt_header, jwt_data):
+    # Resolved once per request; `current_user` is a cached, read-only snapshot
+    return user_cache.get(jwt_data[current_app.config['JWT_IDENTITY_CLAIM']])
+
+@jwt.user_lookup_error_loader
+def current_user_not_found(jwt_header, jwt_data):
+    return jsonify({'error': 'User not found'}), 404
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_data):
+    return token_revocations.is_revoked(jwt_data)
+
+@jwt.revoked_token_loader
+def revoked_token_response(jwt_header, jwt_data):
+    return jsonify({'error': 'Token has been revoked'}), 401
+
 @bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json() or {}
@@ -62,9 +83,14 @@ def login():
     if not user or not user.check_password(data['password']):
         return jsonify({'error': 'Invalid email or password'}), 401
     
+    # Upgrade hashes made with older parameters while we have the plaintext
+    if user.password_needs_rehash():
+        user.set_password(data['password'])
+        db.session.commit()
+    
     # Create access and refresh tokens
-    access_token = create_access_token(identity=user.id, additional_claims={'role': user.role})
-    refresh_token = create_refresh_token(identity=user.id)
+    access_token = create_access_token(identity=user.id, additional_claims=user.token_claims())
+    refresh_token = create_refresh_token(identity=user.id, additional_claims={'ver': user.token_version or 0})
     
     return jsonify({
         'access_token': access_token,
@@ -75,19 +101,42 @@ def login():
 @bp.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    access_token = create_access_token(identity=current_user_id, additional_claims={'role': user.role})
+    access_token = create_access_token(identity=current_user.id, additional_claims=current_user.token_claims())
     
     return jsonify({
         'access_token': access_token,
-        'user': user.to_dict()
+        'user': current_user.to_dict()
     }), 200
 
+@bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    # Revokes only the presented token; send the refresh token separately to revoke it too
+    try:
+        sqlite_writer.run(token_revocations.revoke_token, get_jwt())
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': 'Database error', 'details': str(e)}), 500
+    
+    return jsonify({'message': 'Token revoked successfully'}), 200
+
+@bp.route('/logout-all', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout_all():
+    try:
+        sqlite_writer.run(_revoke_all_tokens, get_jwt_identity())
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': 'Database error', 'details': str(e)}), 500
+    
+    return jsonify({'message': 'All tokens revoked successfully'}), 200
+
+def _revoke_all_tokens(user_id):
+    user = User.query.get(user_id)
+    user.bump_token_version()
+    token_revocations.revoke_user(user)
+    db.session.flush()
+
 @bp.route('/verify/<user_id>', methods=['GET'])
 def verify_user(user_id):
     # In a real application, this would likely involve email verification
@@ -3,4 +3,4 @@ from flask import Blueprint
 
 bp = Blueprint('listings', __name__)
 
-from app.api.listings import routes
\ No newline at end of file
+from app.api.listings import routes, jobs
\ No newline at end of file
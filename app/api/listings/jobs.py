@@ -0,0 +1,8 @@
+# app/api/listings/jobs.py
+from app.services.jobs import job_queue
+from app.services.listing_purger import listing_purger
+
+@job_queue.handler('listings.purge')
+def purge_listing(listing_id):
+    # Chunked deletes of a soft-deleted listing's rows; repeating it is harmless
+    listing_purger.purge(listing_id)
@@ -1,11 +1,24 @@
 # app/api/listings/routes.py
-from flask import request, jsonify
+from flask import request, jsonify, current_app, url_for
 from app import db
+from app.routing import replica_read
 from app.api.listings import bp
-from app.models.listing import Listing, ListingImage, Amenity
+from app.models.listing import (
+    Listing, ListingImage, Amenity, ListingStat, ListingChange, ListingRating, LandlordRollup,
+    listing_serializer
+)
 from app.models.user import User
+from app.models.review import encode_cursor
+from app.responses import wants_columnar, list_response, stream_page
+from app.services.amenity_catalog import amenity_catalog
+from app.services.view_counter import view_counter, hour_bucket
+from app.services.jobs import job_queue
+from app.services.change_feed import listing_change_feed
+from app.services.leaderboard import leaderboard
+from app.services.sqlite_writer import sqlite_writer
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta
 
 def check_landlord_role():
     claims = get_jwt()
@@ -17,6 +30,7 @@ def check_landlord_role():
 # def get_listings():
 
 @bp.route('/', methods=['GET', 'OPTIONS'])
+@replica_read
 def get_listings():
     if request.method == 'OPTIONS':
         response = jsonify({'message': 'Preflight check successful'})
@@ -27,47 +41,104 @@ def get_listings():
     page = request.args.get('page', 1, type=int)
     per_page = min(request.args.get('per_page', 10, type=int), 100)
     
-    query = Listing.query.filter_by(is_published=True)
+    query = Listing.active().filter_by(is_published=True)
     
     # Apply filters if provided
     city = request.args.get('city')
     if city:
         query = query.filter(Listing.city.ilike(f'%{city}%'))
-        
+    
     state = request.args.get('state')
     if state:
         query = query.filter(Listing.state.ilike(f'%{state}%'))
-        
+    
     min_price = request.args.get('min_price', type=float)
     if min_price is not None:
         query = query.filter(Listing.price >= min_price)
-        
+    
     max_price = request.args.get('max_price', type=float)
     if max_price is not None:
         query = query.filter(Listing.price <= max_price)
-        
+    
     bedrooms = request.args.get('bedrooms', type=int)
     if bedrooms is not None:
         query = query.filter(Listing.bedrooms >= bedrooms)
-        
+    
     bathrooms = request.args.get('bathrooms', type=float)
     if bathrooms is not None:
         query = query.filter(Listing.bathrooms >= bathrooms)
     
-    # Get paginated results
-    pagination = query.order_by(Listing.created_at.desc()).paginate(page=page, per_page=per_page)
-    
-    return jsonify({
-        'items': [item.to_dict() for item in pagination.items],
+    # Get paginated results as plain rows; relations are loaded for the whole page at once
+    query = query.with_entities(*listing_serializer.columns).order_by(Listing.created_at.desc())
+    columnar = wants_columnar()
+    
+    # Large pages are streamed batch by batch instead of being built in memory
+    if not columnar and per_page >= current_app.config['STREAM_JSON_MIN_PER_PAGE']:
+        return stream_page(query, page, per_page, Listing.page_dicts)
+    
+    pagination = query.paginate(page=page, per_page=per_page)
+    
+    if columnar:
+        columns, amenities = Listing.page_columnar(pagination.items)
+        return list_response({
+            'columns': columns,
+            'amenities': amenities,
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'page': page,
+            'per_page': per_page
+        }, columnar=True), 200
+    
+    return list_response({
+        'items': Listing.page_dicts(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'page': page,
         'per_page': per_page
     }), 200
 
+@bp.route('/top', methods=['GET'])
+def get_top_listings():
+    city = request.args.get('city') or None
+    bedrooms = request.args.get('bedrooms', type=int)
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    
+    response = jsonify({
+        'items': leaderboard.top(city=city, bedrooms=bedrooms, limit=limit),
+        'prior_mean': round(leaderboard.prior_mean, 4),
+        'prior_weight': current_app.config['LEADERBOARD_PRIOR_WEIGHT']
+    })
+    # Identical until rankings change, so clients can revalidate and the compressed body is reused
+    response.add_etag()
+    return response.make_conditional(request)
+
+@bp.route('/changes', methods=['GET'])
+def get_listing_changes():
+    token = request.args.get('since', type=int)
+    limit = min(request.args.get('limit', 100, type=int), 500)
+    
+    # Without a token, hand out the current one so clients can start syncing from here
+    if token is None:
+        return jsonify({
+            'changes': [],
+            'next_token': ListingChange.latest_token(),
+            'has_more': False
+        }), 200
+    
+    if listing_change_feed.token_expired(token):
+        return jsonify({'error': 'Change token expired, full resync required', 'resync': True}), 410
+    
+    changes, next_token, has_more = listing_change_feed.changes(token, limit)
+    
+    return jsonify({
+        'changes': changes,
+        'next_token': next_token,
+        'has_more': has_more
+    }), 200
+
 @bp.route('/<listing_id>', methods=['GET'])
 def get_listing(listing_id):
-    listing = Listing.query.get(listing_id)
+    listing = Listing.get_active(listing_id)
     
     if not listing:
         return jsonify({'error': 'Listing not found'}), 404
@@ -78,7 +149,48 @@ def get_listing(listing_id):
         if not current_user_id or current_user_id != listing.user_id:
             return jsonify({'error': 'Listing not found'}), 404
     
-    return jsonify(listing.to_dict(include_reviews=True)), 200
+    if listing.is_published:
+        view_counter.increment(listing.id)
+    
+    # Embed only the newest reviews; the rest are served by the reviews endpoint
+    review_limit = current_app.config['LISTING_REVIEWS_PREVIEW']
+    data = listing.to_dict(include_reviews=True, review_limit=review_limit)
+    data['review_summary'] = listing.review_summary()
+    
+    if data['review_summary']['count'] <= review_limit:
+        data['reviews_next'] = None
+    elif not data['reviews']:
+        # With the preview turned off there is no review to continue after
+        data['reviews_next'] = url_for('reviews.get_listing_reviews', listing_id=listing.id)
+    else:
+        last_review = data['reviews'][-1]
+        cursor = encode_cursor(last_review['created_at'].rstrip('Z'), last_review['id'])
+        data['reviews_next'] = url_for('reviews.get_listing_reviews', listing_id=listing.id,
+                                       cursor=cursor, per_page=review_limit)
+    
+    data['views'] = view_counter.counts(listing.id)
+    
+    return jsonify(data), 200
+
+@bp.route('/trending', methods=['GET'])
+def get_trending_listings():
+    hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 7)
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    
+    since = hour_bucket(datetime.utcnow()) - timedelta(hours=hours - 1)
+    rows = ListingStat.trending(since, limit)
+    
+    # Amenities and images for the whole list come from one query each
+    items = Listing.page_dicts(rows)
+    for item, row in zip(items, rows):
+        item['recent_views'] = row.recent_views
+    
+    response = jsonify({
+        'items': items,
+        'hours': hours
+    })
+    response.add_etag()
+    return response.make_conditional(request)
 
 @bp.route('/', methods=['POST'])
 @jwt_required()
@@ -98,54 +210,66 @@ def create_listing():
     
     current_user_id = get_jwt_identity()
     
-    # Create new listing
-    listing = Listing(
-        title=data['title'],
-        description=data['description'],
-        price=data['price'],
-        bedrooms=data['bedrooms'],
-        bathrooms=data['bathrooms'],
-        square_feet=data.get('square_feet'),
-        address=data['address'],
-        city=data['city'],
-        state=data['state'],
-        zip_code=data['zip_code'],
-        latitude=data.get('latitude'),
-        longitude=data.get('longitude'),
-        is_published=data.get('is_published', True),
-        user_id=current_user_id
-    )
-    
-    # Add amenities if provided
+    # Listing columns; the row itself is built by the write job
+    fields = {
+        'title': data['title'],
+        'description': data['description'],
+        'price': data['price'],
+        'bedrooms': data['bedrooms'],
+        'bathrooms': data['bathrooms'],
+        'square_feet': data.get('square_feet'),
+        'address': data['address'],
+        'city': data['city'],
+        'state': data['state'],
+        'zip_code': data['zip_code'],
+        'latitude': data.get('latitude'),
+        'longitude': data.get('longitude'),
+        'is_published': data.get('is_published', True)
+    }
+    
+    # Validate amenities if provided
+    amenity_ids = None
     if 'amenity_ids' in data and isinstance(data['amenity_ids'], list):
-        amenities = Amenity.query.filter(Amenity.id.in_(data['amenity_ids'])).all()
-        listing.amenities = amenities
+        amenity_ids = data['amenity_ids']
+        invalid_ids = amenity_catalog.resolve(amenity_ids)[1]
+        if invalid_ids:
+            return jsonify({'error': 'Invalid amenity ids', 'amenity_ids': invalid_ids}), 400
     
-    # Add images if provided
+    images = []
     if 'images' in data and isinstance(data['images'], list):
-        for img_data in data['images']:
-            if 'url' in img_data:
-                image = ListingImage(
-                    url=img_data['url'],
-                    caption=img_data.get('caption'),
-                    is_primary=img_data.get('is_primary', False),
-                    listing=listing
-                )
-                db.session.add(image)
-    
-    # Save listing to database
+        images = [img_data for img_data in data['images'] if 'url' in img_data]
+    
+    # Save listing to database; on SQLite this goes through the worker's single writer
     try:
-        db.session.add(listing)
-        db.session.commit()
+        listing = sqlite_writer.run(_insert_listing, fields, amenity_ids, images, current_user_id)
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
     
     return jsonify({
         'message': 'Listing created successfully',
-        'listing': listing.to_dict()
+        'listing': listing
     }), 201
 
+def _insert_listing(fields, amenity_ids, images, user_id):
+    listing = Listing(user_id=user_id, **fields)
+    if amenity_ids is not None:
+        listing.amenities = amenity_catalog.resolve(amenity_ids)[0]
+    
+    for img_data in images:
+        db.session.add(ListingImage(
+            url=img_data['url'],
+            caption=img_data.get('caption'),
+            is_primary=img_data.get('is_primary', False),
+            listing=listing
+        ))
+    
+    db.session.add(listing)
+    LandlordRollup.adjust(user_id, listing_count=1,
+                          published_count=1 if listing.is_published else 0)
+    db.session.flush()
+    return listing.to_dict()
+
 @bp.route('/<listing_id>', methods=['PUT'])
 @jwt_required()
 def update_listing(listing_id):
@@ -154,7 +278,7 @@ def update_listing(listing_id):
     if error_response:
         return error_response
     
-    listing = Listing.query.get(listing_id)
+    listing = Listing.get_active(listing_id)
     
     if not listing:
         return jsonify({'error': 'Listing not found'}), 404
@@ -166,47 +290,74 @@ def update_listing(listing_id):
     
     data = request.get_json() or {}
     
-    # Update listing fields
-    for field in ['title', 'description', 'price', 'bedrooms', 'bathrooms', 
-                 'square_feet', 'address', 'city', 'state', 'zip_code', 
-                 'latitude', 'longitude', 'is_published']:
-        if field in data:
-            setattr(listing, field, data[field])
-    
-    # Update amenities if provided
+    # Validate amenities if provided
+    amenity_ids = None
     if 'amenity_ids' in data and isinstance(data['amenity_ids'], list):
-        amenities = Amenity.query.filter(Amenity.id.in_(data['amenity_ids'])).all()
-        listing.amenities = amenities
+        amenity_ids = data['amenity_ids']
+        invalid_ids = amenity_catalog.resolve(amenity_ids)[1]
+        if invalid_ids:
+            return jsonify({'error': 'Invalid amenity ids', 'amenity_ids': invalid_ids}), 400
     
-    # Update images if provided
+    images = None
     if 'images' in data and isinstance(data['images'], list):
-        # Remove existing images
-        for image in listing.images.all():
-            db.session.delete(image)
-        
-        # Add new images
-        for img_data in data['images']:
-            if 'url' in img_data:
-                image = ListingImage(
-                    url=img_data['url'],
-                    caption=img_data.get('caption'),
-                    is_primary=img_data.get('is_primary', False),
-                    listing=listing
-                )
-                db.session.add(image)
+        images = [img_data for img_data in data['images'] if 'url' in img_data]
+    
+    fields = {
+        field: data[field]
+        for field in ['title', 'description', 'price', 'bedrooms', 'bathrooms',
+                      'square_feet', 'address', 'city', 'state', 'zip_code',
+                      'latitude', 'longitude', 'is_published']
+        if field in data
+    }
     
     # Save changes to database
     try:
-        db.session.commit()
+        listing = sqlite_writer.run(_update_listing, listing.id, fields, amenity_ids, images)
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
     
+    # Deleted while the request was waiting for the writer
+    if listing is None:
+        return jsonify({'error': 'Listing not found'}), 404
+    
     return jsonify({
         'message': 'Listing updated successfully',
-        'listing': listing.to_dict()
+        'listing': listing
     }), 200
 
+def _update_listing(listing_id, fields, amenity_ids, images):
+    listing = Listing.get_active(listing_id)
+    if not listing:
+        return None
+    
+    # Update listing fields
+    was_published = bool(listing.is_published)
+    for field, value in fields.items():
+        setattr(listing, field, value)
+    
+    if bool(listing.is_published) != was_published:
+        LandlordRollup.adjust(listing.user_id, published_count=1 if listing.is_published else -1)
+    
+    if amenity_ids is not None:
+        listing.amenities = amenity_catalog.resolve(amenity_ids)[0]
+    
+    if images is not None:
+        # Replace the existing images
+        for image in listing.images.all():
+            db.session.delete(image)
+        
+        for img_data in images:
+            db.session.add(ListingImage(
+                url=img_data['url'],
+                caption=img_data.get('caption'),
+                is_primary=img_data.get('is_primary', False),
+                listing=listing
+            ))
+    
+    db.session.flush()
+    return listing.to_dict()
+
 @bp.route('/<listing_id>', methods=['DELETE'])
 @jwt_required()
 def delete_listing(listing_id):
@@ -215,7 +366,7 @@ def delete_listing(listing_id):
     if error_response:
         return error_response
     
-    listing = Listing.query.get(listing_id)
+    listing = Listing.get_active(listing_id)
     
     if not listing:
         return jsonify({'error': 'Listing not found'}), 404
@@ -225,20 +376,43 @@ def delete_listing(listing_id):
     if listing.user_id != current_user_id:
         return jsonify({'error': 'You do not have permission to delete this listing'}), 403
     
-    # Delete listing from database
+    # Hide the listing now; a job purges its reviews, images and links in the background
     try:
-        db.session.delete(listing)
-        db.session.commit()
+        deleted = sqlite_writer.run(_delete_listing, listing.id)
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
     
+    if not deleted:
+        return jsonify({'error': 'Listing not found'}), 404
+    
     return jsonify({'message': 'Listing deleted successfully'}), 200
 
+def _delete_listing(listing_id):
+    listing = Listing.get_active(listing_id)
+    if not listing:
+        return False
+    
+    listing.deleted_at = datetime.utcnow()
+    rating = db.session.get(ListingRating, listing.id)
+    LandlordRollup.adjust(
+        listing.user_id,
+        listing_count=-1,
+        published_count=-1 if listing.is_published else 0,
+        review_count=-rating.review_count if rating else 0,
+        rating_sum=-rating.rating_sum if rating else 0
+    )
+    job_queue.enqueue('listings.purge', {'listing_id': listing.id}, dedup_key='listings.purge:' + listing.id)
+    db.session.flush()
+    return True
+
 @bp.route('/amenities', methods=['GET'])
 def get_amenities():
-    amenities = Amenity.query.all()
-    return jsonify([amenity.to_dict() for amenity in amenities]), 200
+    # Served from the pre-encoded catalog; clients revalidate with If-None-Match
+    amenity_catalog.ensure_fresh()
+    response = current_app.response_class(amenity_catalog.payload, mimetype='application/json')
+    response.set_etag(amenity_catalog.etag)
+    return response.make_conditional(request)
 
 @bp.route('/amenities', methods=['POST'])
 @jwt_required()
@@ -255,21 +429,23 @@ def create_amenity():
     if Amenity.query.filter_by(name=data['name']).first():
         return jsonify({'error': 'Amenity already exists'}), 400
     
-    # Create new amenity
-    amenity = Amenity(
-        name=data['name'],
-        icon=data.get('icon')
-    )
-    
     # Save amenity to database
     try:
-        db.session.add(amenity)
-        db.session.commit()
+        amenity = sqlite_writer.run(_insert_amenity, data['name'], data.get('icon'))
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
     
+    amenity_catalog.reload()
+    
     return jsonify({
         'message': 'Amenity created successfully',
-        'amenity': amenity.to_dict()
-    }), 201
\ No newline at end of file
+        'amenity': amenity
+    }), 201
+
+def _insert_amenity(name, icon):
+    amenity = Amenity(name=name, icon=icon)
+    db.session.add(amenity)
+    amenity_catalog.invalidate()
+    db.session.flush()
+    return amenity.to_dict()
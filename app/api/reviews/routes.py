@@ -1,26 +1,34 @@
 # app/api/reviews/routes.py
 from flask import request, jsonify
 from app import db
+from app.routing import replica_read
+from app.services.leaderboard import leaderboard
+from app.services.sqlite_writer import sqlite_writer
 from app.api.reviews import bp
-from app.models.review import Review
-from app.models.listing import Listing
+from app.models.review import Review, encode_cursor, decode_cursor, review_with_author_serializer
+from app.models.listing import Listing, ListingRating, LandlordRollup
 from app.models.user import User
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from sqlalchemy.exc import SQLAlchemyError
+from app.models.types import InvalidIdError, parse_guid
+from app.responses import wants_columnar, list_response
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, current_user
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from datetime import datetime
+import uuid
 
 @bp.route('/', methods=['POST'])
 @jwt_required()
 def create_review():
-    # Check if user is a verified tenant
+    # Check if user is a verified tenant; both facts travel in the token claims
     claims = get_jwt()
     if claims.get('role') != 'tenant':
         return jsonify({'error': 'Only tenants can post reviews'}), 403
     
     current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user or not user.is_verified:
-        return jsonify({'error': 'Only verified tenants can post reviews'}), 403
+    if not claims.get('verified'):
+        # The claim is fixed at login, so a tenant verified since then is checked in the database
+        user = User.query.get(current_user_id)
+        if not user or not user.is_verified:
+            return jsonify({'error': 'Only verified tenants can post reviews'}), 403
     
     data = request.get_json() or {}
     
@@ -34,47 +42,65 @@ def create_review():
     if not isinstance(rating, int) or rating < 1 or rating > 5:
         return jsonify({'error': 'Rating must be an integer between 1 and 5'}), 400
     
-    # Check if listing exists
-    listing = Listing.query.get(data['listing_id'])
-    if not listing:
+    try:
+        listing_id = parse_guid(data['listing_id'])
+    except InvalidIdError:
         return jsonify({'error': 'Listing not found'}), 404
     
-    # Check if user already reviewed this listing
-    existing_review = Review.query.filter_by(
-        user_id=current_user_id,
-        listing_id=data['listing_id']
-    ).first()
-    
-    if existing_review:
-        return jsonify({'error': 'You have already reviewed this listing'}), 400
-    
-    # Create new review
-    review = Review(
-        content=data['content'],
-        rating=data['rating'],
-        user_id=current_user_id,
-        listing_id=data['listing_id']
-    )
-    
-    # Save review to database
+    # Listing existence, the author's verified status and duplicates are all
+    # checked by the INSERT itself; only failures pay for a follow-up query
+    review_id = str(uuid.uuid4())
+    now = datetime.utcnow()
     try:
-        db.session.add(review)
-        db.session.commit()
+        author = sqlite_writer.run(_insert_review, review_id, data['content'], rating, current_user_id,
+                                   listing_id, claims.get('ver', 0), now)
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'You have already reviewed this listing'}), 400
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
     
+    if author is None:
+        user = User.query.get(current_user_id)
+        if not user or not user.is_verified:
+            return jsonify({'error': 'Only verified tenants can post reviews'}), 403
+        if user.token_version != claims.get('ver', 0):
+            return jsonify({'error': 'Token is no longer valid, please log in again'}), 401
+        return jsonify({'error': 'Listing not found'}), 404
+    
+    leaderboard.refresh([listing_id])
+    
     return jsonify({
         'message': 'Review created successfully',
-        'review': review.to_dict(include_user=True)
+        'review': {
+            'id': review_id,
+            'content': data['content'],
+            'rating': rating,
+            'created_at': now.isoformat() + 'Z',
+            'updated_at': now.isoformat() + 'Z',
+            'user_id': current_user_id,
+            'listing_id': listing_id,
+            'user': author
+        }
     }), 201
 
+def _insert_review(review_id, content, rating, user_id, listing_id, token_version, now):
+    # Returns the author's payload, or None when the insert's checks failed
+    if not Review.insert_checked(review_id, content, rating, user_id, listing_id, token_version, now):
+        return None
+    ListingRating.apply(listing_id, 1, rating)
+    LandlordRollup.adjust_reviews(listing_id, 1, rating)
+    return User.query.get(user_id).to_dict()
+
 @bp.route('/<review_id>', methods=['PUT'])
 @jwt_required()
 def update_review(review_id):
     review = Review.query.get(review_id)
     
-    if not review:
+    # Reviews of a deleted listing are already out of its rating and the
+    # landlord's rollup and only wait for the purge job
+    if not review or not Listing.get_active(review.listing_id):
         return jsonify({'error': 'Review not found'}), 404
     
     # Check if the current user is the author of the review
@@ -84,72 +110,131 @@ def update_review(review_id):
     
     data = request.get_json() or {}
     
-    # Update review fields
-    if 'content' in data:
-        review.content = data['content']
-    
     if 'rating' in data:
         rating = data['rating']
         if not isinstance(rating, int) or rating < 1 or rating > 5:
             return jsonify({'error': 'Rating must be an integer between 1 and 5'}), 400
-        review.rating = rating
     
     # Save changes to database
     try:
-        db.session.commit()
+        updated = sqlite_writer.run(_update_review, review.id, data.get('content'), data.get('rating'))
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
     
+    if updated is None:
+        return jsonify({'error': 'Review not found'}), 404
+    
+    leaderboard.refresh([updated['listing_id']])
+    
     return jsonify({
         'message': 'Review updated successfully',
-        'review': review.to_dict(include_user=True)
+        'review': updated
     }), 200
 
+def _update_review(review_id, content, rating):
+    review = Review.query.get(review_id)
+    if not review or not Listing.get_active(review.listing_id):
+        return None
+    
+    # Update review fields
+    if content is not None:
+        review.content = content
+    
+    if rating is not None and rating != review.rating:
+        ListingRating.apply(review.listing_id, 0, rating - review.rating)
+        LandlordRollup.adjust_reviews(review.listing_id, 0, rating - review.rating)
+        review.rating = rating
+    
+    db.session.flush()
+    return review.to_dict(include_user=True)
+
 @bp.route('/<review_id>', methods=['DELETE'])
 @jwt_required()
 def delete_review(review_id):
     review = Review.query.get(review_id)
     
-    if not review:
+    # Reviews of a deleted listing are already out of its rating and the
+    # landlord's rollup and only wait for the purge job
+    if not review or not Listing.get_active(review.listing_id):
         return jsonify({'error': 'Review not found'}), 404
     
     # Check if the current user is the author of the review
     current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
     
-    if review.user_id != current_user_id and user.role != 'admin':
+    if review.user_id != current_user_id and current_user.role != 'admin':
         return jsonify({'error': 'You do not have permission to delete this review'}), 403
     
     # Delete review from database
+    listing_id = review.listing_id
     try:
-        db.session.delete(review)
-        db.session.commit()
+        deleted = sqlite_writer.run(_delete_review, review.id)
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
     
+    if not deleted:
+        return jsonify({'error': 'Review not found'}), 404
+    
+    leaderboard.refresh([listing_id])
+    
     return jsonify({'message': 'Review deleted successfully'}), 200
 
+def _delete_review(review_id):
+    review = Review.query.get(review_id)
+    if not review or not Listing.get_active(review.listing_id):
+        return False
+    
+    db.session.delete(review)
+    ListingRating.apply(review.listing_id, -1, -review.rating)
+    LandlordRollup.adjust_reviews(review.listing_id, -1, -review.rating)
+    db.session.flush()
+    return True
+
 @bp.route('/listing/<listing_id>', methods=['GET'])
+@replica_read
 def get_listing_reviews(listing_id):
-    # Check if listing exists
-    listing = Listing.query.get(listing_id)
-    if not listing:
-        return jsonify({'error': 'Listing not found'}), 404
+    # A keyset page needs at least one row to carry the cursor forward
+    per_page = max(min(request.args.get('per_page', 10, type=int), 100), 1)
     
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 10, type=int), 100)
+    cursor = request.args.get('cursor')
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
     
-    # Get paginated reviews for the listing
-    pagination = Review.query.filter_by(listing_id=listing_id).order_by(
-        Review.created_at.desc()
-    ).paginate(page=page, per_page=per_page)
+    # One query: listing existence, the page of reviews and their authors
+    rows = Listing.reviews_page(listing_id, per_page, after=after)
+    if rows is None:
+        return jsonify({'error': 'Listing not found'}), 404
     
-    return jsonify({
-        'items': [item.to_dict(include_user=True) for item in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'page': page,
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    # The running aggregate makes the total a primary-key lookup instead of a COUNT
+    rating = db.session.get(ListingRating, listing_id)
+    total = rating.review_count if rating else 0
+    
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(rows[-1].created_at.isoformat(), rows[-1].id)
+    
+    if wants_columnar():
+        # Authors are sent once each, referenced from the user_id column
+        users = {
+            row.user_id: {'id': row.user_id, 'username': row.username, 'is_verified': row.is_verified}
+            for row in rows
+        }
+        return list_response({
+            'columns': review_with_author_serializer.columnar(rows),
+            'users': users,
+            'total': total,
+            'next_cursor': next_cursor,
+            'per_page': per_page
+        }, columnar=True), 200
+    
+    return list_response({
+        'items': review_with_author_serializer.many(rows),
+        'total': total,
+        'next_cursor': next_cursor,
         'per_page': per_page
-    }), 200
\ No newline at end of file
+    }), 200
@@ -1,18 +1,21 @@
 # app/api/search/routes.py
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from app import db
+from app.routing import replica_read
 from app.api.search import bp
-from app.models.listing import Listing, Amenity
+from app.models.listing import Listing, Amenity, listing_serializer
+from app.responses import wants_columnar, list_response, stream_page
 from sqlalchemy import or_
 
 @bp.route('/', methods=['GET'])
+@replica_read
 def search_listings():
     query = request.args.get('q', '')
     page = request.args.get('page', 1, type=int)
     per_page = min(request.args.get('per_page', 10, type=int), 100)
     
     # Initialize the base query
-    listing_query = Listing.query.filter_by(is_published=True)
+    listing_query = Listing.active().filter_by(is_published=True)
     
     # Apply text search filter if provided
     if query:
@@ -71,11 +74,29 @@ def search_listings():
         for amenity_id in amenity_ids:
             listing_query = listing_query.filter(Listing.amenities.any(Amenity.id == amenity_id))
     
-    # Get paginated results
-    pagination = listing_query.order_by(Listing.created_at.desc()).paginate(page=page, per_page=per_page)
+    # Get paginated results as plain rows; relations are loaded for the whole page at once
+    listing_query = listing_query.with_entities(*listing_serializer.columns).order_by(Listing.created_at.desc())
+    columnar = wants_columnar()
     
-    return jsonify({
-        'items': [item.to_dict() for item in pagination.items],
+    # Large pages are streamed batch by batch instead of being built in memory
+    if not columnar and per_page >= current_app.config['STREAM_JSON_MIN_PER_PAGE']:
+        return stream_page(listing_query, page, per_page, Listing.page_dicts)
+    
+    pagination = listing_query.paginate(page=page, per_page=per_page)
+    
+    if columnar:
+        columns, amenities = Listing.page_columnar(pagination.items)
+        return list_response({
+            'columns': columns,
+            'amenities': amenities,
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'page': page,
+            'per_page': per_page
+        }, columnar=True), 200
+    
+    return list_response({
+        'items': Listing.page_dicts(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'page': page,
@@ -1,23 +1,24 @@
 # app/api/users/routes.py
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from app import db
 from app.api.users import bp
 from app.models.user import User
-from app.models.listing import Listing
-from app.models.review import Review
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.models.listing import Listing, LandlordRollup, listing_serializer
+from app.models.review import Review, review_serializer
+from app.responses import stream_page
+from app.services.token_revocations import token_revocations
+from app.services.user_batch import user_batch
+from flask_jwt_extended import (
+    jwt_required, get_jwt_identity, get_jwt, current_user,
+    create_access_token, create_refresh_token
+)
 from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
 
 @bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    return jsonify(user.to_dict()), 200
+    return jsonify(current_user.to_dict()), 200
 
 @bp.route('/me', methods=['PUT'])
 @jwt_required()
@@ -48,6 +49,8 @@ def update_current_user():
     # Handle password change separately
     if 'password' in data:
         user.set_password(data['password'])
+        user.bump_token_version()
+        token_revocations.revoke_user(user)
     
     # Save changes to database
     try:
@@ -56,10 +59,17 @@ def update_current_user():
         db.session.rollback()
         return jsonify({'error': 'Database error', 'details': str(e)}), 500
     
-    return jsonify({
+    response = {
         'message': 'User updated successfully',
         'user': user.to_dict()
-    }), 200
+    }
+    
+    # A password change revokes every existing token, including this one
+    if 'password' in data:
+        response['access_token'] = create_access_token(identity=user.id, additional_claims=user.token_claims())
+        response['refresh_token'] = create_refresh_token(identity=user.id, additional_claims={'ver': user.token_version})
+    
+    return jsonify(response), 200
 
 @bp.route('/me/listings', methods=['GET'])
 @jwt_required()
@@ -75,18 +85,55 @@ def get_user_listings():
     per_page = min(request.args.get('per_page', 10, type=int), 100)
     
     # Get paginated listings for the user
-    pagination = Listing.query.filter_by(user_id=current_user_id).order_by(
-        Listing.created_at.desc()
-    ).paginate(page=page, per_page=per_page)
+    query = Listing.active().filter_by(user_id=current_user_id).with_entities(
+        *listing_serializer.columns
+    ).order_by(Listing.created_at.desc())
+    
+    if per_page >= current_app.config['STREAM_JSON_MIN_PER_PAGE']:
+        return stream_page(query, page, per_page, Listing.page_dicts)
+    
+    pagination = query.paginate(page=page, per_page=per_page)
     
     return jsonify({
-        'items': [item.to_dict() for item in pagination.items],
+        'items': Listing.page_dicts(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'page': page,
         'per_page': per_page
     }), 200
 
+@bp.route('/me/dashboard', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    # Check if user is a landlord
+    claims = get_jwt()
+    if claims.get('role') != 'landlord':
+        return jsonify({'error': 'Only landlords can access the dashboard'}), 403
+    
+    current_user_id = get_jwt_identity()
+    
+    # Both reads are single index lookups regardless of portfolio size
+    rollup = LandlordRollup.query.get(current_user_id) or LandlordRollup(
+        user_id=current_user_id, listing_count=0, published_count=0,
+        review_count=0, rating_sum=0, updated_at=datetime.utcnow()
+    )
+    recent_reviews = Review.recent_for_landlord(
+        current_user_id, current_app.config['DASHBOARD_RECENT_REVIEWS']
+    )
+    
+    data = rollup.to_dict()
+    data['recent_reviews'] = [{
+        'id': row.id,
+        'content': row.content,
+        'rating': row.rating,
+        'created_at': row.created_at.isoformat() + 'Z',
+        'user_id': row.user_id,
+        'listing_id': row.listing_id,
+        'listing_title': row.title
+    } for row in recent_reviews]
+    
+    return jsonify(data), 200
+
 @bp.route('/me/reviews', methods=['GET'])
 @jwt_required()
 def get_user_reviews():
@@ -96,14 +143,47 @@ def get_user_reviews():
     per_page = min(request.args.get('per_page', 10, type=int), 100)
     
     # Get paginated reviews for the user
-    pagination = Review.query.filter_by(user_id=current_user_id).order_by(
-        Review.created_at.desc()
-    ).paginate(page=page, per_page=per_page)
+    pagination = Review.query.filter_by(user_id=current_user_id).with_entities(
+        *review_serializer.columns
+    ).order_by(Review.created_at.desc()).paginate(page=page, per_page=per_page)
     
     return jsonify({
-        'items': [item.to_dict() for item in pagination.items],
+        'items': review_serializer.many(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'page': page,
         'per_page': per_page
+    }), 200
+
+@bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_update_users():
+    # Check if user is an admin
+    claims = get_jwt()
+    if claims.get('role') != 'admin':
+        return jsonify({'error': 'Only admins can run batch operations'}), 403
+    
+    data = request.get_json() or {}
+    
+    # Validate required fields
+    user_ids = data.get('user_ids')
+    if not data.get('action') or not isinstance(user_ids, list) or not all(isinstance(user_id, str) for user_id in user_ids):
+        return jsonify({'error': 'Missing action or user_ids'}), 400
+    
+    max_ids = current_app.config['USER_BATCH_MAX_IDS']
+    if len(user_ids) > max_ids:
+        return jsonify({'error': f'At most {max_ids} user ids per batch'}), 400
+    
+    try:
+        results = user_batch.apply(data['action'], user_ids, role=data.get('role'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': 'Database error', 'details': str(e)}), 500
+    
+    return jsonify({
+        'action': data['action'],
+        'updated': sum(1 for status in results.values() if status == 'updated'),
+        'results': results
     }), 200
\ No newline at end of file
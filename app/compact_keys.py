@@ -0,0 +1,265 @@
+# app/compact_keys.py
+import re
+import time
+from contextlib import contextmanager
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models.types import GUID
+
+# Migration e2f91b7c4d58 converts user, listing and review keys with ALTER ... TYPE,
+# which rewrites each table under an exclusive lock. On a large PostgreSQL database,
+# upgrade with `flask db upgrade -x compact_keys=online` instead, which leaves the
+# keys as text (GUID binds plain literals, so the app works with either type), and
+# then run this command while the app serves traffic. Per table with text keys:
+#   1. expand: a nullable <column>_uuid shadow per key, kept in sync by a trigger
+#   2. backfill: copy existing rows in primary key order, one transaction per batch
+#   3. prepare: validate NOT NULL checks and build the shadow indexes CONCURRENTLY
+#   4. swap: one short transaction drops the text columns, renames the shadows into
+#      place and re-attaches constraints to the prebuilt indexes; foreign keys come
+#      back NOT VALID and are validated afterwards without blocking writes
+# Every step can be repeated, so an interrupted run is simply started again.
+
+SHADOW_SUFFIX = '_uuid'
+TRIGGER = 'compact_keys_sync'
+
+def _shadow(name):
+    # Identifiers are capped at 63 bytes in PostgreSQL
+    return name[:63 - len(SHADOW_SUFFIX)] + SHADOW_SUFFIX
+
+def pending_columns(connection):
+    """Return {table: [(column, nullable)]} for GUID columns still stored as text."""
+    inspector = inspect(connection)
+    pending = {}
+    for table in db.metadata.sorted_tables:
+        keys = [column.name for column in table.columns if isinstance(column.type, GUID)]
+        if not keys:
+            continue
+        if not inspector.has_table(table.name):
+            raise click.ClickException(f'Table {table.name} does not exist; run flask db upgrade first')
+        live = {column['name']: column for column in inspector.get_columns(table.name)}
+        columns = [(key, live[key]['nullable']) for key in keys if not isinstance(live[key]['type'], db.Uuid)]
+        if columns:
+            pending[table.name] = columns
+    return pending
+
+def _run_locked(statements, lock_timeout, retries):
+    """Run DDL in one transaction that gives up on locks after ``lock_timeout`` and retries.
+    
+    Waiting behind a long transaction for an exclusive lock would stall every
+    query queued behind the DDL, so it fails fast instead; a timeout below
+    PostgreSQL's deadlock_timeout (1s) also makes the DDL, not a request,
+    the side that backs off when their lock orders cross.
+    """
+    for attempt in range(retries + 1):
+        try:
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+                for statement in statements(connection):
+                    connection.exec_driver_sql(statement)
+            return
+        except OperationalError as e:
+            # lock_not_available or deadlock_detected
+            if getattr(e.orig, 'pgcode', None) not in ('55P03', '40P01') or attempt == retries:
+                raise
+            click.echo(f'  lock not available, retrying ({attempt + 1}/{retries})')
+            time.sleep(min(0.2 * (attempt + 1), 5))
+
+@contextmanager
+def _maintenance_connection():
+    """Autocommit connection without the app's statement timeout, for scans and index builds."""
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.exec_driver_sql('SET statement_timeout = 0')
+        try:
+            yield connection
+        finally:
+            connection.exec_driver_sql('RESET statement_timeout')
+
+def _expand(table, columns, lock_timeout, retries):
+    assignments = ''.join(f'    NEW.{_shadow(column)} := NEW.{column}::uuid;\n' for column, _ in columns)
+    
+    def statements(connection):
+        for column, _ in columns:
+            yield f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {_shadow(column)} uuid'
+        yield (
+            f'CREATE OR REPLACE FUNCTION compact_keys_{table}() RETURNS trigger LANGUAGE plpgsql AS $$\n'
+            f'BEGIN\n{assignments}    RETURN NEW;\nEND $$'
+        )
+        yield f'DROP TRIGGER IF EXISTS {TRIGGER} ON {table}'
+        yield (
+            f'CREATE TRIGGER {TRIGGER} BEFORE INSERT OR UPDATE ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION compact_keys_{table}()'
+        )
+    
+    _run_locked(statements, lock_timeout, retries)
+
+def _backfill(table, columns, batch_size, pause):
+    """Copy every row's keys into the shadows, ``batch_size`` rows per transaction."""
+    key = inspect(db.engine).get_pk_constraint(table)['constrained_columns']
+    key_list = ', '.join(key)
+    after = ', '.join(f'%(after_{number})s' for number in range(len(key)))
+    upto = ', '.join(f'%(upto_{number})s' for number in range(len(key)))
+    assignments = ', '.join(f'{_shadow(column)} = {column}::uuid' for column, _ in columns)
+    
+    last = None
+    copied = 0
+    while True:
+        with db.engine.begin() as connection:
+            # Keyset walk of the primary key; PostgreSQL's own ordering picks the batch boundary
+            parameters = {'limit': batch_size}
+            where = ''
+            if last is not None:
+                where = f'WHERE ({key_list}) > ({after})'
+                parameters.update({f'after_{number}': value for number, value in enumerate(last)})
+            rows = connection.exec_driver_sql(
+                f'SELECT {key_list} FROM {table} {where} ORDER BY {key_list} LIMIT %(limit)s', parameters
+            ).all()
+            if not rows:
+                break
+            parameters.update({f'upto_{number}': value for number, value in enumerate(rows[-1])})
+            range_filter = f'({key_list}) <= ({upto})' + (f' AND ({key_list}) > ({after})' if last else '')
+            connection.exec_driver_sql(f'UPDATE {table} SET {assignments} WHERE {range_filter}', parameters)
+        last = tuple(rows[-1])
+        copied += len(rows)
+        if pause:
+            time.sleep(pause)
+    click.echo(f'  {table}: copied {copied} row(s)')
+
+def _key_indexes(connection, table, columns):
+    """Return [(index, constraint type 'p'/'u' or None, definition)] for indexes on the text keys."""
+    rows = connection.exec_driver_sql("""
+        SELECT i.relname, c.contype, pg_get_indexdef(x.indexrelid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        LEFT JOIN pg_constraint c
+            ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid AND c.contype IN ('p', 'u')
+        WHERE x.indrelid = %(table)s::regclass
+    """, {'table': table}).all()
+    
+    names = [column for column, _ in columns]
+    pattern = re.compile(r'\b(' + '|'.join(map(re.escape, names)) + r')\b')
+    indexes = []
+    for name, constraint, definition in rows:
+        head, _, body = definition.partition(' USING ')
+        if name.endswith(SHADOW_SUFFIX) or not pattern.search(body):
+            continue
+        # Same index, with every converted key swapped for its shadow
+        shadow = re.sub(r'INDEX \S+ ON', f'INDEX CONCURRENTLY IF NOT EXISTS {_shadow(name)} ON', head, count=1)
+        indexes.append((name, constraint, shadow + ' USING ' + pattern.sub(lambda m: _shadow(m[1]), body)))
+    return indexes
+
+def _prepare(table, columns, lock_timeout, retries):
+    """Validate NOT NULL checks on the shadows and build their indexes, without blocking writes."""
+    with _maintenance_connection() as connection:
+        existing = set(connection.exec_driver_sql(
+            'SELECT conname FROM pg_constraint WHERE conrelid = %(table)s::regclass', {'table': table}
+        ).scalars())
+        for column, nullable in columns:
+            check = _shadow(f'{table}_{column}_not_null')
+            if nullable:
+                continue
+            if check not in existing:
+                # A validated check lets SET NOT NULL skip its full-table scan during the swap
+                _run_locked(lambda _: [
+                    f'ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({_shadow(column)} IS NOT NULL) NOT VALID'
+                ], lock_timeout, retries)
+            connection.exec_driver_sql(f'ALTER TABLE {table} VALIDATE CONSTRAINT {check}')
+        
+        for name, _, definition in _key_indexes(connection, table, columns):
+            # A build interrupted earlier leaves an invalid index behind
+            if connection.exec_driver_sql(
+                'SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%(index)s)',
+                {'index': _shadow(name)}
+            ).scalar():
+                connection.exec_driver_sql(f'DROP INDEX CONCURRENTLY {_shadow(name)}')
+            click.echo(f'  {table}: building {_shadow(name)}')
+            connection.exec_driver_sql(definition)
+
+def _swap(pending, lock_timeout, retries):
+    """Put the shadows in place of the text keys in one transaction; returns the foreign keys to validate."""
+    foreign_keys = []
+    
+    def statements(connection):
+        foreign_keys[:] = connection.exec_driver_sql("""
+            SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE contype = 'f' AND confrelid::regclass::text = ANY(%(tables)s)
+        """, {'tables': list(pending)}).all()
+        # Every lock at once, so the statements below run without waiting in between
+        yield f'LOCK TABLE {", ".join(sorted({table for table, _, _ in foreign_keys} | set(pending)))} IN ACCESS EXCLUSIVE MODE'
+        for table, name, _ in foreign_keys:
+            yield f'ALTER TABLE {table} DROP CONSTRAINT {name}'
+        
+        for table, columns in pending.items():
+            indexes = _key_indexes(connection, table, columns)
+            yield f'DROP TRIGGER IF EXISTS {TRIGGER} ON {table}'
+            for column, nullable in columns:
+                if not nullable:
+                    yield f'ALTER TABLE {table} ALTER COLUMN {_shadow(column)} SET NOT NULL'
+                    yield f'ALTER TABLE {table} DROP CONSTRAINT {_shadow(f"{table}_{column}_not_null")}'
+            for name, constraint, _ in indexes:
+                if constraint:
+                    yield f'ALTER TABLE {table} DROP CONSTRAINT {name}'
+            for column, _ in columns:
+                # Dropping the column drops its remaining indexes; renaming is catalog-only
+                yield f'ALTER TABLE {table} DROP COLUMN {column}'
+                yield f'ALTER TABLE {table} RENAME COLUMN {_shadow(column)} TO {column}'
+            for name, constraint, _ in indexes:
+                if constraint:
+                    kind = 'PRIMARY KEY' if constraint == 'p' else 'UNIQUE'
+                    yield f'ALTER TABLE {table} ADD CONSTRAINT {name} {kind} USING INDEX {_shadow(name)}'
+                else:
+                    yield f'ALTER INDEX {_shadow(name)} RENAME TO {name}'
+        
+        for table, name, definition in foreign_keys:
+            yield f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID'
+    
+    _run_locked(statements, lock_timeout, retries)
+    return [(table, name) for table, name, _ in foreign_keys]
+
+def _finish(tables):
+    """Validate foreign keys left NOT VALID by a swap and drop the sync functions and triggers."""
+    with _maintenance_connection() as connection:
+        for table, name in connection.exec_driver_sql("""
+            SELECT conrelid::regclass::text, conname FROM pg_constraint
+            WHERE contype = 'f' AND NOT convalidated AND confrelid::regclass::text = ANY(%(tables)s)
+        """, {'tables': tables}).all():
+            click.echo(f'  validating {table}.{name}')
+            connection.exec_driver_sql(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+        for table in tables:
+            connection.exec_driver_sql(f'DROP FUNCTION IF EXISTS compact_keys_{table}() CASCADE')
+
+@click.command('compact-keys')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help='Rows copied per transaction.')
+@click.option('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+@click.option('--lock-timeout', default='500ms', show_default=True, help='Longest wait for table locks per attempt.')
+@click.option('--retries', type=int, default=50, show_default=True, help='Attempts per DDL step that times out on a lock.')
+@click.option('--no-swap', is_flag=True, help='Stop once the shadow columns and indexes are ready.')
+@with_appcontext
+def compact_keys_command(batch_size, pause, lock_timeout, retries, no_swap):
+    """Convert user, listing and review keys to native uuid on PostgreSQL without a table rewrite."""
+    if db.engine.dialect.name != 'postgresql':
+        raise click.ClickException('Only PostgreSQL is converted online; flask db upgrade rebuilds other databases')
+    
+    tables = [table.name for table in db.metadata.sorted_tables
+              if any(isinstance(column.type, GUID) for column in table.columns)]
+    with db.engine.connect() as connection:
+        pending = pending_columns(connection)
+    
+    for table, columns in pending.items():
+        click.echo(f'{table}: {", ".join(column for column, _ in columns)}')
+        _expand(table, columns, lock_timeout, retries)
+        _backfill(table, columns, batch_size, pause)
+        _prepare(table, columns, lock_timeout, retries)
+    
+    if pending and no_swap:
+        click.echo('Shadow columns are ready; run again without --no-swap to switch over')
+        return
+    if pending:
+        started = time.perf_counter()
+        _swap(pending, lock_timeout, retries)
+        click.echo(f'Swapped {len(pending)} table(s) in {time.perf_counter() - started:.2f}s')
+    _finish(tables)
+    click.echo('Keys are stored as native uuid')
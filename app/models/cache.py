@@ -0,0 +1,31 @@
+# app/models/cache.py
+from app import db
+
+class CacheGeneration(db.Model):
+    __tablename__ = 'cache_generations'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def current(cls, name):
+        generation = db.session.query(cls.generation).filter_by(name=name).scalar()
+        return generation or 0
+    
+    @classmethod
+    def bump(cls, name):
+        # Runs inside the caller's transaction so the bump commits with the data change
+        updated = cls.query.filter_by(name=name).update(
+            {cls.generation: cls.generation + 1}, synchronize_session=False
+        )
+        if not updated:
+            db.session.add(cls(name=name, generation=1))
+    
+    @classmethod
+    def advance(cls, name, value):
+        # Move a marker forward, never backward
+        updated = cls.query.filter(cls.name == name, cls.generation < value).update(
+            {cls.generation: value}, synchronize_session=False
+        )
+        if not updated and db.session.get(cls, name) is None:
+            db.session.add(cls(name=name, generation=value))
@@ -1,18 +1,39 @@
 # app/models/listing.py
 from app import db
+from app.models.types import GUID
+from app.models.review import Review, review_serializer, review_with_author_serializer
+from app.models.user import User
+from app.serializers import Serializer
 from datetime import datetime
 import uuid
 
+def upsert_insert():
+    """Return the dialect's INSERT supporting ON CONFLICT, or None if unavailable."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
 # Association table for many-to-many relationship
 listing_amenities = db.Table('listing_amenities',
-    db.Column('listing_id', db.String(36), db.ForeignKey('listings.id'), primary_key=True),
+    db.Column('listing_id', GUID(), db.ForeignKey('listings.id'), primary_key=True),
     db.Column('amenity_id', db.Integer, db.ForeignKey('amenities.id'), primary_key=True)
 )
 
 class Listing(db.Model):
     __tablename__ = 'listings'
+    __table_args__ = (
+        # Public pages: live published listings, newest first
+        db.Index('ix_listings_published_created_at', 'is_published', 'deleted_at', 'created_at'),
+        # A landlord's own listings, newest first
+        db.Index('ix_listings_user_id_created_at', 'user_id', 'deleted_at', 'created_at'),
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(GUID(), primary_key=True, default=lambda: str(uuid.uuid4()))
     title = db.Column(db.String(128), nullable=False)
     description = db.Column(db.Text, nullable=False)
     price = db.Column(db.Float, nullable=False)
@@ -28,40 +49,127 @@ class Listing(db.Model):
     is_published = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=True, index=True)  # Set on delete; rows are purged later
+    user_id = db.Column(GUID(), db.ForeignKey('users.id'), nullable=False)
     
     # Relationships
     reviews = db.relationship('Review', backref='listing', lazy='dynamic', cascade='all, delete-orphan')
-    amenities = db.relationship('Amenity', secondary=listing_amenities, lazy='subquery',
+    amenities = db.relationship('Amenity', secondary=listing_amenities, lazy='subquery', order_by='Amenity.id',
                                 backref=db.backref('listings', lazy=True))
     images = db.relationship('ListingImage', backref='listing', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self, include_reviews=False):
-        data = {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'price': self.price,
-            'bedrooms': self.bedrooms,
-            'bathrooms': self.bathrooms,
-            'square_feet': self.square_feet,
-            'address': self.address,
-            'city': self.city,
-            'state': self.state,
-            'zip_code': self.zip_code,
-            'latitude': self.latitude,
-            'longitude': self.longitude,
-            'is_published': self.is_published,
-            'created_at': self.created_at.isoformat() + 'Z',
-            'updated_at': self.updated_at.isoformat() + 'Z',
-            'user_id': self.user_id,
-            'amenities': [amenity.to_dict() for amenity in self.amenities],
-            'images': [image.to_dict() for image in self.images]
+    @classmethod
+    def active(cls):
+        return cls.query.filter(cls.deleted_at.is_(None))
+    
+    @classmethod
+    def get_active(cls, listing_id):
+        listing = cls.query.get(listing_id)
+        if listing is None or listing.deleted_at is not None:
+            return None
+        return listing
+    
+    @classmethod
+    def reviews_page(cls, listing_id, per_page, after=None):
+        """Fetch a keyset page of reviews with compact author fields in one query.
+        
+        The listing is the driving table, so an unknown or deleted listing yields
+        None while a listing without (more) reviews yields an empty list.
+        """
+        join_on = Review.listing_id == cls.id
+        if after is not None:
+            created_at, review_id = after
+            join_on = db.and_(join_on, db.or_(
+                Review.created_at < created_at,
+                db.and_(Review.created_at == created_at, Review.id < review_id)
+            ))
+        
+        # Serializer columns come first so rows can be passed straight to from_row
+        rows = db.session.query(
+            *review_with_author_serializer.columns, cls.id.label('page_listing_id')
+        ).select_from(cls).outerjoin(Review, join_on).outerjoin(
+            User, User.id == Review.user_id
+        ).filter(
+            cls.id == listing_id,
+            cls.deleted_at.is_(None)
+        ).order_by(Review.created_at.desc(), Review.id.desc()).limit(per_page + 1).all()
+        
+        if not rows:
+            return None
+        return [row for row in rows if row[0] is not None]
+    
+    def review_summary(self):
+        # Read from the running aggregate, a primary-key lookup instead of COUNT/AVG over the reviews
+        rating = db.session.get(ListingRating, self.id)
+        count = rating.review_count if rating else 0
+        return {
+            'count': count,
+            'average_rating': round(rating.rating_sum / count, 2) if count else None
         }
+    
+    @staticmethod
+    def _page_relations(listing_ids):
+        """Amenity ids (in id order, like ``Listing.amenities``) and images per listing, plus each amenity once."""
+        amenity_ids = {}
+        amenities = {}
+        images = {}
+        if not listing_ids:
+            return amenity_ids, amenities, images
+        
+        for row in db.session.query(*amenity_serializer.columns, listing_amenities.c.listing_id).join(
+            listing_amenities, listing_amenities.c.amenity_id == Amenity.id
+        ).filter(listing_amenities.c.listing_id.in_(listing_ids)).order_by(Amenity.id):
+            amenity_ids.setdefault(row[-1], []).append(row[0])
+            if row[0] not in amenities:
+                amenities[row[0]] = amenity_serializer.from_row(row)
+        
+        for row in db.session.query(*image_serializer.columns).filter(ListingImage.listing_id.in_(listing_ids)):
+            image = image_serializer.from_row(row)
+            images.setdefault(image['listing_id'], []).append(image)
+        
+        return amenity_ids, amenities, images
+    
+    @classmethod
+    def page_dicts(cls, rows):
+        """Serialize rows selected with ``listing_serializer.columns``.
+        
+        Amenities and images for the whole page are fetched with one query each
+        instead of loading them per listing.
+        """
+        items = listing_serializer.many(rows)
+        amenity_ids, amenities, images = cls._page_relations([item['id'] for item in items])
+        for item in items:
+            item['amenities'] = [amenities[amenity_id] for amenity_id in amenity_ids.get(item['id'], ())]
+            item['images'] = images.get(item['id'], [])
+        return items
+    
+    @classmethod
+    def page_columnar(cls, rows):
+        """Columnar form of ``page_dicts``: field arrays plus a shared amenity dictionary.
+        
+        Each listing refers to its amenities by id in ``amenity_ids``; the
+        amenity objects are sent once, keyed by id.
+        """
+        columns = listing_serializer.columnar(rows)
+        amenity_ids, amenities, images = cls._page_relations(columns['id'])
+        columns['amenity_ids'] = [amenity_ids.get(listing_id, []) for listing_id in columns['id']]
+        columns['images'] = [images.get(listing_id, []) for listing_id in columns['id']]
+        return columns, amenities
+    
+    def to_dict(self, include_reviews=False, review_limit=None):
+        data = listing_serializer.from_object(self)
+        data['amenities'] = [amenity_serializer.from_object(amenity) for amenity in self.amenities]
+        data['images'] = image_serializer.many(
+            db.session.query(*image_serializer.columns).filter(ListingImage.listing_id == self.id)
+        )
         
         if include_reviews:
-            data['reviews'] = [review.to_dict() for review in self.reviews]
-            
+            # Newest reviews first in reviews_page order, so reviews_next continues where these stop
+            reviews = self.reviews.order_by(Review.created_at.desc(), Review.id.desc())
+            if review_limit is not None:
+                reviews = reviews.limit(review_limit)
+            data['reviews'] = [review_serializer.from_object(review) for review in reviews]
+        
         return data
 
 class ListingImage(db.Model):
@@ -72,17 +180,10 @@ class ListingImage(db.Model):
     caption = db.Column(db.String(256), nullable=True)
     is_primary = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    listing_id = db.Column(db.String(36), db.ForeignKey('listings.id'), nullable=False)
+    listing_id = db.Column(GUID(), db.ForeignKey('listings.id'), nullable=False, index=True)
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'url': self.url,
-            'caption': self.caption,
-            'is_primary': self.is_primary,
-            'created_at': self.created_at.isoformat() + 'Z',
-            'listing_id': self.listing_id
-        }
+        return image_serializer.from_object(self)
 
 class Amenity(db.Model):
     __tablename__ = 'amenities'
@@ -91,9 +192,237 @@ class Amenity(db.Model):
     name = db.Column(db.String(64), nullable=False, unique=True)
     icon = db.Column(db.String(64), nullable=True)  # Font awesome icon name or similar
     
+    def to_dict(self):
+        return amenity_serializer.from_object(self)
+
+listing_serializer = Serializer([
+    ('id', Listing.id),
+    ('title', Listing.title),
+    ('description', Listing.description),
+    ('price', Listing.price),
+    ('bedrooms', Listing.bedrooms),
+    ('bathrooms', Listing.bathrooms),
+    ('square_feet', Listing.square_feet),
+    ('address', Listing.address),
+    ('city', Listing.city),
+    ('state', Listing.state),
+    ('zip_code', Listing.zip_code),
+    ('latitude', Listing.latitude),
+    ('longitude', Listing.longitude),
+    ('is_published', Listing.is_published),
+    ('created_at', Listing.created_at),
+    ('updated_at', Listing.updated_at),
+    ('user_id', Listing.user_id)
+])
+
+image_serializer = Serializer([
+    ('id', ListingImage.id),
+    ('url', ListingImage.url),
+    ('caption', ListingImage.caption),
+    ('is_primary', ListingImage.is_primary),
+    ('created_at', ListingImage.created_at),
+    ('listing_id', ListingImage.listing_id)
+])
+
+amenity_serializer = Serializer([
+    ('id', Amenity.id),
+    ('name', Amenity.name),
+    ('icon', Amenity.icon)
+])
+
+class ListingStat(db.Model):
+    __tablename__ = 'listing_stats'
+    
+    listing_id = db.Column(GUID(), db.ForeignKey('listings.id', ondelete='CASCADE'), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True, index=True)  # Start of the hour the views fall in
+    views = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def add_views(cls, counts):
+        """Upsert a batch of {(listing_id, bucket_start): views} increments."""
+        listing_ids = {listing_id for listing_id, _ in counts}
+        existing_ids = {
+            row[0] for row in db.session.query(Listing.id).filter(Listing.id.in_(listing_ids))
+        }
+        rows = [
+            {'listing_id': listing_id, 'bucket_start': bucket_start, 'views': views}
+            for (listing_id, bucket_start), views in counts.items()
+            if listing_id in existing_ids
+        ]
+        if not rows:
+            return
+        
+        insert = upsert_insert()
+        if insert is not None:
+            stmt = insert(cls)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[cls.listing_id, cls.bucket_start],
+                set_={'views': cls.views + stmt.excluded.views}
+            )
+            db.session.execute(stmt, rows)
+            return
+        
+        for row in rows:
+            updated = cls.query.filter_by(
+                listing_id=row['listing_id'], bucket_start=row['bucket_start']
+            ).update({cls.views: cls.views + row['views']}, synchronize_session=False)
+            if not updated:
+                db.session.add(cls(**row))
+    
+    @classmethod
+    def view_totals(cls, listing_id, since):
+        total, recent = db.session.query(
+            db.func.coalesce(db.func.sum(cls.views), 0),
+            db.func.coalesce(db.func.sum(db.case((cls.bucket_start >= since, cls.views), else_=0)), 0)
+        ).filter(cls.listing_id == listing_id).one()
+        return total, recent
+    
+    @classmethod
+    def trending(cls, since, limit):
+        """The most viewed listings since ``since``: ``listing_serializer.columns`` rows plus ``recent_views``."""
+        recent_views = db.func.sum(cls.views).label('recent_views')
+        return db.session.query(*listing_serializer.columns, recent_views).join(
+            cls, cls.listing_id == Listing.id
+        ).filter(
+            Listing.is_published == True,
+            Listing.deleted_at.is_(None),
+            cls.bucket_start >= since
+        ).group_by(Listing.id).order_by(recent_views.desc()).limit(limit).all()
+
+class ListingRating(db.Model):
+    __tablename__ = 'listing_ratings'
+    
+    # Running review aggregates per listing, maintained on every review write
+    listing_id = db.Column(GUID(), db.ForeignKey('listings.id', ondelete='CASCADE'), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    @classmethod
+    def apply(cls, listing_id, count_delta, sum_delta):
+        """Adjust a listing's aggregates inside the caller's transaction."""
+        now = datetime.utcnow()
+        insert = upsert_insert()
+        if insert is not None:
+            stmt = insert(cls).values(
+                listing_id=listing_id, review_count=count_delta, rating_sum=sum_delta, updated_at=now
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[cls.listing_id],
+                set_={
+                    'review_count': cls.review_count + stmt.excluded.review_count,
+                    'rating_sum': cls.rating_sum + stmt.excluded.rating_sum,
+                    'updated_at': stmt.excluded.updated_at
+                }
+            )
+            db.session.execute(stmt)
+            return
+        
+        updated = cls.query.filter_by(listing_id=listing_id).update({
+            cls.review_count: cls.review_count + count_delta,
+            cls.rating_sum: cls.rating_sum + sum_delta,
+            cls.updated_at: now
+        }, synchronize_session=False)
+        if not updated:
+            db.session.add(cls(listing_id=listing_id, review_count=count_delta,
+                               rating_sum=sum_delta, updated_at=now))
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every listing's aggregates from the reviews table."""
+        db.session.execute(db.delete(cls))
+        aggregates = db.select(
+            Review.listing_id,
+            db.func.count(Review.id),
+            db.func.sum(Review.rating),
+            db.literal(datetime.utcnow(), db.DateTime)
+        ).group_by(Review.listing_id)
+        db.session.execute(db.insert(cls).from_select(
+            ['listing_id', 'review_count', 'rating_sum', 'updated_at'], aggregates
+        ))
+
+class LandlordRollup(db.Model):
+    __tablename__ = 'landlord_rollups'
+    
+    # Portfolio totals per landlord, maintained on listing and review writes
+    user_id = db.Column(GUID(), db.ForeignKey('users.id'), primary_key=True)
+    listing_count = db.Column(db.Integer, nullable=False, default=0)
+    published_count = db.Column(db.Integer, nullable=False, default=0)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    COUNTERS = ('listing_count', 'published_count', 'review_count', 'rating_sum')
+    
+    @classmethod
+    def adjust(cls, user_id, **deltas):
+        """Apply counter deltas to a landlord's rollup inside the caller's transaction."""
+        values = {name: deltas.get(name, 0) for name in cls.COUNTERS}
+        now = datetime.utcnow()
+        insert = upsert_insert()
+        if insert is not None:
+            stmt = insert(cls).values(user_id=user_id, updated_at=now, **values)
+            set_ = {name: getattr(cls, name) + getattr(stmt.excluded, name) for name in cls.COUNTERS}
+            set_['updated_at'] = stmt.excluded.updated_at
+            db.session.execute(stmt.on_conflict_do_update(index_elements=[cls.user_id], set_=set_))
+            return
+        
+        changes = {getattr(cls, name): getattr(cls, name) + delta for name, delta in values.items()}
+        changes[cls.updated_at] = now
+        if not cls.query.filter_by(user_id=user_id).update(changes, synchronize_session=False):
+            db.session.add(cls(user_id=user_id, updated_at=now, **values))
+    
+    @classmethod
+    def adjust_reviews(cls, listing_id, count_delta, sum_delta):
+        # Resolves the landlord inside the UPDATE so review writes need no extra lookup
+        owner = db.select(Listing.user_id).where(Listing.id == listing_id).scalar_subquery()
+        db.session.execute(db.update(cls).where(cls.user_id == owner).values(
+            review_count=cls.review_count + count_delta,
+            rating_sum=cls.rating_sum + sum_delta,
+            updated_at=datetime.utcnow()
+        ))
+    
     def to_dict(self):
         return {
-            'id': self.id,
-            'name': self.name,
-            'icon': self.icon
+            'total_listings': self.listing_count,
+            'published_listings': self.published_count,
+            'unpublished_listings': self.listing_count - self.published_count,
+            'review_count': self.review_count,
+            'average_rating': round(self.rating_sum / self.review_count, 2) if self.review_count else None,
+            'updated_at': self.updated_at.isoformat() + 'Z'
         }
+
+class ListingChange(db.Model):
+    __tablename__ = 'listing_changes'
+    
+    # The id is the change token handed to clients; the change feed assigns it at commit
+    id = db.Column(db.Integer, primary_key=True)
+    listing_id = db.Column(GUID(), nullable=False, index=True)  # No FK: entries outlive deleted listings
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    @classmethod
+    def latest_token(cls):
+        return db.session.query(db.func.max(cls.id)).scalar() or 0
+    
+    @classmethod
+    def since(cls, token, limit):
+        """Latest change token per listing after ``token``, oldest first."""
+        latest = db.func.max(cls.id).label('token')
+        return db.session.query(cls.listing_id, latest).filter(
+            cls.id > token
+        ).group_by(cls.listing_id).order_by(latest).limit(limit).all()
+    
+    @classmethod
+    def expire(cls, before):
+        """Drop entries older than ``before``; returns the highest expired token."""
+        cutoff = db.session.query(db.func.max(cls.id)).filter(cls.changed_at < before).scalar()
+        if cutoff is None:
+            return 0
+        db.session.execute(db.delete(cls).where(cls.id <= cutoff))
+        return cutoff
+    
+    @classmethod
+    def collapse(cls):
+        """Keep only the newest entry per listing; older ones are superseded."""
+        newest = db.select(db.func.max(cls.id)).group_by(cls.listing_id)
+        return db.session.execute(db.delete(cls).where(cls.id.notin_(newest))).rowcount
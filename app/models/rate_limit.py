@@ -0,0 +1,21 @@
+# app/models/rate_limit.py
+from app import db
+
+class RateLimitBucket(db.Model):
+    __tablename__ = 'rate_limit_buckets'
+    
+    # Token-bucket state for the shared rate-limit backend; times are epoch seconds
+    key = db.Column(db.String(255), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False, index=True)
+
+class RateLimitHit(db.Model):
+    __tablename__ = 'rate_limit_hits'
+    __table_args__ = (
+        db.Index('ix_rate_limit_hits_key_at', 'key', 'at'),
+    )
+    
+    # Sliding-window log entries for the shared rate-limit backend
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    at = db.Column(db.Float, nullable=False)
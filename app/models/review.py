@@ -1,31 +1,111 @@
 # app/models/review.py
 from app import db
+from app.models.types import GUID, parse_guid
+from app.models.user import User
+from app.serializers import Serializer
 from datetime import datetime
+import base64
 import uuid
 
+def encode_cursor(created_at, review_id):
+    """Opaque keyset cursor pointing just past the given review."""
+    raw = f'{created_at}|{review_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    """Return (created_at, review_id); raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, review_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), parse_guid(review_id)
+    except ValueError as e:
+        raise ValueError('Invalid cursor') from e
+
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'listing_id', name='uq_reviews_user_listing'),
+        db.Index('ix_reviews_landlord_id_created_at', 'landlord_id', 'created_at'),
+        # A listing's reviews, newest first, with the id tiebreak of the keyset cursor
+        db.Index('ix_reviews_listing_id_created_at', 'listing_id', 'created_at', 'id'),
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(GUID(), primary_key=True, default=lambda: str(uuid.uuid4()))
     content = db.Column(db.Text, nullable=False)
     rating = db.Column(db.Integer, nullable=False)  # 1-5 stars
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    listing_id = db.Column(db.String(36), db.ForeignKey('listings.id'), nullable=False)
+    user_id = db.Column(GUID(), db.ForeignKey('users.id'), nullable=False)
+    listing_id = db.Column(GUID(), db.ForeignKey('listings.id'), nullable=False)
+    landlord_id = db.Column(GUID(), nullable=False)  # Denormalized listings.user_id for dashboards
+    
+    @classmethod
+    def insert_checked(cls, review_id, content, rating, user_id, listing_id, token_version, now):
+        """Insert a review in a single INSERT ... SELECT round trip.
+        
+        The SELECT only yields a row when the listing is live and the author is
+        still verified at the token version their JWT was issued with, so the
+        returned rowcount is 0 if either check fails. Duplicate reviews are left
+        to the (user_id, listing_id) unique constraint and raise IntegrityError.
+        """
+        from app.models.listing import Listing
+        
+        author_is_current = db.exists().where(
+            User.id == user_id,
+            User.is_verified == True,
+            User.token_version == token_version
+        )
+        source = db.select(
+            db.literal(review_id, GUID()), db.literal(content), db.literal(rating),
+            db.literal(now, db.DateTime), db.literal(now, db.DateTime),
+            db.literal(user_id, GUID()), Listing.id, Listing.user_id
+        ).where(
+            Listing.id == listing_id,
+            Listing.deleted_at.is_(None),
+            author_is_current
+        )
+        result = db.session.execute(db.insert(cls).from_select(
+            ['id', 'content', 'rating', 'created_at', 'updated_at', 'user_id', 'listing_id', 'landlord_id'],
+            source
+        ))
+        return result.rowcount
+    
+    @classmethod
+    def recent_for_landlord(cls, landlord_id, limit):
+        """Newest reviews across a landlord's live listings, via the landlord index."""
+        from app.models.listing import Listing
+        
+        return db.session.query(
+            cls.id, cls.content, cls.rating, cls.created_at, cls.user_id,
+            cls.listing_id, Listing.title
+        ).join(Listing, Listing.id == cls.listing_id).filter(
+            cls.landlord_id == landlord_id,
+            Listing.deleted_at.is_(None)
+        ).order_by(cls.created_at.desc()).limit(limit).all()
     
     def to_dict(self, include_user=False):
-        data = {
-            'id': self.id,
-            'content': self.content,
-            'rating': self.rating,
-            'created_at': self.created_at.isoformat() + 'Z',
-            'updated_at': self.updated_at.isoformat() + 'Z',
-            'user_id': self.user_id,
-            'listing_id': self.listing_id
-        }
+        data = review_serializer.from_object(self)
         
         if include_user:
             data['user'] = self.author.to_dict()
             
-        return data
\ No newline at end of file
+        return data
+
+_review_fields = [
+    ('id', Review.id),
+    ('content', Review.content),
+    ('rating', Review.rating),
+    ('created_at', Review.created_at),
+    ('updated_at', Review.updated_at),
+    ('user_id', Review.user_id),
+    ('listing_id', Review.listing_id)
+]
+
+review_serializer = Serializer(_review_fields)
+
+# Review with the compact author block used by review listings
+review_with_author_serializer = Serializer(_review_fields + [
+    ('user.id', Review.user_id),
+    ('user.username', User.username),
+    ('user.is_verified', User.is_verified)
+])
\ No newline at end of file
@@ -0,0 +1,50 @@
+# app/models/types.py
+import uuid
+from sqlalchemy.dialects.postgresql.types import PGUuid
+from app import db
+
+class InvalidIdError(ValueError):
+    """A user, listing or review id that is not a UUID."""
+
+def parse_guid(value):
+    """Return ``value`` as a canonical hyphenated lowercase UUID; raises InvalidIdError.
+    
+    Accepts ``uuid.UUID`` objects and any spelling ``uuid.UUID`` understands
+    (uppercase, with or without hyphens or braces).
+    """
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    try:
+        return str(uuid.UUID(value))
+    except (AttributeError, TypeError, ValueError) as e:
+        raise InvalidIdError(f'Invalid id: {value!r}') from e
+
+class _UncastUuid(PGUuid):
+    # Plain literals compare with both uuid and the old text keys, so the app keeps
+    # working while `flask compact-keys` converts a PostgreSQL database online
+    render_bind_cast = False
+
+class GUID(db.TypeDecorator):
+    """UUID key stored compactly: native ``uuid`` (16 bytes) on PostgreSQL, 32 hex chars elsewhere.
+    
+    Values are hyphenated strings on the Python side, as with the old
+    ``String(36)`` keys. Binding a string that is not a UUID raises
+    InvalidIdError (wrapped in a StatementError by SQLAlchemy); the app turns
+    that into a 404, so handlers can look up path ids without checking them.
+    """
+    
+    impl = db.Uuid
+    cache_ok = True
+    
+    def __init__(self):
+        super().__init__(as_uuid=False)
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(_UncastUuid(as_uuid=False))
+        return super().load_dialect_impl(dialect)
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return parse_guid(value)
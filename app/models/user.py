@@ -1,38 +1,94 @@
 # app/models/user.py
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.models.types import GUID
+from app.serializers import Serializer
+from app.services.password_hasher import password_hasher
 from datetime import datetime
 import uuid
 
 class User(db.Model):
     __tablename__ = 'users'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(GUID(), primary_key=True, default=lambda: str(uuid.uuid4()))
     username = db.Column(db.String(64), index=True, unique=True, nullable=False)
     email = db.Column(db.String(120), index=True, unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='tenant')  # 'tenant', 'landlord', 'admin'
     is_verified = db.Column(db.Boolean, default=False)
+    # Bumped when privileges change so tokens carrying older claims stop working
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Indexed for the user cache, which polls it for users changed by other workers
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     listings = db.relationship('Listing', backref='owner', lazy='dynamic')
     reviews = db.relationship('Review', backref='author', lazy='dynamic')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-        
+        self.password_hash = password_hasher.hash(password)
+    
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
     
-    def to_dict(self):
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
+    
+    def bump_token_version(self):
+        self.token_version = (self.token_version or 0) + 1
+    
+    def token_claims(self):
+        # Carried in access tokens so hot paths can authorize without loading the user
         return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
             'role': self.role,
-            'is_verified': self.is_verified,
-            'created_at': self.created_at.isoformat() + 'Z',
-            'updated_at': self.updated_at.isoformat() + 'Z'
-        }
\ No newline at end of file
+            'username': self.username,
+            'verified': bool(self.is_verified),
+            'ver': self.token_version or 0
+        }
+    
+    def to_dict(self):
+        return user_serializer.from_object(self)
+
+user_serializer = Serializer([
+    ('id', User.id),
+    ('username', User.username),
+    ('email', User.email),
+    ('role', User.role),
+    ('is_verified', User.is_verified),
+    ('created_at', User.created_at),
+    ('updated_at', User.updated_at)
+])
+
+class TokenRevocation(db.Model):
+    __tablename__ = 'token_revocations'
+    
+    # A row revokes either one token (jti) or every token of a user issued
+    # before ``min_version``; expired rows can be pruned since the tokens
+    # they cover no longer verify anyway.
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=True)
+    user_id = db.Column(GUID(), nullable=True, index=True)
+    min_version = db.Column(db.Integer, nullable=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    @classmethod
+    def active(cls, now=None):
+        return cls.query.filter(cls.expires_at > (now or datetime.utcnow()))
+    
+    @classmethod
+    def is_jti_revoked(cls, jti):
+        return db.session.query(cls.query.filter_by(jti=jti).exists()).scalar()
+    
+    @classmethod
+    def covers(cls, user_id, version, jti):
+        """Whether an unexpired row revokes this token, by its jti or its user's minimum version."""
+        matches = cls.user_id == user_id
+        matches = db.and_(matches, cls.min_version > version)
+        if jti is not None:
+            matches = db.or_(cls.jti == jti, matches)
+        return db.session.query(cls.active().filter(matches).exists()).scalar()
+    
+    @classmethod
+    def prune(cls, now=None):
+        return cls.query.filter(cls.expires_at <= (now or datetime.utcnow())).delete(synchronize_session=False)
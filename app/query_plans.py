@@ -0,0 +1,137 @@
+# app/query_plans.py
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import db
+
+# Tables that grow with usage; a full scan of any of them fails the check
+HOT_TABLES = ('listings', 'reviews', 'listing_images', 'listing_amenities', 'users')
+
+# (description, path, role of the caller or None for anonymous requests)
+ENDPOINT_QUERIES = [
+    ('listings page', '/api/listings/', None),
+    ('listings page, filtered', '/api/listings/?city=a&min_price=1&max_price=9999&bedrooms=1&bathrooms=1', None),
+    ('listings page, streamed', '/api/listings/?per_page=60', None),
+    ('listing detail', '/api/listings/{listing_id}', None),
+    ('trending listings', '/api/listings/trending', None),
+    ('search', '/api/search/?q=a&min_bedrooms=1&max_price=9999&amenity_id=1', None),
+    ('listing reviews', '/api/reviews/listing/{listing_id}', None),
+    ('listing reviews, next page', '/api/reviews/listing/{listing_id}?cursor={cursor}', None),
+    ('my listings', '/api/users/me/listings', 'landlord'),
+    ('landlord dashboard', '/api/users/me/dashboard', 'landlord'),
+    ('my reviews', '/api/users/me/reviews', 'tenant')
+]
+
+def _full_scans(connection, statement, parameters, hot_tables):
+    """Return (plan lines, full scans of hot tables) for one captured SELECT."""
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        plan = [row[-1] for row in rows]
+        # "SCAN t" walks the whole table, or a whole index with "USING ... INDEX"; "SEARCH t" seeks
+        scans = [line for line in plan if line.split()[:1] == ['SCAN'] and line.split()[1] in hot_tables]
+        return plan, scans
+    
+    if connection.dialect.name == 'postgresql':
+        # Small test tables are always seq-scanned; forbid it so only unindexable reads remain
+        with connection.begin():
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            plan = [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters)]
+        scans = [line.strip() for line in plan if any(f'Seq Scan on {table}' in line for table in hot_tables)]
+        return plan, scans
+    
+    raise click.ClickException(f'Query plans are not supported for {connection.dialect.name}')
+
+def endpoint_context():
+    """Values for the ``ENDPOINT_QUERIES`` placeholders and a token per caller role."""
+    from app.models.listing import Listing
+    from app.models.review import encode_cursor
+    from app.models.user import User
+    
+    listing = db.session.query(Listing.id).filter(Listing.deleted_at.is_(None)).first()
+    values = {
+        'listing_id': listing.id if listing else 'missing',
+        'cursor': encode_cursor(datetime.utcnow().isoformat(), 'ffffffff-ffff-ffff-ffff-ffffffffffff'),
+    }
+    tokens = {}
+    for role in ('landlord', 'tenant'):
+        user = User.query.filter_by(role=role).first()
+        if user is not None:
+            tokens[role] = create_access_token(identity=user.id, additional_claims=user.token_claims())
+    return values, tokens
+
+def explain_endpoint(app, path, token=None, hot_tables=None):
+    """Call ``path`` in-process and EXPLAIN every SELECT it issues.
+    
+    Returns (status code, [(statement, plan lines, full scans of hot tables)]).
+    The queries are captured from the real request, so the plans follow the
+    endpoint as it changes.
+    """
+    hot_tables = hot_tables or app.config.get('QUERY_PLAN_HOT_TABLES', HOT_TABLES)
+    captured = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+    
+    engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        headers = {'Authorization': 'Bearer ' + token} if token else {}
+        response = app.test_client().get(path, headers=headers)
+        response.get_data()  # Streamed bodies issue their queries while being read
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', capture)
+    
+    plans = []
+    with db.engine.connect() as connection:
+        for statement, parameters in captured:
+            plan, scans = _full_scans(connection, statement, parameters, hot_tables)
+            plans.append((statement, plan, scans))
+    return response.status_code, plans
+
+def check_query_plans(app, verbose=False):
+    """Replay the read endpoints and EXPLAIN every SELECT they issue.
+    
+    Returns a list of (endpoint, statement, scans) for statements that fully
+    scan a hot table.
+    """
+    values, tokens = endpoint_context()
+    failures = []
+    for description, path, role in ENDPOINT_QUERIES:
+        if role is not None and role not in tokens:
+            click.echo(f'skip  {description}: no {role} account to call it with')
+            continue
+        status, plans = explain_endpoint(app, path.format(**values), tokens.get(role))
+        if status >= 500:
+            failures.append((description, path, [f'HTTP {status}']))
+            continue
+        
+        scanned = False
+        for statement, plan, scans in plans:
+            if scans:
+                scanned = True
+                failures.append((description, statement, scans))
+            if verbose or scans:
+                click.echo(f'      {" ".join(statement.split())[:160]}')
+                for line in plan:
+                    click.echo(f'        {line}')
+        click.echo(f'{"FAIL" if scanned else "ok  "}  {description} ({len(plans)} queries)')
+    
+    return failures
+
+@click.command('check-query-plans')
+@click.option('--verbose', is_flag=True, help='Print the plan of every query, not just failing ones.')
+@with_appcontext
+def check_query_plans_command(verbose):
+    """Fail if an endpoint query fully scans listings, reviews, images or users."""
+    # Requests are replayed in-process; throttling would turn them into 429s
+    current_app.config['RATE_LIMIT_ENABLED'] = False
+    failures = check_query_plans(current_app._get_current_object(), verbose=verbose)
+    if failures:
+        raise click.ClickException(f'{len(failures)} quer(ies) scan a hot table')
+    click.echo('No full scans of hot tables')
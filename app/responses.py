@@ -0,0 +1,73 @@
+# app/responses.py
+import itertools
+from math import ceil
+from flask import abort, current_app, g, jsonify, request, stream_with_context
+from sqlalchemy.exc import OperationalError
+from app.routing import replica_router
+
+# Column arrays instead of one object per item; see app.serializers.Serializer.columnar
+COLUMNAR_MIMETYPE = 'application/vnd.apartment.columnar+json'
+
+def wants_columnar():
+    """True when the client prefers the columnar representation over plain JSON."""
+    best = request.accept_mimetypes.best_match(['application/json', COLUMNAR_MIMETYPE], default='application/json')
+    return best == COLUMNAR_MIMETYPE
+
+def list_response(payload, columnar=False):
+    response = jsonify(payload)
+    if columnar:
+        response.mimetype = COLUMNAR_MIMETYPE
+    response.vary.add('Accept')
+    return response
+
+def stream_page(query, page, per_page, encode_batch):
+    """Stream a page of ``query`` as ``{total, pages, page, per_page, items}``.
+    
+    Same body and 404 rules as ``paginate()`` + ``jsonify``, but rows are read
+    from a server-side cursor in batches of ``STREAM_JSON_BATCH_SIZE`` and
+    each batch is encoded (``encode_batch(rows) -> list of dicts``) and sent
+    before the next is fetched, so only one batch is in memory at a time and
+    the envelope goes out before the first row is read. Once the envelope is
+    sent there is no falling back to the primary; a replica that fails then
+    is marked down and the body ends early, which clients see as invalid JSON.
+    """
+    if page < 1 or per_page < 1:
+        abort(404)
+    total = query.order_by(None).count()
+    if page != 1 and (page - 1) * per_page >= total:
+        abort(404)
+    
+    envelope = {
+        'total': total,
+        'pages': ceil(total / per_page) if total else 0,
+        'page': page,
+        'per_page': per_page
+    }
+    batch_size = current_app.config['STREAM_JSON_BATCH_SIZE']
+    rows = query.limit(per_page).offset((page - 1) * per_page).yield_per(batch_size)
+    dumps = current_app.json.dumps
+    # The generator runs after @replica_read has returned, so carry its choice along
+    replica_bind = g.get('replica_bind')
+    
+    def generate():
+        if replica_bind is not None:
+            g.replica_bind = replica_bind
+        yield dumps(envelope, separators=(',', ':'))[:-1] + ',"items":['
+        separator = ''
+        try:
+            remaining = iter(rows)
+            while True:
+                batch = list(itertools.islice(remaining, batch_size))
+                if not batch:
+                    break
+                items = encode_batch(batch)
+                if items:
+                    yield separator + dumps(items, separators=(',', ':'))[1:-1]
+                    separator = ','
+        except OperationalError:
+            if replica_bind is not None:
+                replica_router.mark_down(replica_bind)
+            raise
+        yield ']}'
+    
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
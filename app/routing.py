@@ -0,0 +1,197 @@
+# app/routing.py
+import itertools
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from flask_sqlalchemy.session import Session
+from jwt.exceptions import PyJWTError
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+PIN_COOKIE = 'primary_until'
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+class RoutingSession(Session):
+    """Session that sends reads from ``@replica_read`` views to a replica bind.
+    
+    Flushes, and everything after the first flush in a session, always use the
+    primary so a request never reads from a replica after writing.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get('wrote'):
+            engine = replica_router.engine_for_request(self._db)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_session_wrote(session, flush_context):
+    session.info['wrote'] = True
+
+class ReplicaRouter:
+    """Chooses a healthy read replica for idempotent GET handlers.
+    
+    Replicas are the ``SQLALCHEMY_BINDS`` entries whose key starts with
+    ``replica``. Each one is probed at most every ``REPLICA_CHECK_INTERVAL``
+    seconds; a replica that fails the probe or lags more than
+    ``REPLICA_MAX_LAG`` seconds is skipped until the next probe. After a user
+    writes, their reads stay on the primary for ``READ_YOUR_WRITES_WINDOW``
+    seconds, tracked per worker and via a cookie for clients that keep one.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._cycle = None
+        self._status = {}  # bind key -> (healthy, checked_at, lag)
+        self._pinned = {}  # user id -> monotonic deadline
+    
+    def init_app(self, app):
+        app.config.setdefault('REPLICA_CHECK_INTERVAL', 5)
+        app.config.setdefault('REPLICA_MAX_LAG', 10)
+        app.config.setdefault('READ_YOUR_WRITES_WINDOW', 5)
+        self._keys = sorted(key for key in app.config.get('SQLALCHEMY_BINDS', {}) if key.startswith('replica'))
+        self._cycle = itertools.cycle(self._keys) if self._keys else None
+        # Health and pins from a previous app (e.g. in tests) don't carry over
+        self._status = {}
+        self._pinned = {}
+        app.after_request(self._pin_after_write)
+    
+    @property
+    def replica_keys(self):
+        return list(self._keys)
+    
+    def status(self):
+        return {
+            key: {'healthy': healthy, 'lag': lag}
+            for key, (healthy, _, lag) in self._status.items()
+        }
+    
+    def _probe(self, engine):
+        with engine.connect() as connection:
+            if engine.dialect.name == 'postgresql':
+                lag = connection.execute(text(
+                    'SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)'
+                )).scalar()
+            else:
+                # Local stand-ins (e.g. a copied SQLite file) have no replication lag to report
+                connection.execute(text('SELECT 1'))
+                lag = 0.0
+        return float(lag)
+    
+    def _is_healthy(self, key, engine):
+        healthy, checked_at, _ = self._status.get(key, (False, None, None))
+        now = time.monotonic()
+        if checked_at is not None and now - checked_at < current_app.config['REPLICA_CHECK_INTERVAL']:
+            return healthy
+        
+        try:
+            lag = self._probe(engine)
+            healthy = lag <= current_app.config['REPLICA_MAX_LAG']
+        except OperationalError:
+            lag = None
+            healthy = False
+            current_app.logger.warning('Read replica %s is unavailable', key)
+        
+        self._status[key] = (healthy, now, lag)
+        return healthy
+    
+    def mark_down(self, key):
+        self._status[key] = (False, time.monotonic(), None)
+    
+    def _request_identity(self):
+        if not request.headers.get('Authorization'):
+            return None
+        try:
+            verify_jwt_in_request(optional=True)
+            return get_jwt_identity()
+        except (JWTExtendedException, PyJWTError):
+            return None
+    
+    def _is_pinned(self):
+        try:
+            if float(request.cookies.get(PIN_COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        
+        identity = self._request_identity()
+        if identity is None:
+            return False
+        deadline = self._pinned.get(identity)
+        return deadline is not None and deadline > time.monotonic()
+    
+    def choose(self):
+        """Return the bind key of a healthy replica, or None to use the primary."""
+        if not self._keys or self._is_pinned():
+            return None
+        
+        engines = current_app.extensions['sqlalchemy'].engines
+        with self._lock:
+            candidates = [next(self._cycle) for _ in self._keys]
+        for key in candidates:
+            if self._is_healthy(key, engines[key]):
+                return key
+        return None
+    
+    def engine_for_request(self, db):
+        if not has_request_context():
+            return None
+        key = g.get('replica_bind')
+        if key is None:
+            return None
+        return db.engines[key]
+    
+    def _pin_after_write(self, response):
+        if request.method not in WRITE_METHODS or response.status_code >= 400:
+            return response
+        
+        window = current_app.config['READ_YOUR_WRITES_WINDOW']
+        try:
+            identity = get_jwt_identity()
+        except RuntimeError:
+            identity = None
+        if identity is not None:
+            self._pinned[identity] = time.monotonic() + window
+            # Drop expired pins opportunistically so the map stays small
+            if len(self._pinned) > 10000:
+                now = time.monotonic()
+                self._pinned = {user_id: deadline for user_id, deadline in self._pinned.items() if deadline > now}
+        
+        response.set_cookie(PIN_COOKIE, str(time.time() + window), max_age=int(window) + 1, httponly=True)
+        return response
+
+replica_router = ReplicaRouter()
+
+def replica_read(view):
+    """Serve an idempotent GET handler from a read replica when one is healthy.
+    
+    If the replica fails mid-request, the handler is re-run on the primary.
+    Bodies streamed by ``app.responses.stream_page`` are read after the
+    handler returns, so only their count query has this fallback: a replica
+    failing mid-stream is marked down and the response ends early. Handlers
+    behind ``@jwt_required`` load the user and check revocations before this
+    decorator runs, so they read from the primary unless it is applied first.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = replica_router.choose()
+        if key is None:
+            return view(*args, **kwargs)
+        
+        g.replica_bind = key
+        try:
+            return view(*args, **kwargs)
+        except OperationalError:
+            current_app.extensions['sqlalchemy'].session.rollback()
+            replica_router.mark_down(key)
+            g.replica_bind = None
+            return view(*args, **kwargs)
+        finally:
+            g.pop('replica_bind', None)
+    
+    return wrapper
@@ -0,0 +1,136 @@
+# app/services/amenity_catalog.py
+import hashlib
+import threading
+import time
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import make_transient_to_detached
+from app import db
+from app.models.cache import CacheGeneration
+from app.models.listing import Amenity
+
+class AmenityCatalog:
+    """Process-local copy of the amenity table.
+    
+    The catalog is tiny and rarely changes, so each worker keeps it in memory
+    together with the pre-encoded JSON body served by the amenities endpoint.
+    A generation counter stored in the database is bumped whenever an amenity
+    is created; workers compare it at most once per check interval and reload
+    when it has moved.
+    """
+    
+    GENERATION_KEY = 'amenities'
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._by_id = {}
+        self._by_name = {}
+        self._payload = b'[]'
+        self._etag = None
+        self._checked_at = 0.0
+    
+    def init_app(self, app):
+        app.config.setdefault('AMENITY_CACHE_CHECK_INTERVAL', 5)
+        with app.app_context():
+            try:
+                self.reload()
+            except SQLAlchemyError:
+                # Tables may not exist yet (e.g. before `flask db upgrade`); load lazily
+                db.session.rollback()
+                app.logger.warning('Amenity catalog not loaded at startup')
+    
+    @property
+    def generation(self):
+        return self._generation
+    
+    @property
+    def payload(self):
+        return self._payload
+    
+    @property
+    def etag(self):
+        return self._etag
+    
+    def reload(self):
+        with self._lock:
+            generation = CacheGeneration.current(self.GENERATION_KEY)
+            rows = [amenity.to_dict() for amenity in Amenity.query.order_by(Amenity.id).all()]
+            payload = current_app.json.dumps(rows).encode('utf-8')
+            
+            self._by_id = {row['id']: row for row in rows}
+            self._by_name = {row['name']: row for row in rows}
+            self._payload = payload
+            self._etag = hashlib.sha1(payload).hexdigest()
+            self._generation = generation
+            self._checked_at = time.monotonic()
+    
+    def ensure_fresh(self):
+        interval = current_app.config['AMENITY_CACHE_CHECK_INTERVAL']
+        if self._generation is not None and time.monotonic() - self._checked_at < interval:
+            return
+        
+        if CacheGeneration.current(self.GENERATION_KEY) != self._generation:
+            self.reload()
+        else:
+            self._checked_at = time.monotonic()
+    
+    def invalidate(self):
+        # Mark the amenity catalog as changed for every worker; call before commit
+        CacheGeneration.bump(self.GENERATION_KEY)
+        self._checked_at = 0.0
+    
+    def get(self, amenity_id):
+        return self._by_id.get(amenity_id)
+    
+    def get_by_name(self, name):
+        return self._by_name.get(name)
+    
+    def resolve(self, amenity_ids):
+        """Map amenity ids to session-bound Amenity objects without a SELECT.
+        
+        Repeated ids are resolved once, in their first position. Ids that are
+        not integers (floats, booleans, non-numeric strings) are invalid. An id
+        missing from the catalog triggers one generation check, so an amenity
+        created in another worker is accepted without waiting for the interval.
+        
+        Returns a tuple of (amenities, invalid_ids).
+        """
+        self.ensure_fresh()
+        keys = []
+        invalid_ids = []
+        for amenity_id in amenity_ids:
+            key = _amenity_key(amenity_id)
+            if key is None:
+                invalid_ids.append(amenity_id)
+            elif key not in keys:
+                keys.append(key)
+        
+        if any(key not in self._by_id for key in keys):
+            self._checked_at = 0.0
+            self.ensure_fresh()
+        
+        amenities = []
+        for key in keys:
+            row = self._by_id.get(key)
+            if row is None:
+                invalid_ids.append(key)
+                continue
+            
+            amenity = Amenity(**row)
+            make_transient_to_detached(amenity)
+            amenities.append(db.session.merge(amenity, load=False))
+        
+        return amenities, invalid_ids
+
+def _amenity_key(amenity_id):
+    # JSON integers, or strings of digits as the old IN () query accepted
+    if isinstance(amenity_id, bool):
+        return None
+    if isinstance(amenity_id, int):
+        return amenity_id
+    if isinstance(amenity_id, str) and amenity_id.isdigit():
+        return int(amenity_id)
+    return None
+
+amenity_catalog = AmenityCatalog()
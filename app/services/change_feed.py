@@ -0,0 +1,142 @@
+# app/services/change_feed.py
+from datetime import datetime, timedelta
+from itertools import chain
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from app import db
+from app.models.cache import CacheGeneration
+from app.models.listing import Listing, ListingImage, ListingChange, listing_serializer
+
+class ListingChangeFeed:
+    """Incremental change log for listings.
+    
+    Every transaction that touches a listing, one of its images or its amenity
+    links appends a row per listing to ``listing_changes``. Clients pass back
+    the last token they saw and receive the current state of each listing
+    changed since then, or a tombstone when the listing is gone. Compaction
+    collapses superseded rows and expires old ones; tokens older than the
+    expiry watermark must resync.
+    
+    Tokens are handed out at commit from a counter row that stays locked until
+    the transaction ends, so they increase in commit order: once a token is
+    visible, every lower token is too. With autoincrement ids, a client could
+    sync past the lower id of a transaction that had not committed yet and
+    miss it for good. The lock serializes only the end of listing writes.
+    """
+    
+    WATERMARK_KEY = 'listing_changes'
+    SEQUENCE_KEY = 'listing_changes_seq'
+    
+    def init_app(self, app):
+        app.config.setdefault('LISTING_CHANGES_RETENTION_DAYS', 30)
+        for name, listener in (
+            ('after_flush', self._collect_changes),
+            ('before_commit', self._record_changes),
+            ('after_transaction_end', self._discard_changes)
+        ):
+            if not event.contains(db.session, name, listener):
+                event.listen(db.session, name, listener)
+        app.cli.add_command(compact_listing_changes_command)
+    
+    @staticmethod
+    def _collect_changes(session, flush_context):
+        listing_ids = session.info.setdefault('changed_listings', set())
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if isinstance(obj, Listing):
+                if obj in session.dirty and not session.is_modified(obj):
+                    continue
+                listing_ids.add(obj.id)
+            elif isinstance(obj, ListingImage) and obj.listing_id:
+                listing_ids.add(obj.listing_id)
+    
+    @classmethod
+    def _record_changes(cls, session):
+        # Commit flushes after before_commit fires; flush first so nothing is missed
+        session.flush()
+        listing_ids = sorted(session.info.pop('changed_listings', ()))
+        if not listing_ids:
+            return
+        
+        connection = session.connection()
+        last = cls._reserve_tokens(connection, len(listing_ids))
+        now = datetime.utcnow()
+        connection.execute(ListingChange.__table__.insert(), [
+            {'id': token, 'listing_id': listing_id, 'changed_at': now}
+            for token, listing_id in zip(range(last - len(listing_ids) + 1, last + 1), listing_ids)
+        ])
+    
+    @classmethod
+    def _reserve_tokens(cls, connection, count):
+        """Advance the token counter by ``count``, locking it until commit; returns the new value."""
+        counter = CacheGeneration.__table__
+        key = counter.c.name == cls.SEQUENCE_KEY
+        if not connection.execute(counter.update().where(key).values(generation=counter.c.generation + count)).rowcount:
+            # Databases created without the migration start after the existing entries
+            start = connection.execute(db.select(db.func.max(ListingChange.id))).scalar() or 0
+            connection.execute(counter.insert().values(name=cls.SEQUENCE_KEY, generation=start + count))
+        return connection.execute(db.select(counter.c.generation).where(key)).scalar()
+    
+    @staticmethod
+    def _discard_changes(session, transaction):
+        # Changes of a rolled-back transaction must not leak into the next one
+        if transaction.parent is None:
+            session.info.pop('changed_listings', None)
+    
+    def token_expired(self, token):
+        return token < CacheGeneration.current(self.WATERMARK_KEY)
+    
+    def changes(self, token, limit):
+        rows = ListingChange.since(token, limit)
+        listings = {}
+        hidden = set()
+        if rows:
+            # Plain rows plus one query each for amenities and images across the batch
+            live = db.session.query(*listing_serializer.columns).filter(
+                Listing.id.in_([listing_id for listing_id, _ in rows]),
+                Listing.deleted_at.is_(None),
+                Listing.is_published == True
+            ).all()
+            listings = {item['id']: item for item in Listing.page_dicts(live)}
+            hidden = {row[0] for row in db.session.query(Listing.id).filter(
+                Listing.id.in_([listing_id for listing_id, _ in rows if listing_id not in listings]),
+                Listing.deleted_at.is_(None)
+            )}
+        
+        changes = []
+        for listing_id, change_token in rows:
+            if listing_id in listings:
+                changes.append({
+                    'listing_id': listing_id,
+                    'token': change_token,
+                    'op': 'upsert',
+                    'listing': listings[listing_id]
+                })
+            elif listing_id in hidden:
+                changes.append({'listing_id': listing_id, 'token': change_token, 'op': 'unpublish'})
+            else:
+                changes.append({'listing_id': listing_id, 'token': change_token, 'op': 'delete'})
+        
+        next_token = rows[-1][1] if rows else token
+        return changes, next_token, len(rows) == limit
+    
+    def compact(self, retention_days):
+        expired_token = ListingChange.expire(datetime.utcnow() - timedelta(days=retention_days))
+        if expired_token:
+            CacheGeneration.advance(self.WATERMARK_KEY, expired_token)
+        collapsed = ListingChange.collapse()
+        db.session.commit()
+        return expired_token, collapsed
+
+listing_change_feed = ListingChangeFeed()
+
+@click.command('compact-listing-changes')
+@click.option('--retention-days', type=int, default=None, help='Expire entries older than this.')
+@with_appcontext
+def compact_listing_changes_command(retention_days):
+    """Collapse superseded listing change entries and expire old ones."""
+    if retention_days is None:
+        retention_days = current_app.config['LISTING_CHANGES_RETENTION_DAYS']
+    expired_token, collapsed = listing_change_feed.compact(retention_days)
+    click.echo(f'Expired changes up to token {expired_token}, collapsed {collapsed} superseded entries')
@@ -0,0 +1,173 @@
+# app/services/compression.py
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from flask import request
+
+# zlib wbits per Content-Encoding: gzip framing, and zlib framing for HTTP "deflate"
+WBITS = {'gzip': 31, 'deflate': 15}
+
+class ResponseCompressor:
+    """Negotiated gzip/deflate compression of API responses.
+    
+    Bodies of a compressible mimetype larger than ``COMPRESS_MIN_SIZE`` bytes
+    are compressed with the encoding the client ranks highest. Streamed
+    (generator) responses are compressed chunk by chunk with a sync flush so
+    clients still receive data as it is produced.
+    
+    Responses carrying a strong ETag (the amenity catalog, leaderboards) have
+    the same bytes for the same tag, so their compressed bodies are kept in a
+    small LRU keyed by endpoint, ETag and encoding and reused without
+    recompressing. The ETag is weakened on compressed responses, as the bytes
+    on the wire differ per encoding; If-None-Match still matches it. Partial
+    (206) responses to Range requests are sent uncompressed.
+    
+    Per-endpoint counters of bytes in/out and CPU time spent compressing are
+    kept per worker and exposed through ``stats()``.
+    """
+    
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # (endpoint, etag, encoding) -> compressed body
+        self._stats = {}
+    
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_CACHE_SIZE', 256)
+        app.config.setdefault('COMPRESS_MIMETYPES', ['application/json', 'text/html', 'text/plain', 'text/csv'])
+        self._app = app
+        app.after_request(self._compress)
+    
+    def _encoding(self):
+        accepted = request.accept_encodings
+        best, best_quality = None, 0
+        for encoding in ('gzip', 'deflate'):
+            quality = accepted.quality(encoding)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+    
+    def _compressible(self, response):
+        config = self._app.config
+        return (
+            config['COMPRESS_ENABLED']
+            and request.method != 'HEAD'
+            and 200 <= response.status_code < 300
+            and response.status_code != 204
+            # A range was cut from the identity body; its Content-Range can't describe compressed bytes
+            and response.status_code != 206
+            and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers
+            and (response.mimetype in config['COMPRESS_MIMETYPES'] or (response.mimetype or '').endswith('+json'))
+        )
+    
+    def _compress(self, response):
+        if not self._compressible(response):
+            return response
+        
+        response.vary.add('Accept-Encoding')
+        encoding = self._encoding()
+        if encoding is None:
+            return response
+        
+        if response.is_streamed:
+            response.response = self._stream(response.response, encoding, request.endpoint)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self._app.config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(self._compress_body(body, encoding, response))
+        
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        response.headers['Content-Encoding'] = encoding
+        return response
+    
+    def _compress_body(self, body, encoding, response):
+        endpoint = request.endpoint
+        etag, weak = response.get_etag()
+        key = (endpoint, etag, encoding) if etag and not weak else None
+        
+        if key is not None:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+            if cached is not None:
+                self._record(endpoint, len(body), len(cached), 0.0, cache_hit=True)
+                return cached
+        
+        started = time.thread_time()
+        compressor = zlib.compressobj(self._app.config['COMPRESS_LEVEL'], zlib.DEFLATED, WBITS[encoding])
+        compressed = compressor.compress(body) + compressor.flush()
+        self._record(endpoint, len(body), len(compressed), time.thread_time() - started)
+        
+        if key is not None:
+            with self._lock:
+                self._cache[key] = compressed
+                while len(self._cache) > self._app.config['COMPRESS_CACHE_SIZE']:
+                    self._cache.popitem(last=False)
+        return compressed
+    
+    def _stream(self, chunks, encoding, endpoint):
+        compressor = zlib.compressobj(self._app.config['COMPRESS_LEVEL'], zlib.DEFLATED, WBITS[encoding])
+        size_in = size_out = 0
+        cpu = 0.0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                if not chunk:
+                    continue
+                started = time.thread_time()
+                data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                cpu += time.thread_time() - started
+                size_in += len(chunk)
+                size_out += len(data)
+                yield data
+            data = compressor.flush()
+            size_out += len(data)
+            yield data
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            self._record(endpoint, size_in, size_out, cpu)
+    
+    def _record(self, endpoint, size_in, size_out, cpu, cache_hit=False):
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = {
+                    'responses': 0, 'cache_hits': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0
+                }
+            stats['responses'] += 1
+            stats['cache_hits'] += cache_hit
+            stats['bytes_in'] += size_in
+            stats['bytes_out'] += size_out
+            stats['cpu_seconds'] += cpu
+    
+    def stats(self):
+        """Per-endpoint compression totals for this worker, with bytes saved per CPU millisecond."""
+        with self._lock:
+            report = {}
+            for endpoint, stats in self._stats.items():
+                saved = stats['bytes_in'] - stats['bytes_out']
+                report[endpoint] = dict(
+                    stats,
+                    bytes_saved=saved,
+                    ratio=round(stats['bytes_out'] / stats['bytes_in'], 4) if stats['bytes_in'] else None,
+                    bytes_saved_per_cpu_ms=round(saved / (stats['cpu_seconds'] * 1000)) if stats['cpu_seconds'] else None
+                )
+            return report
+    
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+response_compressor = ResponseCompressor()
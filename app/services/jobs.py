@@ -0,0 +1,234 @@
+# app/services/jobs.py
+import os
+import random
+import socket
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.job import Job
+from app.models.listing import upsert_insert
+
+class JobQueue:
+    """Durable background jobs kept in the ``jobs`` table, with no broker.
+    
+    Handlers are registered by name with ``@job_queue.handler('listings.purge')``;
+    each blueprint keeps its own in a ``jobs`` module. ``enqueue`` adds the
+    row to the caller's session, so a job exists only if the request that
+    scheduled it commits. A ``dedup_key`` makes enqueueing a no-op while an
+    equal job is still queued or running.
+    
+    Workers poll for due jobs and claim each with a conditional UPDATE, so
+    any number of them can share the table without row locks. Failures are
+    retried with exponential backoff and jitter until ``max_attempts``; a
+    job whose worker died is requeued once its claim is older than
+    ``JOB_CLAIM_TIMEOUT``, so handlers must be safe to run twice. Workers run
+    with ``flask worker``, and in every web worker while ``JOBS_RUN_IN_PROCESS``
+    is on.
+    """
+    
+    def __init__(self):
+        self._app = None
+        self._handlers = {}  # name -> (function, max attempts or None)
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+    
+    def init_app(self, app):
+        app.config.setdefault('JOBS_RUN_IN_PROCESS', True)
+        app.config.setdefault('JOB_WORKER_THREADS', 4)
+        app.config.setdefault('JOB_POLL_INTERVAL', 2)
+        app.config.setdefault('JOB_MAX_ATTEMPTS', 5)
+        app.config.setdefault('JOB_RETRY_BASE', 10)
+        app.config.setdefault('JOB_RETRY_MAX', 3600)
+        app.config.setdefault('JOB_CLAIM_TIMEOUT', 600)
+        app.config.setdefault('JOB_RETENTION_DAYS', 7)
+        self._app = app
+        if app.config['JOBS_RUN_IN_PROCESS']:
+            app.before_request(self._ensure_worker)
+        app.cli.add_command(worker_command)
+        app.cli.add_command(prune_jobs_command)
+    
+    def handler(self, name, max_attempts=None):
+        """Register ``function(**payload)`` as the handler for jobs named ``name``."""
+        def decorator(function):
+            self._handlers[name] = (function, max_attempts)
+            return function
+        return decorator
+    
+    def enqueue(self, name, payload=None, dedup_key=None, delay=0):
+        """Schedule a job in the caller's transaction; it runs once that commits."""
+        if name not in self._handlers:
+            raise ValueError(f'Unknown job: {name}')
+        
+        now = datetime.utcnow()
+        values = {
+            'name': name,
+            'payload': payload or {},
+            'dedup_key': dedup_key,
+            'status': 'queued',
+            'attempts': 0,
+            'max_attempts': self._handlers[name][1] or current_app.config['JOB_MAX_ATTEMPTS'],
+            'run_at': now + timedelta(seconds=delay),
+            'created_at': now
+        }
+        if dedup_key is not None:
+            insert = upsert_insert()
+            if insert is not None:
+                db.session.execute(insert(Job).values(**values).on_conflict_do_nothing(
+                    index_elements=[Job.dedup_key]
+                ))
+                return
+            # No ON CONFLICT here: insert in a savepoint and let the unique index turn away a duplicate,
+            # which a check before the insert can't do against a concurrent enqueue
+            try:
+                with db.session.begin_nested():
+                    db.session.add(Job(**values))
+            except IntegrityError:
+                pass
+            return
+        db.session.add(Job(**values))
+    
+    def _ensure_worker(self):
+        # Started lazily so each forked web worker runs its own job thread
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            thread = threading.Thread(target=self.run_worker, args=(1,), name='job-worker', daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+    
+    def run_worker(self, threads, burst=False):
+        """Claim and run jobs on ``threads`` threads until stopped; returns the number run.
+        
+        With ``burst`` the worker returns as soon as no job is due.
+        """
+        worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        poll_interval = self._app.config['JOB_POLL_INTERVAL']
+        processed = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job') as pool:
+            while not self._stop.is_set():
+                done = {future for future in running if future.done()}
+                processed += len(done)
+                running -= done
+                
+                claimed = []
+                if len(running) < threads:
+                    with self._app.app_context():
+                        claimed = self._claim(worker_id, threads - len(running))
+                for job_id in claimed:
+                    running.add(pool.submit(self._execute, worker_id, job_id))
+                
+                if claimed:
+                    continue
+                if burst and not running:
+                    break
+                if running:
+                    wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                else:
+                    self._stop.wait(poll_interval)
+        return processed + len(running)
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _claim(self, worker_id, limit):
+        now = datetime.utcnow()
+        # Jobs claimed by a worker that has since died go back to the queue
+        db.session.query(Job).filter(
+            Job.status == 'running',
+            Job.locked_at < now - timedelta(seconds=self._app.config['JOB_CLAIM_TIMEOUT'])
+        ).update({Job.status: 'queued', Job.locked_by: None, Job.locked_at: None}, synchronize_session=False)
+        
+        due = db.session.query(Job.id).filter(
+            Job.status == 'queued',
+            Job.run_at <= now
+        ).order_by(Job.run_at).limit(limit).all()
+        
+        claimed = []
+        for (job_id,) in due:
+            # Only one worker's UPDATE can still see the job as queued
+            if db.session.query(Job).filter(Job.id == job_id, Job.status == 'queued').update({
+                Job.status: 'running',
+                Job.locked_by: worker_id,
+                Job.locked_at: now,
+                Job.attempts: Job.attempts + 1
+            }, synchronize_session=False):
+                claimed.append(job_id)
+        db.session.commit()
+        return claimed
+    
+    def _execute(self, worker_id, job_id):
+        with self._app.app_context():
+            job = db.session.get(Job, job_id)
+            name, payload, attempts, max_attempts = job.name, job.payload, job.attempts, job.max_attempts
+            db.session.commit()
+            
+            error = None
+            try:
+                if name not in self._handlers:
+                    raise LookupError(f'No handler registered for job {name}')
+                self._handlers[name][0](**payload)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self._app.logger.exception('Job %s (%s) failed on attempt %d', job_id, name, attempts)
+                error = f'{type(e).__name__}: {e}'
+            
+            self._finish(worker_id, job_id, attempts, max_attempts, error)
+    
+    def _finish(self, worker_id, job_id, attempts, max_attempts, error):
+        now = datetime.utcnow()
+        if error is None:
+            values = {Job.status: 'done', Job.finished_at: now, Job.dedup_key: None, Job.last_error: None}
+        elif attempts < max_attempts:
+            # Exponential backoff with jitter so failing jobs don't retry in lockstep
+            delay = min(self._app.config['JOB_RETRY_BASE'] * 2 ** (attempts - 1), self._app.config['JOB_RETRY_MAX'])
+            delay *= random.uniform(0.5, 1.0)
+            values = {Job.status: 'queued', Job.run_at: now + timedelta(seconds=delay), Job.last_error: error}
+        else:
+            values = {Job.status: 'failed', Job.finished_at: now, Job.dedup_key: None, Job.last_error: error}
+        values[Job.locked_by] = None
+        values[Job.locked_at] = None
+        
+        # A claim that timed out and was taken over belongs to the other worker now
+        db.session.query(Job).filter(
+            Job.id == job_id, Job.status == 'running', Job.locked_by == worker_id
+        ).update(values, synchronize_session=False)
+        db.session.commit()
+
+job_queue = JobQueue()
+
+@click.command('worker')
+@click.option('--threads', type=int, default=None, help='Jobs to run at once (default JOB_WORKER_THREADS).')
+@click.option('--burst', is_flag=True, help='Exit once no job is due instead of polling forever.')
+@with_appcontext
+def worker_command(threads, burst):
+    """Run background jobs from the jobs table."""
+    threads = threads or current_app.config['JOB_WORKER_THREADS']
+    try:
+        processed = job_queue.run_worker(threads, burst=burst)
+    except KeyboardInterrupt:
+        job_queue.stop()
+        return
+    click.echo(f'Ran {processed} job(s)')
+
+@click.command('prune-jobs')
+@with_appcontext
+def prune_jobs_command():
+    """Delete finished and failed jobs older than JOB_RETENTION_DAYS."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['JOB_RETENTION_DAYS'])
+    deleted = Job.query.filter(
+        Job.status.in_(['done', 'failed']),
+        Job.finished_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f'Pruned {deleted} job(s)')
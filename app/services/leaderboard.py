@@ -0,0 +1,283 @@
+# app/services/leaderboard.py
+import bisect
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models.listing import Listing, ListingRating, ListingChange
+from app.services.change_feed import listing_change_feed
+
+class _Segment:
+    __slots__ = ('entries',)
+    
+    def __init__(self):
+        # Sorted ascending on (-score, -review_count, listing_id), i.e. best first
+        self.entries = []
+
+class Leaderboard:
+    """Top-rated listings ranked by Bayesian average, per city x bedrooms.
+    
+    Each listing is placed in four segments: (city, bedrooms), (city, any),
+    (any, bedrooms) and (any, any), each a sorted list so a top-k read is a
+    slice. Review writes update ``listing_ratings`` in their transaction and
+    re-place the listing in this worker immediately; other workers pick up
+    rating rows and listing changes (via the change feed) on their next sync.
+    
+    The Bayesian score is (C * m + sum) / (C + n), where C is
+    ``LEADERBOARD_PRIOR_WEIGHT`` and m is the mean rating across all reviews.
+    m is only recomputed on a bulk rebuild (every
+    ``LEADERBOARD_REBUILD_INTERVAL`` seconds) so that incremental updates
+    never reorder listings that did not change.
+    
+    Bulk rebuilds run on a background thread in each worker, which swaps in
+    the new segments when done; ``top`` serves the last snapshot meanwhile,
+    and nothing until a worker's first rebuild finishes. Rating rows are
+    re-read with ``LEADERBOARD_SYNC_OVERLAP`` seconds of overlap for
+    transactions that commit after their timestamp; a row committed later
+    than that is picked up by the next rebuild. On in-memory SQLite, whose
+    one connection is shared by every thread, rebuilds run inline.
+    """
+    
+    # Prior mean used until there are reviews to average (midpoint of 1-5 stars)
+    DEFAULT_PRIOR_MEAN = 3.0
+    
+    def __init__(self):
+        self._app = None
+        self._pid = None
+        self._background = False
+        self._start_lock = threading.Lock()
+        self._rebuild_requested = threading.Event()
+        self._lock = threading.RLock()
+        self._segments = {}
+        self._placed = {}  # listing_id -> (entry, segment keys)
+        self._details = {}
+        self._prior_mean = 0.0
+        self._loaded = False
+        self._ratings_seen = None
+        self._change_token = 0
+        self._synced_at = 0.0
+        self._rebuilt_at = 0.0
+    
+    def init_app(self, app):
+        app.config.setdefault('LEADERBOARD_PRIOR_WEIGHT', 5)
+        app.config.setdefault('LEADERBOARD_SYNC_INTERVAL', 2)
+        app.config.setdefault('LEADERBOARD_REBUILD_INTERVAL', 3600)
+        app.config.setdefault('LEADERBOARD_SYNC_OVERLAP', 30)
+        self._app = app
+        # Rankings loaded for a previous app (e.g. in tests) don't carry over
+        self._pid = None
+        self._loaded = False
+        self._segments = {}
+        with app.app_context():
+            url = db.engine.url
+        self._background = not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'))
+        if self._background:
+            app.before_request(self._ensure_worker)
+        app.cli.add_command(rebuild_leaderboard_command)
+    
+    def _ensure_worker(self):
+        # Started lazily so each forked worker rebuilds its own rankings
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            thread = threading.Thread(target=self._run, args=(self._app,), name='leaderboard-rebuild', daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+    
+    def _run(self, app):
+        while True:
+            interval = app.config['LEADERBOARD_REBUILD_INTERVAL']
+            with app.app_context():
+                try:
+                    self.rebuild()
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    app.logger.exception('Failed to rebuild the leaderboard')
+                    interval = app.config['LEADERBOARD_SYNC_INTERVAL']
+            self._rebuild_requested.wait(interval)
+            self._rebuild_requested.clear()
+    
+    @staticmethod
+    def segment_key(city, bedrooms):
+        return (city.strip().lower() if city else None, bedrooms)
+    
+    def _columns(self):
+        return db.session.query(
+            Listing.id, Listing.title, Listing.city, Listing.bedrooms, Listing.price,
+            Listing.is_published, Listing.deleted_at,
+            ListingRating.review_count, ListingRating.rating_sum, ListingRating.updated_at
+        )
+    
+    def _remove(self, listing_id):
+        placed = self._placed.pop(listing_id, None)
+        self._details.pop(listing_id, None)
+        if placed is None:
+            return
+        entry, keys = placed
+        for key in keys:
+            entries = self._segments[key].entries
+            index = bisect.bisect_left(entries, entry)
+            if index < len(entries) and entries[index] == entry:
+                del entries[index]
+    
+    def _rank(self, row, prior_mean):
+        """The (entry, segment keys, details) of a row, or None if it is not ranked."""
+        if not row.is_published or row.deleted_at is not None or not row.review_count:
+            return None
+        
+        weight = current_app.config['LEADERBOARD_PRIOR_WEIGHT']
+        score = (weight * prior_mean + row.rating_sum) / (weight + row.review_count)
+        entry = (-score, -row.review_count, row.id)
+        keys = {
+            self.segment_key(row.city, row.bedrooms),
+            self.segment_key(row.city, None),
+            self.segment_key(None, row.bedrooms),
+            self.segment_key(None, None)
+        }
+        return entry, keys, {
+            'listing_id': row.id,
+            'title': row.title,
+            'city': row.city,
+            'bedrooms': row.bedrooms,
+            'price': row.price,
+            'review_count': row.review_count,
+            'average_rating': round(row.rating_sum / row.review_count, 2),
+            'score': round(score, 4)
+        }
+    
+    def _place(self, row):
+        self._remove(row.id)
+        ranked = self._rank(row, self._prior_mean)
+        if ranked is None:
+            return
+        
+        entry, keys, details = ranked
+        for key in keys:
+            segment = self._segments.get(key)
+            if segment is None:
+                segment = self._segments[key] = _Segment()
+            bisect.insort(segment.entries, entry)
+        self._placed[row.id] = (entry, keys)
+        self._details[row.id] = details
+    
+    def rebuild(self):
+        """Reload every rated listing and swap in freshly built segments."""
+        change_token = ListingChange.latest_token()
+        rows = self._columns().join(
+            ListingRating, ListingRating.listing_id == Listing.id
+        ).filter(ListingRating.review_count > 0).all()
+        
+        total = sum(row.review_count for row in rows)
+        prior_mean = sum(row.rating_sum for row in rows) / total if total else self.DEFAULT_PRIOR_MEAN
+        segments, placed, details = {}, {}, {}
+        for row in rows:
+            ranked = self._rank(row, prior_mean)
+            if ranked is None:
+                continue
+            entry, keys, row_details = ranked
+            placed[row.id] = (entry, keys)
+            details[row.id] = row_details
+            for key in keys:
+                segments.setdefault(key, _Segment()).entries.append(entry)
+        for segment in segments.values():
+            segment.entries.sort()
+        
+        with self._lock:
+            self._prior_mean = prior_mean
+            self._segments = segments
+            self._placed = placed
+            self._details = details
+            self._ratings_seen = max((row.updated_at for row in rows), default=datetime.utcnow())
+            self._change_token = change_token
+            # Writes refreshed into the old segments while these were built are replayed by the next sync
+            self._synced_at = 0.0
+            self._rebuilt_at = time.monotonic()
+            self._loaded = True
+    
+    def refresh(self, listing_ids):
+        """Re-place the given listings from their current rows."""
+        if not self._loaded or not listing_ids:
+            return
+        with self._lock:
+            rows = self._columns().outerjoin(
+                ListingRating, ListingRating.listing_id == Listing.id
+            ).filter(Listing.id.in_(list(listing_ids))).all()
+            found = set()
+            for row in rows:
+                self._place(row)
+                found.add(row.id)
+            for listing_id in set(listing_ids) - found:
+                self._remove(listing_id)
+    
+    def sync(self):
+        if not self._background and (
+            not self._loaded
+            or time.monotonic() - self._rebuilt_at >= current_app.config['LEADERBOARD_REBUILD_INTERVAL']
+        ):
+            self.rebuild()
+        if not self._loaded or time.monotonic() - self._synced_at < current_app.config['LEADERBOARD_SYNC_INTERVAL']:
+            return
+        
+        with self._lock:
+            if listing_change_feed.token_expired(self._change_token):
+                # Too far behind to replay; keep serving this snapshot until the rebuild lands
+                if self._background:
+                    self._rebuild_requested.set()
+                else:
+                    self.rebuild()
+                return
+            
+            overlap = timedelta(seconds=current_app.config['LEADERBOARD_SYNC_OVERLAP'])
+            changed = {
+                row.listing_id: row.updated_at
+                for row in db.session.query(ListingRating.listing_id, ListingRating.updated_at).filter(
+                    ListingRating.updated_at >= self._ratings_seen - overlap
+                )
+            }
+            if changed:
+                self._ratings_seen = max(self._ratings_seen, max(changed.values()))
+            
+            listing_ids = set(changed)
+            latest_token = self._change_token
+            for listing_id, token in ListingChange.since(self._change_token, limit=None):
+                listing_ids.add(listing_id)
+                latest_token = max(latest_token, token)
+            
+            self.refresh(listing_ids)
+            self._change_token = latest_token
+            self._synced_at = time.monotonic()
+    
+    def top(self, city=None, bedrooms=None, limit=10):
+        self.sync()
+        key = self.segment_key(city, bedrooms)
+        # Segments and details are swapped together by a rebuild, so read both under the lock
+        with self._lock:
+            segment = self._segments.get(key)
+            if segment is None:
+                return []
+            return [self._details[listing_id] for _, _, listing_id in segment.entries[:limit]]
+    
+    @property
+    def prior_mean(self):
+        return self._prior_mean
+    
+    def __len__(self):
+        return len(self._placed)
+
+leaderboard = Leaderboard()
+
+@click.command('rebuild-leaderboard')
+@with_appcontext
+def rebuild_leaderboard_command():
+    """Recompute listing rating aggregates from reviews."""
+    ListingRating.rebuild()
+    db.session.commit()
+    leaderboard.rebuild()
+    click.echo(f'Rebuilt ratings for {len(leaderboard)} ranked listing(s)')
@@ -0,0 +1,72 @@
+# app/services/listing_purger.py
+import click
+from flask.cli import with_appcontext
+from app import db
+from app.models.listing import Listing, ListingImage, ListingStat, ListingRating, listing_amenities
+from app.models.review import Review
+
+class ListingPurger:
+    """Removal of soft-deleted listings.
+    
+    ``delete_listing`` only stamps ``deleted_at`` and enqueues a
+    ``listings.purge`` job, which removes the listing's reviews and images with
+    chunked, set-based DELETEs, committing after each chunk so no single
+    transaction holds a long write lock. The job queue retries failed purges;
+    ``flask purge-listings`` sweeps up any listing left behind, such as one
+    whose job ran out of attempts.
+    """
+    
+    def __init__(self):
+        self._app = None
+    
+    def init_app(self, app):
+        app.config.setdefault('LISTING_PURGE_CHUNK_SIZE', 500)
+        self._app = app
+        app.cli.add_command(purge_listings_command)
+    
+    def _delete_in_chunks(self, model, key, listing_id, chunk_size):
+        # DELETE ... WHERE pk IN (SELECT pk ... LIMIT n) keeps each statement short
+        deleted = 0
+        while True:
+            chunk = db.select(key).where(model.listing_id == listing_id).limit(chunk_size).scalar_subquery()
+            result = db.session.execute(db.delete(model).where(key.in_(chunk)))
+            db.session.commit()
+            deleted += result.rowcount
+            if result.rowcount < chunk_size:
+                return deleted
+    
+    def purge(self, listing_id):
+        chunk_size = self._app.config['LISTING_PURGE_CHUNK_SIZE']
+        
+        self._delete_in_chunks(Review, Review.id, listing_id, chunk_size)
+        self._delete_in_chunks(ListingImage, ListingImage.id, listing_id, chunk_size)
+        
+        db.session.execute(db.delete(listing_amenities).where(listing_amenities.c.listing_id == listing_id))
+        db.session.execute(db.delete(ListingStat).where(ListingStat.listing_id == listing_id))
+        db.session.execute(db.delete(ListingRating).where(ListingRating.listing_id == listing_id))
+        db.session.execute(db.delete(Listing).where(Listing.id == listing_id, Listing.deleted_at.isnot(None)))
+        db.session.commit()
+    
+    def purge_pending(self, limit=100):
+        listing_ids = [
+            row[0] for row in db.session.query(Listing.id).filter(
+                Listing.deleted_at.isnot(None)
+            ).order_by(Listing.deleted_at).limit(limit)
+        ]
+        for listing_id in listing_ids:
+            self.purge(listing_id)
+        return len(listing_ids)
+
+listing_purger = ListingPurger()
+
+@click.command('purge-listings')
+@with_appcontext
+def purge_listings_command():
+    """Remove soft-deleted listings and their reviews and images."""
+    total = 0
+    while True:
+        purged = listing_purger.purge_pending()
+        total += purged
+        if not purged:
+            break
+    click.echo(f'Purged {total} listing(s)')
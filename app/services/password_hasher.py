@@ -0,0 +1,130 @@
+# app/services/password_hasher.py
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, jsonify
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# Longest stored hash allowed by users.password_hash
+MAX_HASH_LENGTH = 255
+
+def canonical_method(method):
+    """Return (method with every parameter spelled out, hex digest length).
+    
+    Werkzeug fills in defaults for omitted parameters and stores the full
+    form, so ``pbkdf2`` is stored as ``pbkdf2:sha256:600000``. Only pbkdf2
+    and scrypt are accepted; the other werkzeug methods are deprecated.
+    """
+    name, *args = method.split(':')
+    if name == 'pbkdf2' and len(args) <= 2:
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}', hashlib.new(hash_name).digest_size * 2
+    if name == 'scrypt' and len(args) in (0, 3):
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}', 128
+    raise ValueError(f'Unsupported password hash method: {method}')
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash or verify calls are already queued."""
+
+class PasswordHasher:
+    """Runs password hashing and verification in a bounded process pool.
+    
+    Each hash keeps a core busy for tens of milliseconds, and scrypt also
+    allocates tens of megabytes per call (128 * n * r bytes), so a burst of
+    logins hashed on request threads would tie up those threads and grow the
+    worker's memory with every concurrent call. Calls are handed to a small
+    process pool instead, which caps the CPU and memory spent on hashing and
+    keeps it off the threads serving other requests; once
+    ``PASSWORD_HASH_MAX_PENDING`` calls are in flight new ones fail fast with
+    ``PasswordHasherBusy`` (served as a 503) rather than queueing unbounded.
+    Set ``PASSWORD_HASH_WORKERS`` to 0 to hash inline.
+    
+    Pool processes are started from a fork server, never forked from the
+    worker itself: gunicorn's gthread workers are multithreaded, and a fork
+    can copy a lock held by another thread into the child, deadlocking it.
+    """
+    
+    def __init__(self):
+        self._pool = None
+        self._pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+        app.config.setdefault('PASSWORD_SALT_LENGTH', 16)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 32)
+        method, digest_length = canonical_method(app.config['PASSWORD_HASH_METHOD'])
+        if len(method) + app.config['PASSWORD_SALT_LENGTH'] + digest_length + 2 > MAX_HASH_LENGTH:
+            raise ValueError(f'Hashes made with {method} do not fit in {MAX_HASH_LENGTH} characters')
+        # A pool started for a previous app (e.g. in tests) may use other settings
+        self.shutdown()
+        self._pid = None
+        app.register_error_handler(PasswordHasherBusy, self._busy_response)
+        atexit.register(self.shutdown)
+    
+    @staticmethod
+    def _busy_response(error):
+        response = jsonify({'error': 'Server is busy, please retry shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    def _ensure_pool(self):
+        # Created lazily so each forked gunicorn worker owns its own pool
+        if self._pid == os.getpid():
+            return self._pool
+        with self._lock:
+            if self._pid != os.getpid():
+                workers = current_app.config['PASSWORD_HASH_WORKERS']
+                self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) if workers else None
+                self._slots = threading.BoundedSemaphore(current_app.config['PASSWORD_HASH_MAX_PENDING'])
+                self._pid = os.getpid()
+        return self._pool
+    
+    def _run(self, func, *args):
+        pool = self._ensure_pool()
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            if pool is None:
+                return func(*args)
+            return pool.submit(func, *args).result()
+        finally:
+            self._slots.release()
+    
+    def hash(self, password):
+        return self._run(
+            generate_password_hash, password,
+            current_app.config['PASSWORD_HASH_METHOD'],
+            current_app.config['PASSWORD_SALT_LENGTH']
+        )
+    
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+    
+    def needs_rehash(self, password_hash):
+        # Hashes are stored as "<method>$<salt>$<hash>"; any parameter change triggers a rehash
+        method, _, rest = password_hash.partition('$')
+        salt = rest.partition('$')[0]
+        return (
+            method != canonical_method(current_app.config['PASSWORD_HASH_METHOD'])[0]
+            or len(salt) != current_app.config['PASSWORD_SALT_LENGTH']
+        )
+    
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pid = None
+
+def _pool_context():
+    start_methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in start_methods else 'spawn')
+
+password_hasher = PasswordHasher()
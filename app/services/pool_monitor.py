@@ -0,0 +1,73 @@
+# app/services/pool_monitor.py
+import threading
+from sqlalchemy import event, text
+from app import db
+
+class PoolMonitor:
+    """Connection-pool instrumentation and per-connection setup for every engine.
+    
+    SQLite connections get ``SQLITE_PRAGMAS`` applied when they are opened.
+    Pool checkouts and checkins are counted per engine so ``status()`` can
+    report how close each worker has come to ``pool_size + max_overflow``;
+    ``/api/health/ready`` exposes it alongside the pool's own occupancy.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}  # bind key -> counters
+    
+    def init_app(self, app):
+        app.config.setdefault('SQLITE_PRAGMAS', {})
+        with app.app_context():
+            for key, engine in db.engines.items():
+                self._instrument(app, key or 'default', engine)
+    
+    def _instrument(self, app, name, engine):
+        stats = self._stats[name] = {'checkouts': 0, 'in_use': 0, 'peak_in_use': 0, 'connects': 0}
+        pragmas = app.config['SQLITE_PRAGMAS'] if engine.dialect.name == 'sqlite' else {}
+        
+        @event.listens_for(engine, 'connect')
+        def on_connect(dbapi_connection, connection_record):
+            if pragmas:
+                cursor = dbapi_connection.cursor()
+                for pragma, value in pragmas.items():
+                    cursor.execute(f'PRAGMA {pragma} = {value}')
+                cursor.close()
+            with self._lock:
+                stats['connects'] += 1
+        
+        @event.listens_for(engine, 'checkout')
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                stats['checkouts'] += 1
+                stats['in_use'] += 1
+                stats['peak_in_use'] = max(stats['peak_in_use'], stats['in_use'])
+        
+        @event.listens_for(engine, 'checkin')
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                stats['in_use'] = max(stats['in_use'] - 1, 0)
+    
+    def status(self):
+        """Pool occupancy and counters for each engine in this worker."""
+        report = {}
+        for key, engine in db.engines.items():
+            name = key or 'default'
+            pool = engine.pool
+            with self._lock:
+                entry = dict(self._stats.get(name, {}))
+            entry['pool'] = type(pool).__name__
+            # Queue-based pools report their sizing; SQLite's static/singleton pools do not
+            for attribute in ('size', 'checkedin', 'checkedout', 'overflow'):
+                method = getattr(pool, attribute, None)
+                if method is not None:
+                    entry[attribute] = method()
+            report[name] = entry
+        return report
+    
+    def ping(self):
+        """Run ``SELECT 1`` on the primary; raises if it is unreachable."""
+        with db.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+
+pool_monitor = PoolMonitor()
@@ -0,0 +1,316 @@
+# app/services/rate_limiter.py
+import math
+import threading
+import time
+from collections import deque
+import click
+from flask import current_app, jsonify, request
+from flask.cli import with_appcontext
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.rate_limit import RateLimitBucket, RateLimitHit
+
+DEFAULT_POLICIES = {
+    # Endpoint policies take precedence over their blueprint's policy
+    'auth.login': {'algorithm': 'sliding_window', 'limit': 10, 'period': 60, 'key': 'ip'},
+    'auth.register': {'algorithm': 'sliding_window', 'limit': 5, 'period': 3600, 'key': 'ip'},
+    'auth': {'algorithm': 'token_bucket', 'limit': 30, 'period': 60, 'key': 'ip'},
+    'reviews': {'algorithm': 'token_bucket', 'limit': 20, 'period': 60, 'key': 'user',
+                'methods': ['POST', 'PUT', 'DELETE']},
+    'listings': {'algorithm': 'token_bucket', 'limit': 30, 'period': 60, 'key': 'user',
+                 'methods': ['POST', 'PUT', 'DELETE']}
+}
+
+class TokenBucket:
+    """Allows bursts of ``limit`` requests, refilled evenly over ``period`` seconds."""
+    
+    __slots__ = ('limit', 'period', 'rate')
+    
+    def __init__(self, limit, period):
+        self.limit = float(limit)
+        self.period = period
+        self.rate = limit / period
+    
+    def new_state(self, now):
+        return [self.limit, now]
+    
+    def consume(self, state, now):
+        """Take one token; return 0 if allowed, else seconds until one is available."""
+        tokens = min(self.limit, state[0] + (now - state[1]) * self.rate)
+        state[1] = now
+        if tokens >= 1:
+            state[0] = tokens - 1
+            return 0
+        state[0] = tokens
+        return (1 - tokens) / self.rate
+    
+    def idle(self, state, now):
+        return now - state[1] >= self.period
+
+class SlidingWindowLog:
+    """Allows at most ``limit`` requests in any ``period``-second window."""
+    
+    __slots__ = ('limit', 'period')
+    
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+    
+    def new_state(self, now):
+        return deque(maxlen=self.limit)
+    
+    def consume(self, state, now):
+        # Each timestamp is appended and evicted once, so this is amortized O(1)
+        cutoff = now - self.period
+        while state and state[0] <= cutoff:
+            state.popleft()
+        if len(state) < self.limit:
+            state.append(now)
+            return 0
+        return state[0] - cutoff
+    
+    def idle(self, state, now):
+        return not state or now - state[-1] >= self.period
+
+ALGORITHMS = {
+    'token_bucket': TokenBucket,
+    'sliding_window': SlidingWindowLog
+}
+
+class RateLimitPolicy:
+    __slots__ = ('name', 'algorithm', 'key', 'methods')
+    
+    def __init__(self, name, algorithm='token_bucket', limit=60, period=60, key='ip', methods=None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f'Unknown rate limit algorithm: {algorithm}')
+        if key not in ('ip', 'user', 'route'):
+            raise ValueError(f'Unknown rate limit key: {key}')
+        self.name = name
+        self.algorithm = ALGORITHMS[algorithm](limit, period)
+        self.key = key
+        self.methods = frozenset(methods) if methods else None
+
+class _Shard:
+    __slots__ = ('lock', 'entries')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> (policy, state)
+
+class MemoryBackend:
+    """Per-worker limiter state; limits apply to each gunicorn worker separately."""
+    
+    SHARD_COUNT = 16
+    
+    def __init__(self, max_keys):
+        self._shards = [_Shard() for _ in range(self.SHARD_COUNT)]
+        self._shard_limit = max(max_keys // self.SHARD_COUNT, 1)
+    
+    def hit(self, policy, key, now):
+        shard = self._shards[hash(key) % self.SHARD_COUNT]
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                if len(shard.entries) >= self._shard_limit:
+                    self._evict(shard, now)
+                entry = shard.entries[key] = (policy, policy.algorithm.new_state(now))
+            return policy.algorithm.consume(entry[1], now)
+    
+    @staticmethod
+    def _evict(shard, now):
+        idle = [key for key, (policy, state) in shard.entries.items() if policy.algorithm.idle(state, now)]
+        for key in idle:
+            del shard.entries[key]
+        # Still full of active clients: drop the oldest half rather than grow without bound
+        if not idle:
+            for key in list(shard.entries)[:len(shard.entries) // 2]:
+                del shard.entries[key]
+    
+    def reset(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+
+class DatabaseBackend:
+    """Limiter state shared by all workers, kept in ``rate_limit_*`` tables.
+    
+    Runs on its own short transaction per check, outside the request session.
+    The sliding-window insert is a single conditional statement, so concurrent
+    workers can overshoot the limit only by the requests racing on that row.
+    """
+    
+    def hit(self, policy, key, now):
+        algorithm = policy.algorithm
+        with db.engine.begin() as connection:
+            if isinstance(algorithm, TokenBucket):
+                return self._consume_token(connection, algorithm, key, now)
+            return self._log_hit(connection, algorithm, key, now)
+    
+    @staticmethod
+    def _consume_token(connection, bucket, key, now):
+        table = RateLimitBucket.__table__
+        refilled = table.c.tokens + (now - table.c.updated_at) * bucket.rate
+        available = case((refilled > bucket.limit, bucket.limit), else_=refilled)
+        updated = connection.execute(
+            table.update().where(table.c.key == key, available >= 1).values(
+                tokens=available - 1, updated_at=now
+            )
+        ).rowcount
+        if updated:
+            return 0
+        
+        if connection.dialect.name in ('postgresql', 'sqlite'):
+            if connection.dialect.name == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            inserted = connection.execute(
+                insert(table).values(key=key, tokens=bucket.limit - 1, updated_at=now).on_conflict_do_nothing()
+            ).rowcount
+        else:
+            try:
+                with connection.begin_nested():
+                    inserted = connection.execute(
+                        table.insert().values(key=key, tokens=bucket.limit - 1, updated_at=now)
+                    ).rowcount
+            except IntegrityError:
+                inserted = 0
+        if inserted:
+            return 0
+        
+        tokens, updated_at = connection.execute(
+            select(table.c.tokens, table.c.updated_at).where(table.c.key == key)
+        ).one()
+        tokens = min(bucket.limit, tokens + (now - updated_at) * bucket.rate)
+        return max((1 - tokens) / bucket.rate, 0.001)
+    
+    @staticmethod
+    def _log_hit(connection, window, key, now):
+        table = RateLimitHit.__table__
+        cutoff = now - window.period
+        connection.execute(table.delete().where(table.c.key == key, table.c.at <= cutoff))
+        recent = select(func.count()).select_from(table).where(table.c.key == key).scalar_subquery()
+        inserted = connection.execute(
+            table.insert().from_select(
+                ['key', 'at'],
+                select(literal(key), literal(now)).where(recent < window.limit)
+            )
+        ).rowcount
+        if inserted:
+            return 0
+        
+        oldest = connection.execute(select(func.min(table.c.at)).where(table.c.key == key)).scalar()
+        return max(oldest - cutoff, 0.001) if oldest is not None else 0.001
+    
+    def reset(self):
+        with db.engine.begin() as connection:
+            connection.execute(RateLimitBucket.__table__.delete())
+            connection.execute(RateLimitHit.__table__.delete())
+
+class RateLimiter:
+    """Per-endpoint and per-blueprint request throttling.
+    
+    ``RATE_LIMIT_POLICIES`` maps an endpoint (``auth.login``) or blueprint
+    (``reviews``) name to a policy: a token bucket or sliding-window log of
+    ``limit`` requests per ``period`` seconds, keyed by client IP, by JWT user
+    (falling back to IP for anonymous requests) or by route alone, optionally
+    restricted to some HTTP methods. ``RATE_LIMIT_BACKEND`` is ``memory``
+    (per worker) or ``database`` (shared across workers).
+    
+    Policies are resolved once per endpoint and cached, so an allowed request
+    costs a dict lookup, one locked state update and no response changes.
+    """
+    
+    def __init__(self):
+        self._policies = {}
+        self._resolved = {}
+        self._backend = None
+    
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_ENABLED', True)
+        app.config.setdefault('RATE_LIMIT_BACKEND', 'memory')
+        app.config.setdefault('RATE_LIMIT_MAX_KEYS', 100000)
+        app.config.setdefault('RATE_LIMIT_POLICIES', DEFAULT_POLICIES)
+        
+        self._policies = {
+            name: RateLimitPolicy(name, **options)
+            for name, options in app.config['RATE_LIMIT_POLICIES'].items()
+        }
+        self._resolved = {}
+        backend = app.config['RATE_LIMIT_BACKEND']
+        if backend == 'memory':
+            self._backend = MemoryBackend(app.config['RATE_LIMIT_MAX_KEYS'])
+        elif backend == 'database':
+            self._backend = DatabaseBackend()
+        else:
+            raise ValueError(f'Unknown rate limit backend: {backend}')
+        
+        app.before_request(self._check)
+        app.cli.add_command(prune_rate_limits_command)
+    
+    def policy_for(self, endpoint, blueprint):
+        try:
+            return self._resolved[endpoint]
+        except KeyError:
+            policy = self._policies.get(endpoint) or self._policies.get(blueprint)
+            self._resolved[endpoint] = policy
+            return policy
+    
+    @staticmethod
+    def _identity():
+        if request.headers.get('Authorization'):
+            try:
+                verify_jwt_in_request(optional=True)
+                identity = get_jwt_identity()
+            except (JWTExtendedException, PyJWTError):
+                identity = None
+            if identity is not None:
+                return 'user:' + identity
+        return request.remote_addr or 'unknown'
+    
+    def _check(self):
+        if not current_app.config['RATE_LIMIT_ENABLED'] or request.method == 'OPTIONS':
+            return None
+        policy = self.policy_for(request.endpoint, request.blueprint)
+        if policy is None or (policy.methods is not None and request.method not in policy.methods):
+            return None
+        
+        if policy.key == 'ip':
+            key = policy.name + ':' + (request.remote_addr or 'unknown')
+        elif policy.key == 'user':
+            key = policy.name + ':' + self._identity()
+        else:
+            key = policy.name
+        
+        retry_after = self._backend.hit(policy, key, time.time())
+        if not retry_after:
+            return None
+        
+        response = jsonify({'error': 'Too many requests'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response
+    
+    def reset(self):
+        self._backend.reset()
+
+rate_limiter = RateLimiter()
+
+@click.command('prune-rate-limits')
+@with_appcontext
+def prune_rate_limits_command():
+    """Delete shared rate-limit state older than the longest policy period."""
+    longest = max((policy.algorithm.period for policy in rate_limiter._policies.values()), default=0)
+    cutoff = time.time() - longest
+    with db.engine.begin() as connection:
+        buckets = connection.execute(
+            RateLimitBucket.__table__.delete().where(RateLimitBucket.updated_at < cutoff)
+        ).rowcount
+        hits = connection.execute(
+            RateLimitHit.__table__.delete().where(RateLimitHit.at < cutoff)
+        ).rowcount
+    click.echo(f'Pruned {buckets} bucket(s) and {hits} log entr(ies)')
@@ -0,0 +1,195 @@
+# app/services/sqlite_writer.py
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError
+from app import db
+
+class SQLiteWriter:
+    """Single writer thread per worker that group-commits write jobs on SQLite.
+    
+    SQLite allows one writer at a time, so request threads committing on their
+    own queue up on the database lock and fail with "database is locked" once
+    the busy timeout runs out. ``run(job, *args)`` hands the job to this
+    worker's writer thread instead. The writer drains whatever jobs are queued
+    (up to ``SQLITE_WRITE_BATCH_SIZE``) into one ``BEGIN IMMEDIATE``
+    transaction, runs each in its own savepoint so a failing job rolls back
+    alone, and commits the batch with a single sync. Workers still contend
+    with each other, but only through one connection each.
+    
+    Jobs run in the writer's app context and ``db.session``, so they take
+    plain arguments and return plain data, never ORM objects. Their errors are
+    re-raised in the calling thread. On other databases, on in-memory SQLite or
+    with ``SQLITE_WRITE_QUEUE`` off, ``run`` calls the job inline and commits,
+    with the same results and errors. Either way the caller's session must
+    hold no changes of its own: ``run`` raises RuntimeError rather than commit
+    them along with the job or leave them behind.
+    
+    Listing, review and amenity writes, logouts and the view counter flush go
+    through the writer. Left out on purpose:
+    
+    * The job queue. Claims must commit before a job runs and handlers such
+      as the purge commit in chunks, neither of which fits a savepoint in a
+      shared batch. Workers poll and retry, so a busy database only delays
+      them.
+    * The database rate-limit backend. It checks every request on its own
+      connection before the view runs, and queueing that behind content
+      writes would throttle request admission. SQLite deployments use the
+      memory backend.
+    * Account writes: register, login rehash, verify, ``/users/me`` and the
+      admin batch. They are rare next to content writes, hash passwords in
+      the request, and fall back on the busy timeout like any other writer.
+    * CLI commands, which run in their own process.
+    """
+    
+    def __init__(self):
+        self._app = None
+        self._enabled = False
+        self._pid = None
+        self._thread = None
+        self._queue = None
+        self._start_lock = threading.Lock()
+    
+    def init_app(self, app):
+        app.config.setdefault('SQLITE_WRITE_QUEUE', True)
+        app.config.setdefault('SQLITE_WRITE_BATCH_SIZE', 64)
+        app.config.setdefault('SQLITE_WRITE_TIMEOUT', 30)
+        self._app = app
+        # A writer started for a previous app (e.g. in tests) keeps serving only that app
+        self._pid = None
+        with app.app_context():
+            url = db.engine.url
+        self._enabled = (
+            app.config['SQLITE_WRITE_QUEUE']
+            and url.get_backend_name() == 'sqlite'
+            and url.database not in (None, '', ':memory:')
+        )
+        for name, listener in (
+            ('after_flush', self._mark_flushed),
+            ('do_orm_execute', self._mark_executed),
+            ('after_transaction_end', self._clear_flushed)
+        ):
+            if not event.contains(db.session, name, listener):
+                event.listen(db.session, name, listener)
+    
+    @staticmethod
+    def _mark_flushed(session, flush_context):
+        session.info['sqlite_writer_uncommitted'] = True
+    
+    @staticmethod
+    def _mark_executed(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            orm_execute_state.session.info['sqlite_writer_uncommitted'] = True
+    
+    @staticmethod
+    def _clear_flushed(session, transaction):
+        if transaction.parent is None:
+            session.info.pop('sqlite_writer_uncommitted', None)
+    
+    @staticmethod
+    def _check_no_pending(session):
+        if session.new or session.dirty or session.deleted or session.info.get('sqlite_writer_uncommitted'):
+            raise RuntimeError(
+                'sqlite_writer.run() needs a session without uncommitted changes; '
+                'make them part of the job or commit them first'
+            )
+    
+    def _ensure_writer(self):
+        # Started lazily so each forked worker runs its own writer
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, args=(self._app, self._queue),
+                                            name='sqlite-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+    
+    def run(self, job, *args, **kwargs):
+        """Run ``job(*args, **kwargs)`` in a committed transaction and return its result."""
+        if threading.current_thread() is self._thread:
+            # Called from a job: join the batch that is already running
+            return job(*args, **kwargs)
+        
+        self._check_no_pending(db.session)
+        if not self._enabled:
+            try:
+                result = job(*args, **kwargs)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            return result
+        
+        self._ensure_writer()
+        # End the caller's read transaction, which holds nothing to commit: under a
+        # rollback journal its shared lock would keep the writer from committing
+        db.session.rollback()
+        
+        future = Future()
+        self._queue.put((future, job, args, kwargs))
+        try:
+            result = future.result(timeout=self._app.config['SQLITE_WRITE_TIMEOUT'])
+        except FutureTimeoutError:
+            if future.cancel():
+                raise TimeoutError('Timed out waiting for the SQLite writer')
+            result = future.result()
+        
+        # The flush happened in the writer's session; keep read-your-writes pinning working
+        db.session.info['wrote'] = True
+        return result
+    
+    def _run(self, app, jobs):
+        batch_size = app.config['SQLITE_WRITE_BATCH_SIZE']
+        with app.app_context():
+            while True:
+                batch = [jobs.get()]
+                while len(batch) < batch_size:
+                    try:
+                        batch.append(jobs.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self._commit_batch(batch)
+                finally:
+                    db.session.close()
+    
+    def _commit_batch(self, batch):
+        # Callers that timed out have cancelled their futures; skip those jobs
+        jobs = [entry for entry in batch if entry[0].set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        
+        outcomes = []
+        try:
+            # Take the write lock up front so the busy timeout applies, rather than
+            # failing when a read transaction tries to upgrade to a write
+            db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+            for future, job, args, kwargs in jobs:
+                try:
+                    with db.session.begin_nested():
+                        result = job(*args, **kwargs)
+                except Exception as e:
+                    outcomes.append((future, None, e))
+                else:
+                    outcomes.append((future, result, None))
+            db.session.commit()
+        except Exception as e:
+            # Nothing in the batch was committed, so every job fails with it
+            db.session.rollback()
+            self._app.logger.exception('SQLite write batch failed')
+            for future, job, args, kwargs in jobs:
+                future.set_exception(e)
+            return
+        
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+sqlite_writer = SQLiteWriter()
@@ -0,0 +1,264 @@
+# app/services/token_revocations.py
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models.user import TokenRevocation
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no false negatives."""
+    
+    def __init__(self, capacity, error_rate):
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, value):
+        # Double hashing: k positions derived from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+    
+    def add(self, value):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, value):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+class TokenRevocationList:
+    """Per-worker view of ``token_revocations`` for the JWT blocklist check.
+    
+    Revoked jtis go into a Bloom filter, so the common case (a token that was
+    never revoked) is answered without touching the database; only Bloom
+    positives are confirmed with a query, and the answer is remembered in a
+    small LRU. "Log out everywhere" revocations are kept exactly as a map of
+    user id -> minimum valid ``ver`` claim.
+    
+    Each worker polls for rows revoked since its last sync every
+    ``REVOCATION_SYNC_INTERVAL`` seconds, re-reading
+    ``REVOCATION_SYNC_OVERLAP`` seconds back for transactions that commit
+    after their timestamp. A background thread per worker rebuilds the filter
+    from unexpired rows on start and every ``REVOCATION_REBUILD_INTERVAL``
+    seconds, which also drops bits for tokens that have expired; until the
+    first rebuild lands, each token is checked against the table directly.
+    On in-memory SQLite, whose one connection is shared by every thread,
+    rebuilds run inline.
+    """
+    
+    def __init__(self):
+        self._app = None
+        self._pid = None
+        self._background = False
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._min_versions = {}  # user id -> lowest token version still valid
+        self._checked = OrderedDict()  # jti -> revoked, for Bloom positives
+        self._seen = None
+        self._loaded = False
+        self._synced_at = 0.0
+        self._rebuilt_at = 0.0
+    
+    def init_app(self, app):
+        app.config.setdefault('REVOCATION_BLOOM_CAPACITY', 100000)
+        app.config.setdefault('REVOCATION_BLOOM_ERROR_RATE', 0.001)
+        app.config.setdefault('REVOCATION_CHECKED_SIZE', 4096)
+        app.config.setdefault('REVOCATION_SYNC_INTERVAL', 2)
+        app.config.setdefault('REVOCATION_REBUILD_INTERVAL', 3600)
+        app.config.setdefault('REVOCATION_SYNC_OVERLAP', 30)
+        self._app = app
+        # Revocations loaded for a previous app (e.g. in tests) don't carry over
+        self._pid = None
+        self._loaded = False
+        with app.app_context():
+            url = db.engine.url
+        self._background = not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'))
+        if self._background:
+            app.before_request(self._ensure_worker)
+        app.cli.add_command(prune_revocations_command)
+        if not event.contains(db.session, 'after_commit', self._after_commit):
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+    
+    def _ensure_worker(self):
+        # Started lazily so each forked worker rebuilds its own filter
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            thread = threading.Thread(target=self._run, args=(self._app,), name='revocation-rebuild', daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+    
+    def _run(self, app):
+        while True:
+            interval = app.config['REVOCATION_REBUILD_INTERVAL']
+            with app.app_context():
+                try:
+                    self.rebuild()
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    app.logger.exception('Failed to rebuild the token revocation filter')
+                    interval = app.config['REVOCATION_SYNC_INTERVAL']
+            time.sleep(interval)
+    
+    @staticmethod
+    def _apply(bloom, min_versions, jti, user_id, min_version):
+        if jti is not None:
+            bloom.add(jti)
+        if user_id is not None and min_version is not None:
+            if min_version > min_versions.get(user_id, 0):
+                min_versions[user_id] = min_version
+    
+    def _remember(self, jti, revoked):
+        self._checked[jti] = revoked
+        self._checked.move_to_end(jti)
+        while len(self._checked) > current_app.config['REVOCATION_CHECKED_SIZE']:
+            self._checked.popitem(last=False)
+    
+    def rebuild(self):
+        """Reload every unexpired revocation into a freshly sized filter and swap it in."""
+        seen = datetime.utcnow()
+        rows = TokenRevocation.active(seen).all()
+        capacity = max(current_app.config['REVOCATION_BLOOM_CAPACITY'], 2 * len(rows))
+        bloom = BloomFilter(capacity, current_app.config['REVOCATION_BLOOM_ERROR_RATE'])
+        min_versions = {}
+        for row in rows:
+            self._apply(bloom, min_versions, row.jti, row.user_id, row.min_version)
+        
+        with self._lock:
+            self._bloom = bloom
+            self._min_versions = min_versions
+            self._checked = OrderedDict()
+            self._seen = max((row.revoked_at for row in rows), default=seen)
+            # Revocations committed while the filter was built are in the table by now
+            self._catch_up()
+            self._rebuilt_at = time.monotonic()
+            self._loaded = True
+    
+    def _catch_up(self):
+        # Called with the lock held
+        overlap = timedelta(seconds=current_app.config['REVOCATION_SYNC_OVERLAP'])
+        rows = TokenRevocation.active().filter(TokenRevocation.revoked_at >= self._seen - overlap).all()
+        for row in rows:
+            self._apply(self._bloom, self._min_versions, row.jti, row.user_id, row.min_version)
+            if row.jti is not None:
+                self._remember(row.jti, True)
+            self._seen = max(self._seen, row.revoked_at)
+        self._synced_at = time.monotonic()
+    
+    def sync(self):
+        if not self._background and (
+            not self._loaded
+            or time.monotonic() - self._rebuilt_at >= current_app.config['REVOCATION_REBUILD_INTERVAL']
+        ):
+            self.rebuild()
+            return
+        if not self._loaded or time.monotonic() - self._synced_at < current_app.config['REVOCATION_SYNC_INTERVAL']:
+            return
+        
+        with self._lock:
+            self._catch_up()
+    
+    def is_revoked(self, jwt_data):
+        self.sync()
+        
+        user_id = jwt_data.get(current_app.config['JWT_IDENTITY_CLAIM'])
+        if not self._loaded:
+            # No filter yet in this worker; the table is the source of truth
+            return TokenRevocation.covers(user_id, jwt_data.get('ver', 0), jwt_data.get('jti'))
+        
+        min_version = self._min_versions.get(user_id)
+        if min_version is not None and jwt_data.get('ver', 0) < min_version:
+            return True
+        
+        jti = jwt_data.get('jti')
+        if jti is None or jti not in self._bloom:
+            return False
+        
+        with self._lock:
+            revoked = self._checked.get(jti)
+        if revoked is None:
+            revoked = TokenRevocation.is_jti_revoked(jti)
+            with self._lock:
+                self._remember(jti, revoked)
+        return revoked
+    
+    def _record(self, row):
+        # Runs inside the caller's transaction; applied locally once it commits
+        db.session.add(row)
+        db.session.info.setdefault('token_revocations', []).append((row.jti, row.user_id, row.min_version))
+    
+    @staticmethod
+    def _token_lifetime():
+        # Any token older than this has expired, so its revocation can be pruned
+        return max(
+            current_app.config['JWT_ACCESS_TOKEN_EXPIRES'],
+            current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+        )
+    
+    def revoke_token(self, jwt_data):
+        """Revoke a single token by its jti until it would have expired anyway."""
+        self._record(TokenRevocation(
+            jti=jwt_data['jti'],
+            expires_at=datetime.utcfromtimestamp(jwt_data['exp'])
+        ))
+    
+    def revoke_user(self, user):
+        """Revoke every token issued to ``user`` before its current token version."""
+        self._record(TokenRevocation(
+            user_id=user.id,
+            min_version=user.token_version,
+            expires_at=datetime.utcnow() + self._token_lifetime()
+        ))
+    
+    def revoke_users(self, min_versions):
+        """Revoke tokens for many users at once, given user id -> new token version."""
+        expires_at = datetime.utcnow() + self._token_lifetime()
+        rows = [
+            {'user_id': user_id, 'min_version': version, 'revoked_at': datetime.utcnow(), 'expires_at': expires_at}
+            for user_id, version in min_versions.items()
+        ]
+        if not rows:
+            return
+        db.session.execute(db.insert(TokenRevocation), rows)
+        db.session.info.setdefault('token_revocations', []).extend(
+            (None, row['user_id'], row['min_version']) for row in rows
+        )
+    
+    def _after_commit(self, session):
+        pending = session.info.pop('token_revocations', None)
+        if not pending or not self._loaded:
+            return
+        with self._lock:
+            for jti, user_id, min_version in pending:
+                self._apply(self._bloom, self._min_versions, jti, user_id, min_version)
+                if jti is not None:
+                    self._remember(jti, True)
+    
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('token_revocations', None)
+
+token_revocations = TokenRevocationList()
+
+@click.command('prune-token-revocations')
+@with_appcontext
+def prune_revocations_command():
+    """Delete revocations whose tokens have already expired."""
+    pruned = TokenRevocation.prune()
+    db.session.commit()
+    click.echo(f'Pruned {pruned} expired revocation(s)')
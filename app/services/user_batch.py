@@ -0,0 +1,114 @@
+# app/services/user_batch.py
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app import db
+from app.models.types import InvalidIdError, parse_guid
+from app.models.user import User
+from app.services.token_revocations import token_revocations
+from app.services.user_cache import user_cache
+
+class UserBatch:
+    """Verify, unverify or change the role of many users at once.
+    
+    Ids are processed in chunks of ``USER_BATCH_CHUNK_SIZE``: one SELECT to
+    see which exist and already match, one set-based UPDATE for the rest, and
+    a commit per chunk so a large batch never holds a long write lock.
+    Changes that reduce privileges (unverify, role change) also bump the
+    users' token version and revoke their existing tokens. Cached user
+    snapshots are invalidated in this worker when each chunk commits, and in
+    the others at their next sync, through the ``updated_at`` the UPDATE sets.
+    """
+    
+    ACTIONS = ('verify', 'unverify', 'set_role')
+    ROLES = ('tenant', 'landlord', 'admin')
+    
+    def init_app(self, app):
+        app.config.setdefault('USER_BATCH_CHUNK_SIZE', 500)
+        app.config.setdefault('USER_BATCH_MAX_IDS', 10000)
+        app.cli.add_command(users_batch_command)
+    
+    def _change(self, action, role):
+        # -> (column, new value, whether existing tokens must be revoked)
+        if action == 'verify':
+            return User.is_verified, True, False
+        if action == 'unverify':
+            return User.is_verified, False, True
+        if action == 'set_role':
+            if role not in self.ROLES:
+                raise ValueError('Invalid role')
+            return User.role, role, True
+        raise ValueError('Invalid action')
+    
+    def apply(self, action, user_ids, role=None):
+        """Apply ``action`` to ``user_ids``; returns id -> updated/unchanged/not_found."""
+        column, value, revoke = self._change(action, role)
+        chunk_size = current_app.config['USER_BATCH_CHUNK_SIZE']
+        
+        # Match on the canonical spelling, but answer for each id as the caller wrote it
+        canonical = {}
+        for user_id in dict.fromkeys(user_ids):
+            try:
+                canonical[user_id] = parse_guid(user_id)
+            except InvalidIdError:
+                # No user can have it, and binding it would fail the whole chunk
+                canonical[user_id] = None
+        ids = list(dict.fromkeys(user_id for user_id in canonical.values() if user_id is not None))
+        
+        statuses = {}
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            current = {
+                row.id: row
+                for row in db.session.query(User.id, column.label('value'), User.token_version).filter(User.id.in_(chunk))
+            }
+            changed = [user_id for user_id in chunk if user_id in current and current[user_id].value != value]
+            for user_id in chunk:
+                statuses[user_id] = 'unchanged' if user_id in current else 'not_found'
+            for user_id in changed:
+                statuses[user_id] = 'updated'
+            
+            if not changed:
+                continue
+            
+            values = {column: value, User.updated_at: datetime.utcnow()}
+            if revoke:
+                values[User.token_version] = User.token_version + 1
+            db.session.execute(
+                db.update(User).where(User.id.in_(changed)).values(values),
+                execution_options={'synchronize_session': False}
+            )
+            if revoke:
+                token_revocations.revoke_users({
+                    user_id: (current[user_id].token_version or 0) + 1 for user_id in changed
+                })
+            user_cache.invalidate_after_commit(changed)
+            db.session.commit()
+        
+        return {user_id: statuses.get(canonical[user_id], 'not_found') for user_id in canonical}
+
+user_batch = UserBatch()
+
+@click.command('users-batch')
+@click.argument('action', type=click.Choice(UserBatch.ACTIONS))
+@click.argument('user_ids', nargs=-1)
+@click.option('--role', type=click.Choice(UserBatch.ROLES), help='New role for set_role.')
+@click.option('--file', 'id_file', type=click.File('r'), help='Read user ids from a file, one per line.')
+@with_appcontext
+def users_batch_command(action, user_ids, role, id_file):
+    """Verify, unverify or change the role of many users."""
+    ids = list(user_ids)
+    if id_file is not None:
+        ids.extend(line.strip() for line in id_file if line.strip())
+    
+    try:
+        results = user_batch.apply(action, ids, role=role)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    
+    statuses = list(results.values())
+    click.echo(
+        f"{statuses.count('updated')} updated, {statuses.count('unchanged')} unchanged, "
+        f"{statuses.count('not_found')} not found"
+    )
@@ -0,0 +1,136 @@
+# app/services/user_cache.py
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app import db
+from app.models.user import User
+
+class UserSnapshot:
+    """Read-only copy of a user row that is safe to share across requests."""
+    
+    __slots__ = ('id', 'username', 'email', 'role', 'is_verified', 'token_version', '_data', '_claims')
+    
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.role = user.role
+        self.is_verified = bool(user.is_verified)
+        self.token_version = user.token_version or 0
+        self._data = user.to_dict()
+        self._claims = user.token_claims()
+    
+    def to_dict(self):
+        return dict(self._data)
+    
+    def token_claims(self):
+        return dict(self._claims)
+
+class UserCache:
+    """Small TTL + LRU cache of user snapshots keyed by id.
+    
+    Flask-JWT-Extended resolves the current user once per request through the
+    loader registered in the auth routes; this cache lets that lookup skip
+    the primary-key query. Entries are dropped when a commit touches the user
+    in this worker. Changes made by other workers are found by polling
+    ``users.updated_at`` every ``USER_CACHE_SYNC_INTERVAL`` seconds, re-reading
+    ``USER_CACHE_SYNC_OVERLAP`` seconds back to tolerate commits that land
+    after their timestamp; anything that still slips through expires after
+    ``USER_CACHE_TTL`` seconds.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user id -> (snapshot, expires_at)
+        self._ttl = 30
+        self._max_size = 1024
+        self._sync_interval = 2
+        self._sync_overlap = timedelta(seconds=5)
+        self._seen = None
+        self._synced_at = 0.0
+    
+    def init_app(self, app):
+        self._ttl = app.config.setdefault('USER_CACHE_TTL', 30)
+        self._max_size = app.config.setdefault('USER_CACHE_SIZE', 1024)
+        self._sync_interval = app.config.setdefault('USER_CACHE_SYNC_INTERVAL', 2)
+        self._sync_overlap = timedelta(seconds=app.config.setdefault('USER_CACHE_SYNC_OVERLAP', 5))
+        self._seen = None
+        self.clear()
+        if not event.contains(db.session, 'after_commit', self._after_commit):
+            event.listen(User, 'after_update', self._track_update)
+            event.listen(User, 'after_delete', self._track_update)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+    
+    def get(self, user_id):
+        self.sync()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                snapshot, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(user_id)
+                    return snapshot
+                del self._entries[user_id]
+        
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        
+        snapshot = UserSnapshot(user)
+        with self._lock:
+            self._entries[user_id] = (snapshot, now + self._ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        return snapshot
+    
+    def sync(self):
+        """Drop entries for users that any worker changed since the last sync."""
+        if time.monotonic() - self._synced_at < self._sync_interval:
+            return
+        self._synced_at = time.monotonic()
+        if self._seen is None:
+            # Entries cached from here on were read after this moment
+            self._seen = datetime.utcnow()
+            return
+        
+        rows = db.session.query(User.id, User.updated_at).filter(
+            User.updated_at >= self._seen - self._sync_overlap
+        ).all()
+        self.invalidate(row.id for row in rows)
+        self._seen = max([self._seen] + [row.updated_at for row in rows])
+    
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+    
+    def invalidate_after_commit(self, user_ids):
+        # For bulk UPDATEs, which bypass the mapper events below
+        db.session.info.setdefault('changed_user_ids', set()).update(user_ids)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    @staticmethod
+    def _track_update(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault('changed_user_ids', set()).add(target.id)
+    
+    def _after_commit(self, session):
+        changed = session.info.pop('changed_user_ids', None)
+        if changed:
+            self.invalidate(changed)
+    
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('changed_user_ids', None)
+
+user_cache = UserCache()
@@ -0,0 +1,139 @@
+# app/services/view_counter.py
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models.listing import ListingStat
+from app.services.sqlite_writer import sqlite_writer
+
+def hour_bucket(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+class _Shard:
+    __slots__ = ('lock', 'counts')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+
+class ViewCounter:
+    """Write-behind buffer for listing view counts.
+    
+    Views are aggregated in memory per worker, spread over a few locked shards
+    so concurrent requests rarely contend, and flushed to ``listing_stats`` in
+    one batched upsert every ``LISTING_VIEWS_FLUSH_INTERVAL`` seconds. A crash
+    loses at most one interval of views, which is acceptable for these stats.
+    Views from a failed flush are put back for the next one, but only up to
+    ``LISTING_VIEWS_MAX_PENDING`` (listing, hour) counters, so a long database
+    outage drops views instead of growing the buffer without bound.
+    """
+    
+    SHARD_COUNT = 16
+    
+    def __init__(self):
+        self._app = None
+        self._pid = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._shards = [_Shard() for _ in range(self.SHARD_COUNT)]
+        self._shard_limit = 100000 // self.SHARD_COUNT
+    
+    def init_app(self, app):
+        app.config.setdefault('LISTING_VIEWS_FLUSH_INTERVAL', 5)
+        app.config.setdefault('LISTING_VIEWS_MAX_PENDING', 100000)
+        self._app = app
+        self._shard_limit = max(app.config['LISTING_VIEWS_MAX_PENDING'] // self.SHARD_COUNT, 1)
+        atexit.register(self.flush, direct=True)
+    
+    def _shard(self, listing_id):
+        return self._shards[hash(listing_id) % self.SHARD_COUNT]
+    
+    def _ensure_flusher(self):
+        # Started lazily so each forked worker runs its own flusher
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._shards = [_Shard() for _ in range(self.SHARD_COUNT)]
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+    
+    def _run(self):
+        interval = self._app.config['LISTING_VIEWS_FLUSH_INTERVAL']
+        while True:
+            time.sleep(interval)
+            self.flush()
+    
+    def increment(self, listing_id, count=1):
+        self._ensure_flusher()
+        key = (listing_id, hour_bucket(datetime.utcnow()))
+        shard = self._shard(listing_id)
+        with shard.lock:
+            shard.counts[key] = shard.counts.get(key, 0) + count
+    
+    def pending(self, listing_id):
+        shard = self._shard(listing_id)
+        with shard.lock:
+            return sum(views for (pending_id, _), views in shard.counts.items() if pending_id == listing_id)
+    
+    def _drain(self):
+        drained = {}
+        for shard in self._shards:
+            with shard.lock:
+                counts, shard.counts = shard.counts, {}
+            for key, views in counts.items():
+                drained[key] = drained.get(key, 0) + views
+        return drained
+    
+    def _restore(self, counts):
+        """Put back the counts of a failed flush; returns the views dropped because the buffer is full."""
+        dropped = 0
+        for (listing_id, bucket_start), views in counts.items():
+            shard = self._shard(listing_id)
+            with shard.lock:
+                key = (listing_id, bucket_start)
+                if key in shard.counts or len(shard.counts) < self._shard_limit:
+                    shard.counts[key] = shard.counts.get(key, 0) + views
+                else:
+                    dropped += views
+        return dropped
+    
+    def flush(self, direct=False):
+        """Write buffered views through the SQLite writer, or in a transaction of their own with ``direct``."""
+        if self._app is None:
+            return 0
+        
+        counts = self._drain()
+        if not counts:
+            return 0
+        
+        with self._app.app_context():
+            try:
+                if direct:
+                    # At exit the writer thread may already be gone
+                    ListingStat.add_views(counts)
+                    db.session.commit()
+                else:
+                    sqlite_writer.run(ListingStat.add_views, counts)
+            except SQLAlchemyError:
+                db.session.rollback()
+                dropped = self._restore(counts)
+                self._app.logger.exception('Failed to flush listing view counts')
+                if dropped:
+                    self._app.logger.warning('Dropped %d listing views over LISTING_VIEWS_MAX_PENDING', dropped)
+                return 0
+        
+        return len(counts)
+    
+    def counts(self, listing_id):
+        since = hour_bucket(datetime.utcnow()) - timedelta(hours=23)
+        total, recent = ListingStat.view_totals(listing_id, since)
+        pending = self.pending(listing_id)
+        return {'total': total + pending, 'last_24h': recent + pending}
+
+view_counter = ViewCounter()
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Performance benchmarks; run each one with ``python -m benchmarks.<name> --help``."""
@@ -0,0 +1,69 @@
+# benchmarks/common.py
+import os
+import tempfile
+import threading
+import time
+from config import Config
+
+def make_app(database_path=None, create_tables=True, **overrides):
+    """App on a throwaway SQLite file, with rate limiting and background jobs off."""
+    from app import create_app, db
+    
+    if database_path is None:
+        database_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + database_path,
+        'SQLALCHEMY_BINDS': {},
+        'RATE_LIMIT_ENABLED': False,
+        'JOBS_RUN_IN_PROCESS': False
+    }
+    settings.update(overrides)
+    app = create_app(type('BenchConfig', (Config,), settings))
+    if create_tables:
+        with app.app_context():
+            db.create_all()
+    return app
+
+def register(client, username, role='tenant', password='secret'):
+    """Register and log in a user; returns (user id, auth headers)."""
+    response = client.post('/api/auth/register', json={
+        'username': username, 'email': f'{username}@example.com', 'password': password, 'role': role
+    })
+    user_id = response.get_json()['user']['id']
+    client.get(f'/api/auth/verify/{user_id}')
+    response = client.post('/api/auth/login', json={'email': f'{username}@example.com', 'password': password})
+    return user_id, {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return float('nan')
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def latency_summary(seconds):
+    """Format the p50 and p99 of durations given in seconds, in milliseconds."""
+    return f'p50 {percentile(seconds, 0.5) * 1000:.1f} ms  p99 {percentile(seconds, 0.99) * 1000:.1f} ms'
+
+def run_threads(count, target, duration):
+    """Call ``target()`` in a loop on ``count`` threads for ``duration`` seconds.
+    
+    Returns the per-call durations, in seconds.
+    """
+    durations = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    
+    def loop():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            target()
+            elapsed = time.perf_counter() - started
+            with lock:
+                durations.append(elapsed)
+    
+    threads = [threading.Thread(target=loop) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return durations
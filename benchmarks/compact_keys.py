@@ -0,0 +1,193 @@
+# benchmarks/compact_keys.py
+"""Key index sizes, join latency and write stalls around the compact-keys conversion.
+
+Needs a PostgreSQL server: a scratch database is created next to the one in
+``--database-url``, migrated to the revision before e2f91b7c4d58 and seeded
+with ``--rows`` listings and reviews (and a tenth as many users). Index sizes
+and join latency are measured on the text keys, the keys are converted while
+reader and writer threads keep running, and everything is measured again. The
+conversion is either the migration's ALTER ... TYPE (``--mode offline``) or
+``flask db upgrade -x compact_keys=online`` followed by ``flask compact-keys``
+(``--mode online``).
+    
+    python -m benchmarks.compact_keys --database-url postgresql://postgres@localhost/postgres --rows 1000000
+"""
+import argparse
+import os
+import random
+import threading
+import time
+import uuid
+from flask_migrate import upgrade
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from benchmarks.common import latency_summary, make_app
+from config import Config, engine_options
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+BASE_REVISION = 'd5e8a1f3b246'
+KEY_INDEXES = (
+    'users_pkey', 'listings_pkey', 'reviews_pkey', 'ix_listings_user_id_created_at',
+    'ix_reviews_listing_id_created_at', 'ix_reviews_landlord_id_created_at', 'uq_reviews_user_listing'
+)
+
+LISTING_REVIEWS = """
+    SELECT r.id, r.rating, u.username FROM reviews r JOIN users u ON u.id = r.user_id
+    WHERE r.listing_id = %(listing_id)s ORDER BY r.created_at DESC LIMIT 10
+"""
+LANDLORD_LISTINGS = """
+    SELECT l.id, count(r.id) FROM listings l LEFT JOIN reviews r ON r.listing_id = l.id
+    WHERE l.user_id = %(user_id)s GROUP BY l.id
+"""
+FULL_JOIN = """
+    SELECT count(*) FROM reviews r JOIN listings l ON l.id = r.listing_id JOIN users u ON u.id = r.user_id
+"""
+
+def seed(connection, rows):
+    users = max(rows // 10, 1)
+    # md5 of a counter is a uniformly spread UUID, like uuid4 ids
+    connection.exec_driver_sql(f"""
+        INSERT INTO users (id, username, email, password_hash, role, is_verified, token_version, created_at, updated_at)
+        SELECT md5('u' || i)::uuid::text, 'user' || i, 'user' || i || '@example.com', 'x', 'landlord', true, 0, now(), now()
+        FROM generate_series(0, {users - 1}) i
+    """)
+    connection.exec_driver_sql(f"""
+        INSERT INTO listings (id, title, description, price, bedrooms, bathrooms, address, city, state, zip_code,
+                              is_published, created_at, updated_at, user_id)
+        SELECT md5('l' || i)::uuid::text, 'Flat', 'd', 1000, 2, 1, 'a', 'c', 's', 'z',
+               true, now() - i * interval '1 second', now(), md5('u' || mod(i, {users}))::uuid::text
+        FROM generate_series(0, {rows - 1}) i
+    """)
+    connection.exec_driver_sql(f"""
+        INSERT INTO reviews (id, content, rating, created_at, updated_at, user_id, listing_id, landlord_id)
+        SELECT md5('r' || i)::uuid::text, 'ok', 1 + mod(i, 5), now() - i * interval '1 second', now(),
+               md5('u' || mod(i / 7, {users}))::uuid::text, md5('l' || mod(i, {rows}))::uuid::text,
+               md5('u' || mod(i, {users}))::uuid::text
+        FROM generate_series(0, {rows - 1}) i
+    """)
+
+def ids(connection, table, count):
+    return connection.exec_driver_sql(f'SELECT id::text FROM {table} TABLESAMPLE SYSTEM (1) LIMIT {count}').scalars().all()
+
+def timed(connection, statement, parameters_list):
+    durations = []
+    for parameters in parameters_list:
+        started = time.perf_counter()
+        connection.exec_driver_sql(statement, parameters).all()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+def measure(engine, label, samples):
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        for table in ('users', 'listings', 'reviews'):
+            connection.exec_driver_sql(f'VACUUM ANALYZE {table}')
+        sizes = dict(connection.exec_driver_sql(
+            'SELECT relname, pg_relation_size(oid) FROM pg_class WHERE relname = ANY(%(names)s)',
+            {'names': list(KEY_INDEXES)}
+        ).all())
+        listing_ids = ids(connection, 'listings', samples)
+        landlord_ids = ids(connection, 'users', samples)
+        timed(connection, LISTING_REVIEWS, [{'listing_id': value} for value in listing_ids[:100]])  # warm up
+        point = timed(connection, LISTING_REVIEWS, [{'listing_id': value} for value in listing_ids])
+        landlord = timed(connection, LANDLORD_LISTINGS, [{'user_id': value} for value in landlord_ids])
+        full = min(timed(connection, FULL_JOIN, [{}] * 3))
+    
+    print(f'{label}:')
+    for name in KEY_INDEXES:
+        print(f'  {name:36} {sizes.get(name, 0) / 2 ** 20:8.1f} MiB')
+    print(f'  {"key indexes total":36} {sum(sizes.values()) / 2 ** 20:8.1f} MiB')
+    print(f'  listing reviews join      {latency_summary(point)}')
+    print(f'  landlord listings join    {latency_summary(landlord)}')
+    print(f'  reviews x listings x users full join  {full * 1000:.0f} ms')
+
+def load(engine, stop, durations, errors):
+    """Reads and writes by id with plain string literals, as GUID binds them, until ``stop`` is set."""
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        listing_ids = ids(connection, 'listings', 500)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                if random.random() < 0.5:
+                    connection.exec_driver_sql(LISTING_REVIEWS, {'listing_id': random.choice(listing_ids)}).all()
+                else:
+                    connection.exec_driver_sql(
+                        'UPDATE listings SET updated_at = now() WHERE id = %(id)s', {'id': random.choice(listing_ids)}
+                    )
+                    user_id = str(uuid.uuid4())
+                    connection.exec_driver_sql(
+                        "INSERT INTO users (id, username, email, password_hash, role, is_verified, token_version) "
+                        "VALUES (%(id)s, %(id)s, %(id)s, 'x', 'tenant', false, 0)", {'id': user_id}
+                    )
+            except Exception as e:
+                errors.append(f'{type(e).__name__}: {str(e).splitlines()[0]}')
+                connection.rollback()
+            durations.append((started, time.perf_counter() - started))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=os.environ.get('BENCH_DATABASE_URL'))
+    parser.add_argument('--rows', type=int, default=100000, help='Listings and reviews to seed.')
+    parser.add_argument('--mode', choices=('online', 'offline'), default='online')
+    parser.add_argument('--threads', type=int, default=4, help='Reader/writer threads during the conversion.')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per batch for --mode online.')
+    parser.add_argument('--samples', type=int, default=2000, help='Queries per latency measurement.')
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error('--database-url (or BENCH_DATABASE_URL) must point at a PostgreSQL server')
+    
+    server = create_engine(args.database_url, isolation_level='AUTOCOMMIT')
+    url = make_url(args.database_url).set(database='compact_keys_bench')
+    with server.connect() as connection:
+        connection.exec_driver_sql('DROP DATABASE IF EXISTS compact_keys_bench WITH (FORCE)')
+        connection.exec_driver_sql('CREATE DATABASE compact_keys_bench')
+    server.dispose()
+    
+    # Production pool settings, statement timeout included
+    uri = url.render_as_string(hide_password=False)
+    app = make_app(create_tables=False, SQLALCHEMY_DATABASE_URI=uri, SQLALCHEMY_ENGINE_OPTIONS=engine_options(
+        uri, Config.DB_POOL_SIZE, Config.DB_MAX_OVERFLOW, Config.DB_POOL_TIMEOUT,
+        Config.DB_POOL_RECYCLE, Config.DB_STATEMENT_TIMEOUT, Config.SQLITE_TIMEOUT
+    ))
+    engine = create_engine(url, pool_size=args.threads + 2)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS, revision=BASE_REVISION)
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        seed(connection, args.rows)
+    print(f'Seeded {args.rows} listings and reviews in {time.perf_counter() - started:.0f}s')
+    measure(engine, 'text keys (varchar 36)', args.samples)
+    
+    stop = threading.Event()
+    durations = []
+    errors = []
+    threads = [threading.Thread(target=load, args=(engine, stop, durations, errors))
+               for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(2)
+    started = time.perf_counter()
+    with app.app_context():
+        if args.mode == 'online':
+            upgrade(directory=MIGRATIONS, x_arg=['compact_keys=online'])
+            result = app.test_cli_runner().invoke(args=['compact-keys', '--batch-size', str(args.batch_size)])
+            print(result.output, end='')
+            if result.exception:
+                raise result.exception
+        else:
+            upgrade(directory=MIGRATIONS)
+    finished = time.perf_counter()
+    time.sleep(2)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    
+    during = [elapsed for at, elapsed in durations if started <= at < finished]
+    print(f'{args.mode} conversion took {finished - started:.1f}s; {len(during)} queries ran meanwhile, '
+          f'{latency_summary(during)}  max {max(during, default=0) * 1000:.0f} ms, {len(errors)} errors')
+    for error in sorted(set(errors))[:5]:
+        print(f'  {error}')
+    measure(engine, 'native uuid', args.samples)
+    engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# benchmarks/gunicorn_workers.py
+"""Read throughput, tail latency and memory of gunicorn worker setups.
+
+Seeds a SQLite file with listings, images and reviews, then starts gunicorn
+with ``gunicorn.conf.py`` once per setup (worker class, workers x threads)
+and drives it with concurrent clients over HTTP, mixing listing pages,
+listing detail, search and review pages. Worker memory is the summed RSS of
+gunicorn's worker processes at the end of the run.
+
+``--db-latency`` adds a sleep after every statement to stand in for the
+round trip to a networked database; local SQLite answers in microseconds,
+which leaves nothing for threads to overlap.
+    
+    python -m benchmarks.gunicorn_workers --clients 32 --duration 15 --db-latency 5
+"""
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+import requests
+from benchmarks.common import latency_summary, make_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETUPS = ['sync:1x1', 'gthread:1x16', 'sync:4x1', 'gthread:2x8']
+
+def latency_app():
+    """The app from run.py with ``BENCH_DB_LATENCY_MS`` of sleep after each statement.
+    
+    Loaded by gunicorn as ``benchmarks.gunicorn_workers:latency_app()`` in
+    every worker. The sleep releases the GIL, as waiting on a socket would.
+    """
+    from sqlalchemy import event
+    from app import db
+    from run import app
+    
+    delay = float(os.environ.get('BENCH_DB_LATENCY_MS') or 0) / 1000
+    if delay:
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'after_cursor_execute', lambda *args: time.sleep(delay))
+    return app
+
+def seed(app, listings):
+    from app import db
+    from app.models.listing import Listing, ListingImage
+    from app.models.review import Review
+    from app.models.user import User
+    
+    with app.app_context():
+        users = [
+            User(id=str(uuid.uuid4()), username=f'user{number}', email=f'user{number}@example.com', password_hash='x',
+                 role='landlord' if number < 20 else 'tenant', is_verified=True)
+            for number in range(200)
+        ]
+        db.session.add_all(users)
+        now = datetime.utcnow()
+        rows = [
+            Listing(id=str(uuid.uuid4()), title=f'Apartment {number}', description='Nice place ' * 20,
+                    price=random.randint(500, 5000), bedrooms=random.randint(1, 5), bathrooms=1,
+                    address=f'{number} Main St', city=random.choice(['austin', 'dallas', 'houston']), state='tx',
+                    zip_code='78701', user_id=users[number % 20].id, created_at=now - timedelta(minutes=number))
+            for number in range(listings)
+        ]
+        db.session.add_all(rows)
+        db.session.flush()
+        db.session.add_all([ListingImage(url=f'https://example.com/{number}.jpg', listing_id=listing.id)
+                            for number, listing in enumerate(rows)])
+        # Twenty reviews on each of the listings the clients open
+        db.session.add_all([
+            Review(id=str(uuid.uuid4()), content='ok', rating=4, user_id=users[20 + number].id,
+                   listing_id=listing.id, landlord_id=listing.user_id, created_at=now - timedelta(seconds=number))
+            for listing in rows[:200] for number in range(20)
+        ])
+        db.session.commit()
+        return [listing.id for listing in rows[:200]]
+
+def drive(base_url, listing_ids, clients, duration):
+    """Send GETs from ``clients`` threads for ``duration`` seconds; returns (durations, errors)."""
+    paths = [
+        lambda: f'/api/listings/?page={random.randint(1, 50)}',
+        lambda: f'/api/listings/{random.choice(listing_ids)}',
+        lambda: f'/api/search/?q=Apartment&city=austin&page={random.randint(1, 20)}',
+        lambda: f'/api/reviews/listing/{random.choice(listing_ids)}'
+    ]
+    durations = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    
+    def loop():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = session.get(base_url + random.choice(paths)(), timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            with lock:
+                durations.append(time.perf_counter() - started)
+                if not ok:
+                    errors.append(1)
+    
+    threads = [threading.Thread(target=loop) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return durations, len(errors)
+
+def worker_rss(master_pid):
+    """Summed resident memory of the master's child processes, in MiB."""
+    total = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/status') as status:
+                fields = dict(line.split(':', 1) for line in status if ':' in line)
+        except OSError:
+            continue
+        if int(fields.get('PPid', '0').strip()) == master_pid:
+            total += int(fields.get('VmRSS', '0 kB').split()[0])
+    return total / 1024
+
+def measure(setup, database_path, listing_ids, args, port):
+    worker_class, shape = setup.split(':')
+    workers, threads = shape.split('x')
+    env = dict(
+        os.environ,
+        DATABASE_URL='sqlite:///' + database_path,
+        GUNICORN_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY=workers,
+        GUNICORN_THREADS=threads,
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        BENCH_DB_LATENCY_MS=str(args.db_latency),
+        PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), '--log-level', 'warning',
+         'benchmarks.gunicorn_workers:latency_app()'],
+        cwd=ROOT, env=env
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        for _ in range(100):
+            try:
+                requests.get(base_url + '/api/health', timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.3)
+        drive(base_url, listing_ids, 4, 3)  # warm up every worker
+        durations, errors = drive(base_url, listing_ids, args.clients, args.duration)
+        rss = worker_rss(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    
+    print(f'{worker_class:8} {workers}x{threads:<3} {rss:5.0f} MiB  {len(durations) / args.duration:5.0f} req/s  '
+          f'{latency_summary(durations)}  {errors} errors')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--setup', action='append', help=f'worker class:workersxthreads (default {" ".join(SETUPS)}).')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent HTTP clients.')
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--db-latency', type=float, default=5.0, help='Milliseconds added to every statement.')
+    parser.add_argument('--listings', type=int, default=5000)
+    parser.add_argument('--port', type=int, default=8137)
+    args = parser.parse_args()
+    
+    database_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    listing_ids = seed(make_app(database_path), args.listings)
+    for number, setup in enumerate(args.setup or SETUPS):
+        measure(setup, database_path, listing_ids, args, args.port + number)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/password_hashing.py
+"""Read latency while logins hash passwords, inline versus in the process pool.
+
+Login threads and read threads share one app, as the threads of a gthread
+worker do. Hashing inline keeps request threads and the worker's cores busy
+with PBKDF2 or scrypt, so reads wait behind it; the pool moves that work to a
+bounded number of other processes.
+    
+    python -m benchmarks.password_hashing --login-threads 8 --duration 10
+"""
+import argparse
+import threading
+from app.services.password_hasher import password_hasher
+from benchmarks.common import latency_summary, make_app, register, run_threads
+
+def measure(workers, args):
+    app = make_app(PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_METHOD=args.method,
+                   PASSWORD_HASH_MAX_PENDING=args.login_threads * 2)
+    client = app.test_client()
+    _, headers = register(client, 'landlord', role='landlord')
+    for number in range(20):
+        client.post('/api/listings/', json={
+            'title': f'Flat {number}', 'description': 'd', 'price': 1000, 'bedrooms': 2, 'bathrooms': 1,
+            'address': 'a', 'city': 'c', 'state': 's', 'zip_code': 'z'
+        }, headers=headers)
+    credentials = {'email': 'landlord@example.com', 'password': 'secret'}
+    
+    # Reads alone first, then with the login storm running alongside
+    idle = run_threads(args.read_threads, lambda: client.get('/api/listings/'), args.duration / 2)
+    
+    logins = []
+    storm = threading.Thread(target=lambda: logins.extend(
+        run_threads(args.login_threads, lambda: client.post('/api/auth/login', json=credentials), args.duration)
+    ))
+    storm.start()
+    loaded = run_threads(args.read_threads, lambda: client.get('/api/listings/'), args.duration)
+    storm.join()
+    password_hasher.shutdown()
+    label = f'pool ({workers} processes)' if workers else 'inline'
+    print(f'{label:20} reads idle {latency_summary(idle)}  |  during logins {latency_summary(loaded)}'
+          f'  {len(loaded) / args.duration:.0f} reads/s  |  {len(logins) / args.duration:.1f} logins/s')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--method', default='pbkdf2:sha256:600000')
+    parser.add_argument('--workers', type=int, default=2, help='Pool processes for the "after" run.')
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--read-threads', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+    
+    measure(0, args)
+    measure(args.workers, args)
+
+if __name__ == '__main__':
+    main()
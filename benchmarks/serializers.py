@@ -0,0 +1,188 @@
+# benchmarks/serializers.py
+"""Cost of encoding listing, review and user pages, old to_dict versus compiled serializers.
+
+For each model a page of ``--per-page`` items is read and encoded three
+ways: ORM instances through the hand-written ``to_dict`` bodies the
+serializers replaced (images loaded per listing, as before), ORM instances
+through today's ``to_dict``, and plain rows through the compiled
+``from_row`` encoders (``Listing.page_dicts`` for listings). The fields
+columns time only the model's own fields on instances and rows that are
+already loaded: the old dict literal, ``from_object`` and ``from_row``.
+    
+    python -m benchmarks.serializers --per-page 100 --repeat 50
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from benchmarks.common import make_app
+
+def iso(value):
+    return value.isoformat() + 'Z'
+
+# The to_dict bodies before app/serializers.py
+def legacy_user(user):
+    return {
+        'id': user.id, 'username': user.username, 'email': user.email, 'role': user.role,
+        'is_verified': user.is_verified, 'created_at': iso(user.created_at), 'updated_at': iso(user.updated_at)
+    }
+
+def legacy_review(review):
+    return {
+        'id': review.id, 'content': review.content, 'rating': review.rating, 'created_at': iso(review.created_at),
+        'updated_at': iso(review.updated_at), 'user_id': review.user_id, 'listing_id': review.listing_id
+    }
+
+def legacy_listing(listing):
+    return {
+        'id': listing.id, 'title': listing.title, 'description': listing.description, 'price': listing.price,
+        'bedrooms': listing.bedrooms, 'bathrooms': listing.bathrooms, 'square_feet': listing.square_feet,
+        'address': listing.address, 'city': listing.city, 'state': listing.state, 'zip_code': listing.zip_code,
+        'latitude': listing.latitude, 'longitude': listing.longitude, 'is_published': listing.is_published,
+        'created_at': iso(listing.created_at), 'updated_at': iso(listing.updated_at), 'user_id': listing.user_id
+    }
+
+def legacy_listing_page(listings):
+    return [
+        dict(
+            legacy_listing(listing),
+            amenities=[{'id': amenity.id, 'name': amenity.name, 'icon': amenity.icon} for amenity in listing.amenities],
+            images=[
+                {'id': image.id, 'url': image.url, 'caption': image.caption, 'is_primary': image.is_primary,
+                 'created_at': iso(image.created_at), 'listing_id': image.listing_id}
+                for image in listing.images
+            ]
+        )
+        for listing in listings
+    ]
+
+def legacy_review_page(reviews):
+    return [dict(legacy_review(review), user=legacy_user(review.author)) for review in reviews]
+
+def seed(app, listings):
+    from app import db
+    from app.models.listing import Amenity, Listing, ListingImage
+    from app.models.review import Review
+    from app.models.user import User
+    
+    with app.app_context():
+        now = datetime.utcnow()
+        users = [
+            User(id=str(uuid.uuid4()), username=f'user{number}', email=f'user{number}@example.com', password_hash='x',
+                 role='landlord' if number < 20 else 'tenant', is_verified=True, created_at=now, updated_at=now)
+            for number in range(200)
+        ]
+        amenities = [Amenity(name=f'Amenity {number}', icon='star' if number % 2 else None) for number in range(10)]
+        db.session.add_all(users + amenities)
+        rows = []
+        for number in range(listings):
+            listing = Listing(id=str(uuid.uuid4()), title=f'Apartment {number}', description='Nice place ' * 20,
+                              price=random.randint(500, 5000), bedrooms=random.randint(1, 5), bathrooms=1.5,
+                              square_feet=random.choice([None, 750]), address=f'{number} Main St', city='austin',
+                              state='tx', zip_code='78701', user_id=users[number % 20].id,
+                              created_at=now - timedelta(minutes=number), updated_at=now)
+            listing.amenities = random.sample(amenities, 3)
+            rows.append(listing)
+        db.session.add_all(rows)
+        db.session.flush()
+        db.session.add_all([ListingImage(url=f'https://example.com/{listing.id}/{image}.jpg', listing_id=listing.id)
+                            for listing in rows for image in range(3)])
+        db.session.add_all([
+            Review(id=str(uuid.uuid4()), content='Quiet and clean. ' * 5, rating=random.randint(1, 5),
+                   user_id=users[20 + image].id, listing_id=listing.id, landlord_id=listing.user_id,
+                   created_at=now - timedelta(seconds=image), updated_at=now)
+            for listing in rows for image in range(5)
+        ])
+        db.session.commit()
+
+def median_ms(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+def cases(per_page):
+    """Per model: ORM and row page queries, the three page encoders, and the field encoders."""
+    from app import db
+    from app.models.listing import Listing, listing_serializer
+    from app.models.review import Review, review_serializer, review_with_author_serializer
+    from app.models.user import User, user_serializer
+    
+    return {
+        'listings': {
+            'orm': lambda: Listing.query.order_by(Listing.created_at.desc()).limit(per_page).all(),
+            'rows': lambda: db.session.query(*listing_serializer.columns).order_by(Listing.created_at.desc())
+            .limit(per_page).all(),
+            'page': (legacy_listing_page, lambda items: [item.to_dict() for item in items], Listing.page_dicts),
+            'fields': (legacy_listing, listing_serializer)
+        },
+        'reviews': {
+            'orm': lambda: Review.query.order_by(Review.created_at.desc()).limit(per_page).all(),
+            'rows': lambda: db.session.query(*review_with_author_serializer.columns).join(
+                User, User.id == Review.user_id
+            ).order_by(Review.created_at.desc()).limit(per_page).all(),
+            'page': (legacy_review_page, lambda items: [item.to_dict(include_user=True) for item in items],
+                     review_with_author_serializer.many),
+            'fields': (legacy_review, review_serializer)
+        },
+        'users': {
+            'orm': lambda: User.query.order_by(User.username).limit(per_page).all(),
+            'rows': lambda: db.session.query(*user_serializer.columns).order_by(User.username).limit(per_page).all(),
+            'page': (lambda items: [legacy_user(item) for item in items],
+                     lambda items: [item.to_dict() for item in items], user_serializer.many),
+            'fields': (legacy_user, user_serializer)
+        }
+    }
+
+def measure(name, case, per_page, repeat):
+    from app import db
+    
+    legacy_page, to_dict_page, rows_page = case['page']
+    
+    def fresh(function):
+        # A new session per run, as each request gets
+        def run():
+            db.session.remove()
+            function()
+        return run
+    
+    page = {
+        'legacy': median_ms(fresh(lambda: legacy_page(case['orm']())), repeat),
+        'to_dict': median_ms(fresh(lambda: to_dict_page(case['orm']())), repeat),
+        'rows': median_ms(fresh(lambda: rows_page(case['rows']())), repeat)
+    }
+    
+    # The model's own fields only, on rows and instances already loaded
+    legacy_fields, serializer = case['fields']
+    items = case['orm']()
+    rows = db.session.query(*serializer.columns).limit(per_page).all()
+    encode = {
+        'legacy': median_ms(lambda: [legacy_fields(item) for item in items], repeat),
+        'from_object': median_ms(lambda: [serializer.from_object(item) for item in items], repeat),
+        'from_row': median_ms(lambda: serializer.many(rows), repeat)
+    }
+    db.session.remove()
+    
+    print(f'{name:9} page' + ''.join(f'  {key} {value:6.2f} ms' for key, value in page.items())
+          + '  |  fields' + ''.join(f'  {key} {value:6.3f} ms' for key, value in encode.items()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50, help='Runs per measurement; the median is reported.')
+    parser.add_argument('--listings', type=int, default=2000)
+    args = parser.parse_args()
+    
+    app = make_app()
+    seed(app, args.listings)
+    print(f'{args.per_page} items per page, median of {args.repeat} runs')
+    with app.app_context():
+        for name, case in cases(args.per_page).items():
+            measure(name, case, args.per_page, args.repeat)
+
+if __name__ == '__main__':
+    main()
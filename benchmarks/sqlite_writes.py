@@ -0,0 +1,107 @@
+# benchmarks/sqlite_writes.py
+"""Write throughput and read latency of forked workers sharing one SQLite file.
+
+Each worker process runs writer threads, which create a listing and then
+update it, and reader threads listing pages, as the threads of several
+gunicorn workers would. Three setups are compared: the rollback journal with
+every request committing on its own (``baseline``), WAL with the same
+commits (``wal``), and WAL with writes going through the per-worker
+group-committing writer (``queue``).
+    
+    python -m benchmarks.sqlite_writes --workers 4 --writer-threads 8 --writes 25
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from benchmarks.common import latency_summary, make_app, register
+
+LISTING = {
+    'title': 'Flat', 'description': 'd', 'price': 1000, 'bedrooms': 2, 'bathrooms': 1,
+    'address': 'a', 'city': 'c', 'state': 's', 'zip_code': 'z', 'images': [{'url': 'https://example.com/1.jpg'}]
+}
+
+SETUPS = {
+    'baseline': {'SQLALCHEMY_ENGINE_OPTIONS': {}, 'SQLITE_PRAGMAS': {}, 'SQLITE_WRITE_QUEUE': False},
+    'wal': {'SQLITE_WRITE_QUEUE': False},
+    'queue': {'SQLITE_WRITE_QUEUE': True}
+}
+
+def worker(setup, database_path, headers, args, results):
+    app = make_app(database_path, create_tables=False, **SETUPS[setup])
+    client = app.test_client()
+    writes, reads, errors = [], [], []
+    lock = threading.Lock()
+    
+    def write():
+        for _ in range(args.writes):
+            started = time.perf_counter()
+            response = client.post('/api/listings/', json=LISTING, headers=headers)
+            if response.status_code == 201:
+                listing_id = response.get_json()['listing']['id']
+                response = client.put(f'/api/listings/{listing_id}', json={'price': 1100}, headers=headers)
+            with lock:
+                writes.append(time.perf_counter() - started)
+                if response.status_code not in (200, 201):
+                    errors.append(response.status_code)
+    
+    def read():
+        for _ in range(args.reads):
+            started = time.perf_counter()
+            response = client.get('/api/listings/?per_page=20')
+            with lock:
+                reads.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+    
+    threads = ([threading.Thread(target=write) for _ in range(args.writer_threads)]
+               + [threading.Thread(target=read) for _ in range(args.reader_threads)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((writes, reads, errors))
+
+def measure(setup, args):
+    database_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = make_app(database_path, **SETUPS[setup])
+    _, headers = register(app.test_client(), 'landlord', role='landlord')
+    
+    # Fork like gunicorn does, so every worker starts its own writer thread
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    started = time.perf_counter()
+    processes = [context.Process(target=worker, args=(setup, database_path, headers, args, results))
+                 for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    
+    writes = [duration for result in collected for duration in result[0]]
+    reads = [duration for result in collected for duration in result[1]]
+    errors = [status for result in collected for status in result[2]]
+    # Each write is a create plus an update, so two transactions
+    print(f'{setup:9} {2 * len(writes) / elapsed:5.0f} commits/s  {len(errors)} errors  |  '
+          f'create+update {latency_summary(writes)}  |  reads {latency_summary(reads)}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='Forked worker processes.')
+    parser.add_argument('--writer-threads', type=int, default=8, help='Writing threads per worker.')
+    parser.add_argument('--reader-threads', type=int, default=4, help='Reading threads per worker.')
+    parser.add_argument('--writes', type=int, default=25, help='Create+update pairs per writing thread.')
+    parser.add_argument('--reads', type=int, default=25, help='Page reads per reading thread.')
+    parser.add_argument('--setup', choices=sorted(SETUPS), action='append',
+                        help='Setups to run (default all).')
+    args = parser.parse_args()
+    
+    for setup in args.setup or ['baseline', 'wal', 'queue']:
+        measure(setup, args)
+
+if __name__ == '__main__':
+    main()
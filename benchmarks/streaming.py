@@ -0,0 +1,132 @@
+# benchmarks/streaming.py
+"""Memory and time to first byte of large listing pages, streamed versus buffered.
+
+Seeds a SQLite file with listings (with amenities and images), then serves
+pages of ``--per-page`` listings the two ways the listing routes can: built
+in memory with ``paginate()`` and ``jsonify`` (buffered), or written batch
+by batch from a cursor with ``stream_page`` (streamed). Each mode runs in a
+freshly forked process, so its peak RSS growth over the idle process is its
+own; TTFB is the time until the first body chunk is ready and total the
+time until the last.
+    
+    python -m benchmarks.streaming --per-page 5000 --repeat 10
+"""
+import argparse
+import multiprocessing
+import random
+import resource
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from benchmarks.common import latency_summary, make_app
+
+def seed(app, listings):
+    from app import db
+    from app.models.listing import Amenity, Listing, ListingImage
+    from app.models.user import User
+    
+    with app.app_context():
+        now = datetime.utcnow()
+        users = [
+            User(id=str(uuid.uuid4()), username=f'user{number}', email=f'user{number}@example.com', password_hash='x',
+                 role='landlord', is_verified=True, created_at=now, updated_at=now)
+            for number in range(20)
+        ]
+        amenities = [Amenity(name=f'Amenity {number}', icon='star') for number in range(10)]
+        db.session.add_all(users + amenities)
+        rows = []
+        for number in range(listings):
+            listing = Listing(id=str(uuid.uuid4()), title=f'Apartment {number}', description='Nice place ' * 20,
+                              price=random.randint(500, 5000), bedrooms=random.randint(1, 5), bathrooms=1,
+                              address=f'{number} Main St', city='austin', state='tx', zip_code='78701',
+                              user_id=users[number % 20].id, created_at=now - timedelta(minutes=number))
+            listing.amenities = random.sample(amenities, 3)
+            rows.append(listing)
+        db.session.add_all(rows)
+        db.session.flush()
+        db.session.add_all([ListingImage(url=f'https://example.com/{listing.id}/{image}.jpg', listing_id=listing.id)
+                            for listing in rows for image in range(3)])
+        db.session.commit()
+
+def page_query():
+    # The query GET /api/listings/ pages through
+    from app.models.listing import Listing, listing_serializer
+    
+    return Listing.active().filter_by(is_published=True).with_entities(*listing_serializer.columns).order_by(
+        Listing.created_at.desc()
+    )
+
+def buffered(per_page):
+    from app.models.listing import Listing
+    from app.responses import list_response
+    
+    pagination = page_query().paginate(page=1, per_page=per_page, max_per_page=per_page)
+    return list_response({
+        'items': Listing.page_dicts(pagination.items),
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'page': 1,
+        'per_page': per_page
+    })
+
+def streamed(per_page):
+    from app.models.listing import Listing
+    from app.responses import stream_page
+    
+    return stream_page(page_query(), 1, per_page, Listing.page_dicts)
+
+MODES = {'buffered': buffered, 'streamed': streamed}
+
+def serve(app, mode, per_page):
+    """Build one page and drain its body; returns (seconds to first chunk, seconds to last, bytes)."""
+    from app import db
+    
+    started = time.perf_counter()
+    with app.test_request_context(f'/api/listings/?per_page={per_page}'):
+        chunks = iter(MODES[mode](per_page).response)
+        size = len(next(chunks))
+        first = time.perf_counter() - started
+        size += sum(len(chunk) for chunk in chunks)
+        db.session.remove()
+    return first, time.perf_counter() - started, size
+
+def peak_rss_kib():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def measure(app, mode, per_page, repeat, results):
+    from app import db
+    
+    with app.app_context():
+        # Connections opened before the fork belong to the parent
+        db.engine.dispose()
+    baseline = peak_rss_kib()
+    runs = [serve(app, mode, per_page) for _ in range(repeat)]
+    results.put((mode, peak_rss_kib() - baseline, runs))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-page', type=int, default=5000)
+    parser.add_argument('--listings', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=10, help='Pages served per mode.')
+    parser.add_argument('--batch-size', type=int, default=25, help='STREAM_JSON_BATCH_SIZE for the streamed mode.')
+    args = parser.parse_args()
+    
+    app = make_app(STREAM_JSON_BATCH_SIZE=args.batch_size)
+    seed(app, args.listings)
+    context = multiprocessing.get_context('fork')
+    print(f'{args.per_page} listings per page, {args.repeat} pages per mode, batches of {args.batch_size}')
+    for mode in MODES:
+        results = context.Queue()
+        process = context.Process(target=measure, args=(app, mode, args.per_page, args.repeat, results))
+        process.start()
+        mode, rss, runs = results.get()
+        process.join()
+        print(f'{mode:9} peak RSS +{rss / 1024:6.1f} MiB  '
+              f'TTFB {latency_summary([run[0] for run in runs])}  '
+              f'total {latency_summary([run[1] for run in runs])}  body {runs[-1][2] / 1024:.0f} KiB')
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,182 @@
 import os
 from datetime import timedelta
 
+# Threads per gunicorn worker; each can hold one database connection at a time
+WORKER_THREADS = int(os.environ.get('GUNICORN_THREADS') or 1)
+
+def engine_options(uri, pool_size, max_overflow, pool_timeout, pool_recycle, statement_timeout, sqlite_timeout):
+    """SQLALCHEMY_ENGINE_OPTIONS for ``uri``; every bind, replicas included, shares them."""
+    if uri.startswith('sqlite'):
+        # File locks, not the pool, bound SQLite concurrency: wait for them instead of failing
+        return {'connect_args': {'timeout': sqlite_timeout}}
+    
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': True
+    }
+    if uri.startswith('postgres') and statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout * 1000)}'}
+    return options
+
+def rate_limit_backend(uri):
+    """Default RATE_LIMIT_BACKEND for ``uri``: shared state, unless every write would take the SQLite file lock."""
+    return 'memory' if uri.startswith('sqlite') else 'database'
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'hard-to-guess-string'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Comma-separated read replica URLs; idempotent GET handlers read from these
+    SQLALCHEMY_BINDS = {
+        f'replica_{index}': url
+        for index, url in enumerate(filter(None, (os.environ.get('DATABASE_REPLICA_URLS') or '').split(',')))
+    }
+    # Connection pool per worker process: a connection per request thread plus two for
+    # background threads, so a deployment opens up to workers * (size + overflow) connections
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or WORKER_THREADS + 2)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or WORKER_THREADS)
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 10)
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    DB_STATEMENT_TIMEOUT = float(os.environ.get('DB_STATEMENT_TIMEOUT') or 30)
+    SQLITE_TIMEOUT = float(os.environ.get('SQLITE_TIMEOUT') or 15)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+        DB_POOL_RECYCLE, DB_STATEMENT_TIMEOUT, SQLITE_TIMEOUT
+    )
+    # Applied to every new SQLite connection. WAL lets readers run alongside the writer;
+    # synchronous=NORMAL is durable in WAL mode except for the last commits on power loss
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL',
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL',
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_KB') or 16000),
+        'temp_store': 'MEMORY',
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_BYTES') or 64 * 1024 * 1024)
+    }
+    REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL') or 5)
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG') or 10)
+    READ_YOUR_WRITES_WINDOW = float(os.environ.get('READ_YOUR_WRITES_WINDOW') or 5)
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
-    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
\ No newline at end of file
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    
+    # Number of newest reviews embedded in a listing detail response
+    LISTING_REVIEWS_PREVIEW = int(os.environ.get('LISTING_REVIEWS_PREVIEW') or 5)
+    
+    # Seconds between checks of the shared amenity catalog generation
+    AMENITY_CACHE_CHECK_INTERVAL = float(os.environ.get('AMENITY_CACHE_CHECK_INTERVAL') or 5)
+    
+    # Seconds between batched flushes of buffered listing view counts, and how many (listing, hour) counts to hold
+    LISTING_VIEWS_FLUSH_INTERVAL = float(os.environ.get('LISTING_VIEWS_FLUSH_INTERVAL') or 5)
+    LISTING_VIEWS_MAX_PENDING = int(os.environ.get('LISTING_VIEWS_MAX_PENDING') or 100000)
+    
+    # Rows deleted per statement when the listings.purge job removes a soft-deleted listing
+    LISTING_PURGE_CHUNK_SIZE = int(os.environ.get('LISTING_PURGE_CHUNK_SIZE') or 500)
+    
+    # Listing change feed entries older than this are expired by compaction
+    LISTING_CHANGES_RETENTION_DAYS = int(os.environ.get('LISTING_CHANGES_RETENTION_DAYS') or 30)
+    
+    # Top-rated leaderboard: Bayesian prior weight, cross-worker sync and background rebuild intervals,
+    # and how far back each sync re-reads rating rows for transactions that commit late
+    LEADERBOARD_PRIOR_WEIGHT = float(os.environ.get('LEADERBOARD_PRIOR_WEIGHT') or 5)
+    LEADERBOARD_SYNC_INTERVAL = float(os.environ.get('LEADERBOARD_SYNC_INTERVAL') or 2)
+    LEADERBOARD_REBUILD_INTERVAL = float(os.environ.get('LEADERBOARD_REBUILD_INTERVAL') or 3600)
+    LEADERBOARD_SYNC_OVERLAP = float(os.environ.get('LEADERBOARD_SYNC_OVERLAP') or 30)
+    
+    # Number of recent reviews shown on the landlord dashboard
+    DASHBOARD_RECENT_REVIEWS = int(os.environ.get('DASHBOARD_RECENT_REVIEWS') or 10)
+    
+    # Password hashing: werkzeug method spec (method:hash:iterations), offload pool size
+    # (0 hashes inline) and the number of hash/verify calls allowed in flight per worker
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH') or 16)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 32)
+    
+    # Per-worker cache of user snapshots used to resolve the JWT's current user, and how
+    # often (and how far back) it polls for users changed by other workers
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL') or 30)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    USER_CACHE_SYNC_INTERVAL = float(os.environ.get('USER_CACHE_SYNC_INTERVAL') or 2)
+    USER_CACHE_SYNC_OVERLAP = float(os.environ.get('USER_CACHE_SYNC_OVERLAP') or 5)
+    
+    # Token revocation list (Bloom filter sizing, cross-worker sync with its overlap, background rebuild)
+    REVOCATION_BLOOM_CAPACITY = int(os.environ.get('REVOCATION_BLOOM_CAPACITY') or 100000)
+    REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get('REVOCATION_BLOOM_ERROR_RATE') or 0.001)
+    REVOCATION_CHECKED_SIZE = int(os.environ.get('REVOCATION_CHECKED_SIZE') or 4096)
+    REVOCATION_SYNC_INTERVAL = float(os.environ.get('REVOCATION_SYNC_INTERVAL') or 2)
+    REVOCATION_REBUILD_INTERVAL = float(os.environ.get('REVOCATION_REBUILD_INTERVAL') or 3600)
+    REVOCATION_SYNC_OVERLAP = float(os.environ.get('REVOCATION_SYNC_OVERLAP') or 30)
+    
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto are trusted (0: none)
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS') or 0)
+    
+    # Request throttling ('memory' is per worker, 'database' is shared by all workers)
+    RATE_LIMIT_ENABLED = (os.environ.get('RATE_LIMIT_ENABLED') or 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'memory'
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS') or 100000)
+    
+    # Admin batch user operations
+    USER_BATCH_CHUNK_SIZE = int(os.environ.get('USER_BATCH_CHUNK_SIZE') or 500)
+    USER_BATCH_MAX_IDS = int(os.environ.get('USER_BATCH_MAX_IDS') or 10000)
+    
+    # Response compression (gzip/deflate) for large JSON bodies
+    COMPRESS_ENABLED = (os.environ.get('COMPRESS_ENABLED') or 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 500)
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL') or 6)
+    COMPRESS_CACHE_SIZE = int(os.environ.get('COMPRESS_CACHE_SIZE') or 256)
+    
+    # Pages with at least this many items are streamed from a server-side cursor
+    STREAM_JSON_MIN_PER_PAGE = int(os.environ.get('STREAM_JSON_MIN_PER_PAGE') or 50)
+    STREAM_JSON_BATCH_SIZE = int(os.environ.get('STREAM_JSON_BATCH_SIZE') or 25)
+    
+    # SQLite: funnel writes through one writer thread per worker, committed in groups
+    SQLITE_WRITE_QUEUE = (os.environ.get('SQLITE_WRITE_QUEUE') or 'true').lower() == 'true'
+    SQLITE_WRITE_BATCH_SIZE = int(os.environ.get('SQLITE_WRITE_BATCH_SIZE') or 64)
+    SQLITE_WRITE_TIMEOUT = float(os.environ.get('SQLITE_WRITE_TIMEOUT') or 30)
+    
+    # Background jobs: `flask worker` runs them, as does a thread in each web worker unless disabled
+    JOBS_RUN_IN_PROCESS = (os.environ.get('JOBS_RUN_IN_PROCESS') or 'true').lower() == 'true'
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS') or 4)
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS') or 5)
+    JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS') or 7)
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    SQLALCHEMY_ECHO = (os.environ.get('SQLALCHEMY_ECHO') or 'false').lower() == 'true'
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite://'
+    SQLALCHEMY_BINDS = {}
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, Config.DB_POOL_SIZE, Config.DB_MAX_OVERFLOW, Config.DB_POOL_TIMEOUT,
+        Config.DB_POOL_RECYCLE, Config.DB_STATEMENT_TIMEOUT, Config.SQLITE_TIMEOUT
+    )
+    RATE_LIMIT_ENABLED = False
+    # Hashing inline with few iterations keeps test runs fast
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_WORKERS = 0
+    # Tests run jobs explicitly with job_queue.run_worker(..., burst=True)
+    JOBS_RUN_IN_PROCESS = False
+
+class ProductionConfig(Config):
+    # Fail fast when the pool is exhausted rather than queueing requests behind it
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 5)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        Config.SQLALCHEMY_DATABASE_URI, Config.DB_POOL_SIZE, Config.DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+        Config.DB_POOL_RECYCLE, Config.DB_STATEMENT_TIMEOUT, Config.SQLITE_TIMEOUT
+    )
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or rate_limit_backend(Config.SQLALCHEMY_DATABASE_URI)
+    # Deployed behind one proxy (load balancer or nginx); clients are keyed by their own address
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS') or 1)
+
+# Selected by create_app() from the APP_ENV environment variable
+config_by_name = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+    'default': Config
+}
\ No newline at end of file
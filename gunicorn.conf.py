@@ -0,0 +1,18 @@
+# gunicorn.conf.py
+import multiprocessing
+import os
+
+wsgi_app = 'run:app'
+bind = os.environ.get('GUNICORN_BIND') or '0.0.0.0:' + (os.environ.get('PORT') or '8000')
+
+# Threaded workers: a request waiting on the database holds a thread rather than
+# a whole process, so read concurrency grows without another copy of the app in memory
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count())
+threads = int(os.environ.get('GUNICORN_THREADS') or 8)
+
+# config.py sizes each worker's connection pool from the thread count
+os.environ['GUNICORN_THREADS'] = str(threads)
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE') or 5)
@@ -0,0 +1,28 @@
+"""Assign listing change tokens in commit order
+
+Revision ID: b8f3d2a61c94
+Revises: a3c6e9d15f72
+Create Date: 2026-10-19 22:14:05.207381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8f3d2a61c94'
+down_revision = 'a3c6e9d15f72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tokens continue from the newest existing entry; the feed advances this counter at commit
+    op.execute(
+        "INSERT INTO cache_generations (name, generation) "
+        "SELECT 'listing_changes_seq', COALESCE(MAX(id), 0) FROM listing_changes"
+    )
+
+
+def downgrade():
+    op.execute("DELETE FROM cache_generations WHERE name = 'listing_changes_seq'")
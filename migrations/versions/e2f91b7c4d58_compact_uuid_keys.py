@@ -0,0 +1,116 @@
+"""Store UUID keys in a compact type
+
+Revision ID: e2f91b7c4d58
+Revises: d5e8a1f3b246
+Create Date: 2026-10-19 17:02:44.918306
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f91b7c4d58'
+down_revision = 'd5e8a1f3b246'
+branch_labels = None
+depends_on = None
+
+# (table, [(column, nullable)]) for every key and reference holding a user, listing or review id
+UUID_COLUMNS = [
+    ('users', [('id', False)]),
+    ('listings', [('id', False), ('user_id', False)]),
+    ('reviews', [('id', False), ('user_id', False), ('listing_id', False), ('landlord_id', False)]),
+    ('listing_amenities', [('listing_id', False)]),
+    ('listing_images', [('listing_id', False)]),
+    ('listing_stats', [('listing_id', False)]),
+    ('listing_ratings', [('listing_id', False)]),
+    ('landlord_rollups', [('user_id', False)]),
+    ('listing_changes', [('listing_id', False)]),
+    ('token_revocations', [('user_id', True)]),
+]
+
+# PostgreSQL cannot change the type of a referenced key while foreign keys point at it;
+# these are the default names of the constraints created by earlier migrations
+FOREIGN_KEYS = [
+    ('listings_user_id_fkey', 'listings', 'user_id', 'users', None),
+    ('reviews_user_id_fkey', 'reviews', 'user_id', 'users', None),
+    ('reviews_listing_id_fkey', 'reviews', 'listing_id', 'listings', None),
+    ('listing_amenities_listing_id_fkey', 'listing_amenities', 'listing_id', 'listings', None),
+    ('listing_images_listing_id_fkey', 'listing_images', 'listing_id', 'listings', None),
+    ('listing_stats_listing_id_fkey', 'listing_stats', 'listing_id', 'listings', 'CASCADE'),
+    ('listing_ratings_listing_id_fkey', 'listing_ratings', 'listing_id', 'listings', 'CASCADE'),
+    ('landlord_rollups_user_id_fkey', 'landlord_rollups', 'user_id', 'users', None),
+]
+
+
+def _alter_columns(from_type, to_type, postgresql_cast):
+    for table, columns in UUID_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column, nullable in columns:
+                batch_op.alter_column(column,
+                    existing_type=from_type,
+                    type_=to_type,
+                    existing_nullable=nullable,
+                    postgresql_using=f'{column}::{postgresql_cast}')
+
+
+def _rewrite_values(expression):
+    # Only needed where UUIDs are stored as text; foreign keys are not enforced
+    # during the rewrite, so parents and children can be updated independently
+    for table, columns in UUID_COLUMNS:
+        assignments = ', '.join(f'{column} = {expression.format(column=column)}' for column, _ in columns)
+        op.execute(f'UPDATE {table} SET {assignments}')
+
+
+def _converted_online():
+    # `flask compact-keys` converts large PostgreSQL tables ahead of this
+    # migration without rewriting them; its swap covers every column at once
+    if context.is_offline_mode():
+        return False
+    inspector = sa.inspect(op.get_bind())
+    for table, columns in UUID_COLUMNS:
+        live = {column['name'] for column in inspector.get_columns(table)}
+        if any(f'{column}_uuid' in live for column, _ in columns):
+            raise RuntimeError('flask compact-keys has not finished; run it again before upgrading')
+    users_id = next(column for column in inspector.get_columns('users') if column['name'] == 'id')
+    return isinstance(users_id['type'], sa.Uuid)
+
+
+def upgrade():
+    native = op.get_bind().dialect.name == 'postgresql'
+    # `flask db upgrade -x compact_keys=online` leaves the keys as text for
+    # `flask compact-keys` to convert later; the app works with either
+    if native and context.get_x_argument(as_dictionary=True).get('compact_keys') == 'online':
+        return
+    if native and _converted_online():
+        return
+    if native:
+        for name, table, column, referent, ondelete in FOREIGN_KEYS:
+            op.drop_constraint(name, table, type_='foreignkey')
+    
+    # PostgreSQL: native 16-byte uuid; elsewhere 32 hex digits without the hyphens
+    _alter_columns(sa.String(length=36), sa.Uuid(as_uuid=False), 'uuid')
+    
+    if native:
+        for name, table, column, referent, ondelete in FOREIGN_KEYS:
+            op.create_foreign_key(name, table, referent, [column], ['id'], ondelete=ondelete)
+    else:
+        _rewrite_values("replace({column}, '-', '')")
+
+
+def downgrade():
+    native = op.get_bind().dialect.name == 'postgresql'
+    if native:
+        for name, table, column, referent, ondelete in FOREIGN_KEYS:
+            op.drop_constraint(name, table, type_='foreignkey')
+    else:
+        _rewrite_values(
+            "lower(substr({column}, 1, 8) || '-' || substr({column}, 9, 4) || '-' || "
+            "substr({column}, 13, 4) || '-' || substr({column}, 17, 4) || '-' || substr({column}, 21))"
+        )
+    
+    _alter_columns(sa.Uuid(as_uuid=False), sa.String(length=36), 'text')
+    
+    if native:
+        for name, table, column, referent, ondelete in FOREIGN_KEYS:
+            op.create_foreign_key(name, table, referent, [column], ['id'], ondelete=ondelete)
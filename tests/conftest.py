@@ -0,0 +1,87 @@
+# tests/conftest.py
+import os
+import pytest
+from flask_migrate import upgrade
+from app import create_app, db
+from config import TestingConfig
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build an app on TestingConfig with ``overrides`` applied.
+    
+    With ``migrate=True`` the schema comes from the Alembic migrations on a
+    SQLite file instead of ``db.create_all()`` on an in-memory database;
+    ``x_arg`` passes ``-x`` arguments to them.
+    """
+    apps = []
+    
+    def factory(migrate=False, x_arg=None, **overrides):
+        if migrate:
+            overrides.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'test.db'))
+        app = create_app(type('TestConfig', (TestingConfig,), overrides))
+        with app.app_context():
+            if migrate:
+                upgrade(directory=MIGRATIONS, x_arg=x_arg)
+            else:
+                # Only the primary; tests adding a replica bind give it the schema themselves
+                db.create_all(bind_key=None)
+        apps.append(app)
+        return app
+    
+    yield factory
+    
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def register(client):
+    """Register and log in a user; returns (user id, auth headers)."""
+    def factory(username, role='tenant', verified=False, client=client):
+        response = client.post('/api/auth/register', json={
+            'username': username, 'email': f'{username}@example.com', 'password': 'secret', 'role': role
+        })
+        user_id = response.get_json()['user']['id']
+        if verified:
+            client.get(f'/api/auth/verify/{user_id}')
+        response = client.post('/api/auth/login', json={'email': f'{username}@example.com', 'password': 'secret'})
+        return user_id, {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+    return factory
+
+def listing_payload(**fields):
+    payload = {
+        'title': 'Sunny flat', 'description': 'Two rooms', 'price': 1200, 'bedrooms': 2, 'bathrooms': 1,
+        'address': '1 Main St', 'city': 'Springfield', 'state': 'IL', 'zip_code': '62701'
+    }
+    payload.update(fields)
+    return payload
+
+@pytest.fixture
+def create_listing(client):
+    def factory(headers, client=client, **fields):
+        response = client.post('/api/listings/', json=listing_payload(**fields), headers=headers)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['listing']
+    return factory
+
+@pytest.fixture
+def create_review(client):
+    def factory(headers, listing_id, rating=4, content='Nice place', client=client):
+        response = client.post('/api/reviews/', json={
+            'listing_id': listing_id, 'rating': rating, 'content': content
+        }, headers=headers)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['review']
+    return factory
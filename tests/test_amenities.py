@@ -0,0 +1,44 @@
+# tests/test_amenities.py
+import pytest
+from app import db
+from app.models.cache import CacheGeneration
+from app.models.listing import Amenity
+from app.services.amenity_catalog import amenity_catalog
+
+@pytest.fixture
+def amenities(client, register):
+    _, headers = register('landlord', role='landlord')
+    ids = [
+        client.post('/api/listings/amenities', json={'name': name}, headers=headers).get_json()['amenity']['id']
+        for name in ('Parking', 'Pool')
+    ]
+    return headers, ids
+
+def test_duplicate_amenity_ids_are_linked_once(client, create_listing, amenities):
+    headers, (parking, pool) = amenities
+    listing = create_listing(headers, amenity_ids=[pool, parking, pool, str(parking)])
+    assert [amenity['id'] for amenity in listing['amenities']] == [pool, parking]
+
+@pytest.mark.parametrize('bad_id', [1.5, True, '1.0', None, 'pool'])
+def test_non_integer_amenity_ids_are_rejected(client, create_listing, amenities, bad_id):
+    headers, (parking, _) = amenities
+    response = client.post('/api/listings/', json={
+        'title': 't', 'description': 'd', 'price': 1, 'bedrooms': 1, 'bathrooms': 1,
+        'address': 'a', 'city': 'c', 'state': 's', 'zip_code': 'z', 'amenity_ids': [parking, bad_id]
+    }, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['amenity_ids'] == [bad_id]
+
+def test_amenity_created_by_another_worker_is_accepted(app, create_listing, amenities):
+    headers, _ = amenities
+    app.config['AMENITY_CACHE_CHECK_INTERVAL'] = 3600
+    with app.app_context():
+        # Another worker's insert: the generation moves but this catalog is not reloaded
+        amenity = Amenity(name='Gym')
+        db.session.add(amenity)
+        CacheGeneration.bump(amenity_catalog.GENERATION_KEY)
+        db.session.commit()
+        gym = amenity.id
+    
+    listing = create_listing(headers, amenity_ids=[gym])
+    assert [amenity['id'] for amenity in listing['amenities']] == [gym]
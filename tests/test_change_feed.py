@@ -0,0 +1,67 @@
+# tests/test_change_feed.py
+from sqlalchemy import event
+from app import db
+from app.models.cache import CacheGeneration
+from app.models.listing import Listing, ListingChange
+from app.services.change_feed import listing_change_feed
+
+def test_feed_reports_upserts_unpublishes_and_tombstones(client, register, create_listing):
+    _, landlord = register('landlord', role='landlord')
+    start = client.get('/api/listings/changes').get_json()['next_token']
+    kept = create_listing(landlord, title='Kept')
+    hidden = create_listing(landlord, title='Hidden')
+    gone = create_listing(landlord, title='Gone')
+    client.put(f"/api/listings/{hidden['id']}", json={'is_published': False}, headers=landlord)
+    client.delete(f"/api/listings/{gone['id']}", headers=landlord)
+    
+    body = client.get(f'/api/listings/changes?since={start}').get_json()
+    ops = {change['listing_id']: change['op'] for change in body['changes']}
+    assert ops == {kept['id']: 'upsert', hidden['id']: 'unpublish', gone['id']: 'delete'}
+    upsert = next(change for change in body['changes'] if change['op'] == 'upsert')
+    assert upsert['listing']['title'] == 'Kept'
+    assert 'images' in upsert['listing'] and 'amenities' in upsert['listing']
+    assert body['next_token'] == max(change['token'] for change in body['changes'])
+
+def test_tokens_are_assigned_at_commit(app, register, create_listing):
+    _, landlord = register('landlord', role='landlord')
+    first = create_listing(landlord)
+    with app.app_context():
+        before = ListingChange.latest_token()
+        
+        # Flushed but rolled back: no token is consumed
+        db.session.get(Listing, first['id']).title = 'Draft'
+        db.session.flush()
+        db.session.rollback()
+        assert ListingChange.latest_token() == before
+        
+        # Several flushes in one transaction share one block of tokens taken at commit
+        listing = db.session.get(Listing, first['id'])
+        listing.title = 'Renamed'
+        db.session.flush()
+        listing.price = 999
+        db.session.flush()
+        assert ListingChange.latest_token() == before
+        db.session.commit()
+        
+        assert ListingChange.latest_token() == before + 1
+        assert CacheGeneration.current(listing_change_feed.SEQUENCE_KEY) == before + 1
+
+def test_changes_load_relations_per_batch(app, client, register, create_listing):
+    _, landlord = register('landlord', role='landlord')
+    start = client.get('/api/listings/changes').get_json()['next_token']
+    for number in range(10):
+        create_listing(landlord, title=f'Flat {number}', images=[{'url': f'https://img/{number}.jpg'}])
+    
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        changes, _, _ = listing_change_feed.changes(start, 100)
+    
+    assert len(changes) == 10
+    assert all(len(change['listing']['images']) == 1 for change in changes)
+    assert len(statements) <= 5
+
+def test_migration_seeds_the_token_counter(make_app):
+    app = make_app(migrate=True)
+    with app.app_context():
+        assert db.session.get(CacheGeneration, listing_change_feed.SEQUENCE_KEY) is not None
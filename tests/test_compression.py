@@ -0,0 +1,103 @@
+# tests/test_compression.py
+import zlib
+import pytest
+from flask import Response, request
+from app.services.compression import WBITS, response_compressor
+
+@pytest.fixture
+def compress_app(make_app):
+    """An app with a few extra routes returning bodies of known size and shape."""
+    def factory(**overrides):
+        app = make_app(**overrides)
+        
+        @app.route('/test/text/<int:size>')
+        def text(size):
+            return Response('x' * size, mimetype='text/plain')
+        
+        @app.route('/test/stream')
+        def stream():
+            return Response((f'{{"chunk":{number}}}\n' * 50 for number in range(3)), mimetype='application/json')
+        
+        @app.route('/test/range')
+        def ranged():
+            response = Response('0123456789' * 100, mimetype='text/plain')
+            return response.make_conditional(request, accept_ranges=True, complete_length=1000)
+        
+        response_compressor.clear_cache()
+        return app
+    return factory
+
+def decompress(response):
+    return zlib.decompress(response.get_data(), WBITS[response.headers['Content-Encoding']])
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('gzip', 'gzip'),
+    ('deflate', 'deflate'),
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0.5, deflate', 'deflate'),
+    ('gzip;q=0, deflate;q=0.1', 'deflate'),
+    ('gzip;q=0, deflate;q=0', None),
+    ('br, identity', None),
+    ('', None)
+])
+def test_encoding_is_negotiated(compress_app, accept, encoding):
+    client = compress_app().test_client()
+    response = client.get('/test/text/1000', headers={'Accept-Encoding': accept})
+    assert response.headers.get('Content-Encoding') == encoding
+    assert 'Accept-Encoding' in response.vary
+    body = decompress(response) if encoding else response.get_data()
+    assert body == b'x' * 1000
+
+def test_small_bodies_are_sent_as_is(compress_app):
+    client = compress_app(COMPRESS_MIN_SIZE=500).test_client()
+    assert 'Content-Encoding' not in client.get('/test/text/499', headers={'Accept-Encoding': 'gzip'}).headers
+    assert client.get('/test/text/500', headers={'Accept-Encoding': 'gzip'}).headers['Content-Encoding'] == 'gzip'
+
+def test_streamed_chunks_are_flushed_as_they_are_produced(compress_app):
+    client = compress_app().test_client()
+    response = client.get('/test/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    
+    # Each compressed chunk decodes to its whole source chunk, without waiting for the next
+    decompressor = zlib.decompressobj(WBITS['gzip'])
+    chunks = [decompressor.decompress(chunk) for chunk in response.response]
+    assert chunks[:3] == [f'{{"chunk":{number}}}\n'.encode() * 50 for number in range(3)]
+    assert chunks[3:] == [b''] and decompressor.eof
+
+def test_bodies_with_a_strong_etag_are_compressed_once(compress_app):
+    app = compress_app(COMPRESS_MIN_SIZE=1)
+    client = app.test_client()
+    
+    def stats():
+        return response_compressor.stats().get('listings.get_amenities', {'responses': 0, 'cache_hits': 0})
+    before = stats()
+    gzipped = [client.get('/api/listings/amenities', headers={'Accept-Encoding': 'gzip'}) for _ in range(2)]
+    deflated = client.get('/api/listings/amenities', headers={'Accept-Encoding': 'deflate'})
+    after = stats()
+    
+    assert after['responses'] - before['responses'] == 3
+    # The second gzip response came from the cache; deflate is cached under its own key
+    assert after['cache_hits'] - before['cache_hits'] == 1
+    assert gzipped[0].get_data() == gzipped[1].get_data()
+    assert decompress(gzipped[0]) == decompress(deflated) == client.get('/api/listings/amenities').get_data()
+
+def test_weakened_etag_still_revalidates(compress_app):
+    client = compress_app(COMPRESS_MIN_SIZE=1).test_client()
+    plain = client.get('/api/listings/amenities')
+    compressed = client.get('/api/listings/amenities', headers={'Accept-Encoding': 'gzip'})
+    etag, weak = compressed.get_etag()
+    assert weak and etag == plain.get_etag()[0] and plain.get_etag()[1] is False
+    
+    for tag in (compressed.headers['ETag'], plain.headers['ETag']):
+        response = client.get('/api/listings/amenities', headers={'Accept-Encoding': 'gzip', 'If-None-Match': tag})
+        assert response.status_code == 304
+        assert response.get_data() == b''
+
+def test_partial_responses_are_not_compressed(compress_app):
+    client = compress_app().test_client()
+    response = client.get('/test/range', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-599'})
+    assert response.status_code == 206
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Content-Range'] == 'bytes 0-599/1000'
+    assert response.get_data() == ('0123456789' * 60).encode()
@@ -0,0 +1,90 @@
+# tests/test_config.py
+import importlib.util
+import sqlite3
+import pytest
+from sqlalchemy import event
+import config
+from app import create_app, db
+
+def load_config(monkeypatch, **environ):
+    """A fresh copy of the config module read from ``environ``; the one the app imported is left alone."""
+    for key in ('DATABASE_URL', 'DB_POOL_TIMEOUT', 'DB_STATEMENT_TIMEOUT', 'RATE_LIMIT_BACKEND', 'TRUSTED_PROXY_HOPS'):
+        monkeypatch.delenv(key, raising=False)
+    for key, value in environ.items():
+        monkeypatch.setenv(key, value)
+    spec = importlib.util.spec_from_file_location('fresh_config', config.__file__)
+    settings = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(settings)
+    return settings
+
+@pytest.mark.parametrize('app_env, profile', [
+    ('development', 'DevelopmentConfig'),
+    ('testing', 'TestingConfig'),
+    ('production', 'ProductionConfig'),
+    (None, 'Config')
+])
+def test_app_env_selects_the_profile(monkeypatch, app_env, profile):
+    if app_env is None:
+        monkeypatch.delenv('APP_ENV', raising=False)
+    else:
+        monkeypatch.setenv('APP_ENV', app_env)
+    # Each profile as is, but on an in-memory database
+    for name, config_class in list(config.config_by_name.items()):
+        monkeypatch.setitem(config.config_by_name, name, type(config_class.__name__, (config_class,), {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SQLALCHEMY_BINDS': {}, 'PASSWORD_HASH_WORKERS': 0
+        }))
+    
+    app = create_app()
+    base = getattr(config, profile)
+    assert type(app.config).__name__ == 'Config'
+    assert app.config['DEBUG'] is (profile == 'DevelopmentConfig')
+    assert app.config['TESTING'] is (profile == 'TestingConfig')
+    assert app.config['TRUSTED_PROXY_HOPS'] == base.TRUSTED_PROXY_HOPS
+    assert app.config['RATE_LIMIT_ENABLED'] is base.RATE_LIMIT_ENABLED
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] is base.SQLALCHEMY_ENGINE_OPTIONS
+
+def test_profiles_recompute_engine_options(monkeypatch):
+    settings = load_config(monkeypatch, DATABASE_URL='postgresql://db.internal/apartments', DB_STATEMENT_TIMEOUT='2.5')
+    
+    base = settings.Config.SQLALCHEMY_ENGINE_OPTIONS
+    assert base['pool_timeout'] == 10 and base['pool_pre_ping'] is True
+    assert base['connect_args'] == {'options': '-c statement_timeout=2500'}
+    # Production's own DB_POOL_TIMEOUT reaches its engine options; the other sizing is inherited
+    production = settings.ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS
+    assert production == dict(base, pool_timeout=5)
+    assert settings.ProductionConfig.RATE_LIMIT_BACKEND == 'database'
+    # Tests default to in-memory SQLite, whose options have no pool sizing at all
+    assert settings.TestingConfig.SQLALCHEMY_ENGINE_OPTIONS == {'connect_args': {'timeout': 15}}
+
+def test_production_on_sqlite_uses_sqlite_options(monkeypatch):
+    settings = load_config(monkeypatch, DB_POOL_TIMEOUT='7')
+    assert settings.Config.SQLALCHEMY_DATABASE_URI == 'sqlite:///app.db'
+    assert settings.ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS == {'connect_args': {'timeout': 15}}
+    assert settings.ProductionConfig.DB_POOL_TIMEOUT == 7
+    assert settings.ProductionConfig.RATE_LIMIT_BACKEND == 'memory'
+
+def test_readiness_fails_while_the_database_is_down(make_app):
+    app = make_app(migrate=True)
+    client = app.test_client()
+    response = client.get('/api/health/ready')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'ready'
+    
+    def refuse(dialect, connection_record, cargs, cparams):
+        raise sqlite3.OperationalError('unable to open database file')
+    with app.app_context():
+        engine = db.engine
+    engine.dispose()
+    event.listen(engine, 'do_connect', refuse)
+    try:
+        response = client.get('/api/health/ready')
+        assert response.status_code == 503
+        assert response.get_json()['status'] == 'unavailable'
+        assert 'unable to open database file' in response.get_json()['details']
+        assert 'default' in response.get_json()['pools']
+        # Liveness doesn't depend on the database
+        assert client.get('/api/health').status_code == 200
+    finally:
+        event.remove(engine, 'do_connect', refuse)
+    
+    assert client.get('/api/health/ready').status_code == 200
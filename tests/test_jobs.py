@@ -0,0 +1,168 @@
+# tests/test_jobs.py
+import threading
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.job import Job
+from app.services import jobs
+from app.services.jobs import job_queue
+
+@pytest.fixture
+def job_app(make_app, monkeypatch):
+    """A migrated app on a SQLite file with a ``test.record`` job that logs its payloads."""
+    app = make_app(migrate=True, JOB_RETRY_BASE=10, JOB_RETRY_MAX=15, JOB_CLAIM_TIMEOUT=600)
+    app.ran = []
+    lock = threading.Lock()
+    
+    def record(**payload):
+        with lock:
+            app.ran.append(payload)
+    monkeypatch.setitem(job_queue._handlers, 'test.record', (record, None))
+    return app
+
+def fail_with(monkeypatch, max_attempts):
+    def fail(**payload):
+        raise RuntimeError('boom')
+    monkeypatch.setitem(job_queue._handlers, 'test.fail', (fail, max_attempts))
+
+def enqueue(app, name='test.record', payload=None, **kwargs):
+    with app.app_context():
+        job_queue.enqueue(name, payload, **kwargs)
+        db.session.commit()
+
+def jobs_by_status(app):
+    with app.app_context():
+        return sorted((job.status, job.payload.get('n')) for job in Job.query.all())
+
+def test_jobs_exist_only_once_their_transaction_commits(job_app):
+    with job_app.app_context():
+        job_queue.enqueue('test.record', {'n': 1})
+        db.session.rollback()
+        job_queue.enqueue('test.record', {'n': 2})
+        db.session.commit()
+        with pytest.raises(ValueError):
+            job_queue.enqueue('test.unknown')
+    
+    assert job_queue.run_worker(1, burst=True) == 1
+    assert job_app.ran == [{'n': 2}]
+    with job_app.app_context():
+        job = Job.query.one()
+        assert (job.status, job.attempts, job.locked_by, job.last_error) == ('done', 1, None, None)
+        assert job.finished_at is not None
+
+def test_claimed_jobs_are_not_claimed_again(job_app):
+    for number in range(3):
+        enqueue(job_app, payload={'n': number})
+    with job_app.app_context():
+        first = job_queue._claim('first', 2)
+        # The conditional UPDATE only matches jobs still queued
+        assert job_queue._claim('second', 10) == [max(first) + 1]
+        assert job_queue._claim('third', 10) == []
+        assert {job.locked_by for job in Job.query.all()} == {'first', 'second'}
+
+def test_concurrent_workers_run_each_job_once(job_app):
+    for number in range(40):
+        enqueue(job_app, payload={'n': number})
+    
+    processed = []
+    workers = [threading.Thread(target=lambda: processed.append(job_queue.run_worker(2, burst=True)))
+               for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    assert sum(processed) == 40
+    assert sorted(payload['n'] for payload in job_app.ran) == list(range(40))
+    assert jobs_by_status(job_app) == [('done', number) for number in range(40)]
+
+def test_failures_back_off_then_fail(job_app, monkeypatch):
+    fail_with(monkeypatch, max_attempts=3)
+    enqueue(job_app, 'test.fail', dedup_key='fail')
+    
+    # Base 10s doubling per attempt, capped at 15s, then jittered down by up to half
+    for attempts, (low, high) in enumerate([(5, 10), (7.5, 15)], start=1):
+        started = datetime.utcnow()
+        assert job_queue.run_worker(1, burst=True) == 1
+        with job_app.app_context():
+            job = Job.query.one()
+            assert (job.status, job.attempts, job.last_error) == ('queued', attempts, 'RuntimeError: boom')
+            assert timedelta(seconds=low) <= job.run_at - started <= timedelta(seconds=high + 1)
+            # Not due yet: a burst worker finds nothing to do
+            assert job_queue.run_worker(1, burst=True) == 0
+            job.run_at = datetime.utcnow()
+            db.session.commit()
+    
+    assert job_queue.run_worker(1, burst=True) == 1
+    with job_app.app_context():
+        job = Job.query.one()
+        assert (job.status, job.attempts, job.dedup_key) == ('failed', 3, None)
+        assert job.finished_at is not None
+
+def test_expired_claims_are_requeued(job_app):
+    now = datetime.utcnow()
+    with job_app.app_context():
+        db.session.add_all([
+            Job(name='test.record', payload={'n': 1}, status='running', attempts=1, max_attempts=5,
+                locked_by='dead', locked_at=now - timedelta(seconds=700)),
+            Job(name='test.record', payload={'n': 2}, status='running', attempts=1, max_attempts=5,
+                locked_by='busy', locked_at=now - timedelta(seconds=60))
+        ])
+        db.session.commit()
+    
+    assert job_queue.run_worker(1, burst=True) == 1
+    assert job_app.ran == [{'n': 1}]
+    with job_app.app_context():
+        stale, busy = Job.query.order_by(Job.id).all()
+        assert (stale.status, stale.attempts) == ('done', 2)
+        assert (busy.status, busy.locked_by) == ('running', 'busy')
+        
+        # A worker finishing late doesn't touch a claim that is no longer its own
+        job_queue._finish('dead', busy.id, 1, 5, 'RuntimeError: late')
+        db.session.refresh(busy)
+        assert (busy.status, busy.last_error) == ('running', None)
+
+@pytest.mark.parametrize('upsert', [True, False])
+def test_dedup_key_skips_jobs_already_pending(job_app, monkeypatch, upsert):
+    if not upsert:
+        # Dialects without ON CONFLICT fall back to a savepoint around the insert
+        monkeypatch.setattr(jobs, 'upsert_insert', lambda: None)
+    with job_app.app_context():
+        job_queue.enqueue('test.record', {'n': 1}, dedup_key='same')
+        job_queue.enqueue('test.record', {'n': 2}, dedup_key='same')
+        job_queue.enqueue('test.record', {'n': 3}, dedup_key='other')
+        db.session.commit()
+    enqueue(job_app, payload={'n': 4}, dedup_key='same')
+    assert jobs_by_status(job_app) == [('queued', 1), ('queued', 3)]
+    
+    job_queue.run_worker(1, burst=True)
+    # Finished jobs release their key
+    enqueue(job_app, payload={'n': 5}, dedup_key='same')
+    assert jobs_by_status(job_app) == [('done', 1), ('done', 3), ('queued', 5)]
+
+def test_worker_command_in_burst_mode(job_app):
+    for number in range(3):
+        enqueue(job_app, payload={'n': number})
+    result = job_app.test_cli_runner().invoke(args=['worker', '--burst', '--threads', '2'])
+    assert result.exit_code == 0, result.output
+    assert result.output.strip() == 'Ran 3 job(s)'
+    assert len(job_app.ran) == 3
+
+def test_prune_jobs_deletes_old_finished_jobs(job_app):
+    now = datetime.utcnow()
+    with job_app.app_context():
+        db.session.add_all([
+            Job(name='test.record', payload={'n': number}, status=status, max_attempts=5, finished_at=finished_at,
+                created_at=now - timedelta(days=30))
+            for number, status, finished_at in [
+                (1, 'done', now - timedelta(days=8)),
+                (2, 'failed', now - timedelta(days=8)),
+                (3, 'done', now - timedelta(days=1)),
+                (4, 'queued', None)
+            ]
+        ])
+        db.session.commit()
+    
+    result = job_app.test_cli_runner().invoke(args=['prune-jobs'])
+    assert result.output.strip() == 'Pruned 2 job(s)'
+    assert jobs_by_status(job_app) == [('done', 3), ('queued', 4)]
@@ -0,0 +1,106 @@
+# tests/test_keys.py
+import base64
+import os
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from app import db
+from app.models.user import User
+
+def test_malformed_ids_are_not_found(client, register):
+    _, landlord = register('landlord', role='landlord')
+    _, tenant = register('tenant', verified=True)
+    
+    assert client.get('/api/listings/not-a-uuid').status_code == 404
+    assert client.get('/api/reviews/listing/not-a-uuid').status_code == 404
+    assert client.put('/api/listings/not-a-uuid', json={'title': 'x'}, headers=landlord).status_code == 404
+    assert client.delete('/api/reviews/not-a-uuid', headers=tenant).status_code == 404
+    response = client.post('/api/reviews/', json={'listing_id': 'not-a-uuid', 'rating': 4, 'content': 'ok'},
+                           headers=tenant)
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Listing not found'}
+
+def test_cursor_with_malformed_review_id_is_rejected(client, register, create_listing):
+    _, landlord = register('landlord', role='landlord')
+    listing = create_listing(landlord)
+    cursor = base64.urlsafe_b64encode(b'2026-01-01T00:00:00|not-a-uuid').decode('ascii')
+    response = client.get(f"/api/reviews/listing/{listing['id']}?cursor={cursor}")
+    assert response.status_code == 400
+
+def test_ids_match_in_any_spelling(client, register, create_listing):
+    _, landlord = register('landlord', role='landlord')
+    listing = create_listing(landlord)
+    for spelling in (listing['id'].upper(), listing['id'].replace('-', '')):
+        response = client.get(f'/api/listings/{spelling}')
+        assert response.status_code == 200
+        assert response.get_json()['id'] == listing['id']
+
+def test_batch_reports_malformed_ids_as_not_found(app, client, register):
+    admin_id, _ = register('admin')
+    with app.app_context():
+        db.session.get(User, admin_id).role = 'admin'
+        db.session.commit()
+    # Log in again for a token carrying the new role
+    response = client.post('/api/auth/login', json={'email': 'admin@example.com', 'password': 'secret'})
+    admin = {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+    tenant_id, _ = register('tenant')
+    
+    response = client.post('/api/users/batch', json={'action': 'verify', 'user_ids': [tenant_id, 'nope']},
+                           headers=admin)
+    assert response.status_code == 200
+    assert response.get_json()['results'] == {tenant_id: 'updated', 'nope': 'not_found'}
+
+def test_compact_keys_only_runs_on_postgres(app):
+    result = app.test_cli_runner().invoke(args=['compact-keys'])
+    assert result.exit_code != 0
+    assert 'Only PostgreSQL' in result.output
+
+@pytest.fixture
+def postgres_url():
+    """A fresh database on the server at TEST_POSTGRES_URL, dropped afterwards."""
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if not url:
+        pytest.skip('TEST_POSTGRES_URL is not set')
+    name = f'apartment_test_{os.getpid()}'
+    server = create_engine(url, isolation_level='AUTOCOMMIT')
+    with server.connect() as connection:
+        connection.exec_driver_sql(f'DROP DATABASE IF EXISTS {name} WITH (FORCE)')
+        connection.exec_driver_sql(f'CREATE DATABASE {name}')
+    yield make_url(url).set(database=name).render_as_string(hide_password=False)
+    with server.connect() as connection:
+        connection.exec_driver_sql(f'DROP DATABASE IF EXISTS {name} WITH (FORCE)')
+    server.dispose()
+
+def key_types(app):
+    with app.app_context():
+        return set(db.session.execute(db.text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE (table_name, column_name) IN (('users', 'id'), ('listings', 'user_id'), ('reviews', 'listing_id'))"
+        )).scalars())
+
+def test_compact_keys_converts_postgres_online(postgres_url, make_app, register, create_listing, create_review):
+    app = make_app(migrate=True, x_arg=['compact_keys=online'],
+                   SQLALCHEMY_DATABASE_URI=postgres_url, SQLALCHEMY_ENGINE_OPTIONS={})
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    _, tenant = register('tenant', verified=True, client=client)
+    listing = create_listing(landlord, client=client)
+    review = create_review(tenant, listing['id'], client=client)
+    assert key_types(app) == {'character varying'}
+    
+    # Batches of one row walk every table's key range one step at a time
+    result = app.test_cli_runner().invoke(args=['compact-keys', '--batch-size', '1'])
+    assert result.exit_code == 0, result.output
+    assert key_types(app) == {'uuid'}
+    
+    response = client.get(f"/api/reviews/listing/{listing['id']}")
+    assert [item['id'] for item in response.get_json()['items']] == [review['id']]
+    assert client.get(f"/api/listings/{listing['id']}", headers=landlord).status_code == 200
+    
+    # Nothing left to do, and the schema is exactly what the models describe
+    assert app.test_cli_runner().invoke(args=['compact-keys']).exit_code == 0
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert compare_metadata(MigrationContext.configure(connection), db.metadata) == []
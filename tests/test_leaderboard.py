@@ -0,0 +1,57 @@
+# tests/test_leaderboard.py
+import threading
+import time
+from datetime import timedelta
+from app import db
+from app.models.listing import ListingRating
+from app.services.leaderboard import leaderboard
+
+def wait_for_rankings(timeout=10):
+    deadline = time.monotonic() + timeout
+    while not leaderboard._loaded and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert leaderboard._loaded
+
+def test_requests_never_rebuild(make_app, register, create_listing, create_review, monkeypatch):
+    app = make_app(migrate=True)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    _, tenant = register('tenant', verified=True, client=client)
+    listing = create_listing(landlord, client=client)
+    create_review(tenant, listing['id'], rating=5, client=client)
+    
+    rebuilt_on = []
+    rebuild = leaderboard.rebuild
+    monkeypatch.setattr(leaderboard, 'rebuild', lambda: rebuilt_on.append(threading.current_thread().name) or rebuild())
+    wait_for_rankings()
+    assert [item['listing_id'] for item in client.get('/api/listings/top').get_json()['items']] == [listing['id']]
+    
+    # Too far behind to replay: the request keeps serving the snapshot and wakes the rebuild thread
+    monkeypatch.setattr(leaderboard, '_synced_at', 0.0)
+    monkeypatch.setattr('app.services.leaderboard.listing_change_feed.token_expired', lambda token: True)
+    rebuilds = len(rebuilt_on)
+    assert len(client.get('/api/listings/top').get_json()['items']) == 1
+    deadline = time.monotonic() + 10
+    while len(rebuilt_on) == rebuilds and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert len(rebuilt_on) > rebuilds and set(rebuilt_on) == {'leaderboard-rebuild'}
+
+def test_late_rating_commits_within_the_overlap_are_picked_up(make_app, register, create_listing, create_review):
+    app = make_app(LEADERBOARD_SYNC_INTERVAL=0, LEADERBOARD_SYNC_OVERLAP=60)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    _, tenant = register('tenant', verified=True, client=client)
+    listing = create_listing(landlord, client=client)
+    create_review(tenant, listing['id'], rating=4, client=client)
+    assert client.get('/api/listings/top').get_json()['items'][0]['review_count'] == 1
+    
+    with app.app_context():
+        # Another worker's review, stamped half a minute before it committed
+        db.session.query(ListingRating).filter_by(listing_id=listing['id']).update({
+            ListingRating.review_count: 2,
+            ListingRating.rating_sum: 6,
+            ListingRating.updated_at: leaderboard._ratings_seen - timedelta(seconds=30)
+        })
+        db.session.commit()
+    
+    assert client.get('/api/listings/top').get_json()['items'][0]['review_count'] == 2
@@ -0,0 +1,115 @@
+# tests/test_listing_purge.py
+import uuid
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models.job import Job
+from app.models.listing import Amenity, Listing, ListingImage, ListingRating, ListingStat, listing_amenities
+from app.models.review import Review
+from app.models.user import User
+from app.services.jobs import job_queue
+
+@pytest.fixture
+def purge_app(make_app, register):
+    # Built after the default app that ``register`` brings along, so the services are bound to this one
+    return make_app(migrate=True, LISTING_PURGE_CHUNK_SIZE=2)
+
+def seed(app, client, register, create_listing, create_review, title):
+    """A listing with an amenity, three images, five reviews (one through the API) and a view count."""
+    _, landlord = register(f'{title}-landlord', role='landlord', client=client)
+    _, tenant = register(f'{title}-tenant', verified=True, client=client)
+    response = client.post('/api/listings/amenities', json={'name': title}, headers=landlord)
+    amenity_id = response.get_json()['amenity']['id']
+    listing = create_listing(landlord, client=client, title=title, amenity_ids=[amenity_id])
+    create_review(tenant, listing['id'], client=client)
+    with app.app_context():
+        for number in range(4):
+            user = User(id=str(uuid.uuid4()), username=f'{title}-{number}', email=f'{title}-{number}@example.com',
+                        password_hash='x')
+            db.session.add(user)
+            db.session.add(Review(content='ok', rating=3, user_id=user.id, listing_id=listing['id'],
+                                  landlord_id=listing['user_id']))
+        db.session.add_all([ListingImage(url=f'https://example.com/{number}.jpg', listing_id=listing['id'])
+                            for number in range(3)])
+        ListingStat.add_views({(listing['id'], datetime.utcnow().replace(minute=0, second=0, microsecond=0)): 4})
+        db.session.commit()
+    return listing['id'], landlord
+
+def remaining(app, listing_id):
+    with app.app_context():
+        return {
+            'listing': Listing.query.filter_by(id=listing_id).count(),
+            'reviews': Review.query.filter_by(listing_id=listing_id).count(),
+            'images': ListingImage.query.filter_by(listing_id=listing_id).count(),
+            'amenities': db.session.query(listing_amenities).filter_by(listing_id=listing_id).count(),
+            'stats': ListingStat.query.filter_by(listing_id=listing_id).count(),
+            'ratings': ListingRating.query.filter_by(listing_id=listing_id).count()
+        }
+
+def test_deleted_listings_are_purged_by_the_job(purge_app, register, create_listing, create_review):
+    client = purge_app.test_client()
+    deleted, landlord = seed(purge_app, client, register, create_listing, create_review, 'deleted')
+    kept, _ = seed(purge_app, client, register, create_listing, create_review, 'kept')
+    untouched = remaining(purge_app, kept)
+    assert remaining(purge_app, deleted) == untouched == {
+        'listing': 1, 'reviews': 5, 'images': 3, 'amenities': 1, 'stats': 1, 'ratings': 1
+    }
+    
+    assert client.delete(f'/api/listings/{deleted}', headers=landlord).status_code == 200
+    assert client.delete(f'/api/listings/{deleted}', headers=landlord).status_code == 404
+    assert client.get(f'/api/listings/{deleted}').status_code == 404
+    # Only stamped so far, with one purge job queued
+    assert remaining(purge_app, deleted)['reviews'] == 5
+    with purge_app.app_context():
+        assert [(job.name, job.payload) for job in Job.query.all()] == [('listings.purge', {'listing_id': deleted})]
+    
+    assert job_queue.run_worker(1, burst=True) == 1
+    assert remaining(purge_app, deleted) == dict.fromkeys(untouched, 0)
+    assert remaining(purge_app, kept) == untouched
+    with purge_app.app_context():
+        # Amenities are shared and outlive the listing
+        assert Amenity.query.count() == 2
+
+def test_rows_are_deleted_in_chunks(purge_app, register, create_listing, create_review):
+    client = purge_app.test_client()
+    listing_id, landlord = seed(purge_app, client, register, create_listing, create_review, 'chunked')
+    client.delete(f'/api/listings/{listing_id}', headers=landlord)
+    
+    statements = []
+    commits = []
+    with purge_app.app_context():
+        engine = db.engine
+    
+    def record(connection, cursor, statement, *args):
+        statements.append(statement.split('WHERE')[0].strip())
+    
+    def commit(connection):
+        commits.append(len(statements))
+    event.listen(engine, 'before_cursor_execute', record)
+    event.listen(engine, 'commit', commit)
+    try:
+        job_queue.run_worker(1, burst=True)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+        event.remove(engine, 'commit', commit)
+    
+    # Five reviews and three images at two rows per statement, each chunk committed on its own
+    assert statements.count('DELETE FROM reviews') == 3
+    assert statements.count('DELETE FROM listing_images') == 2
+    deletes = [number for number, statement in enumerate(statements, 1) if statement == 'DELETE FROM reviews']
+    assert all(number in commits for number in deletes)
+    assert remaining(purge_app, listing_id)['listing'] == 0
+
+def test_purge_listings_sweeps_up_listings_without_a_job(purge_app, register, create_listing, create_review):
+    client = purge_app.test_client()
+    listing_id, _ = seed(purge_app, client, register, create_listing, create_review, 'orphan')
+    with purge_app.app_context():
+        # Soft-deleted, but its job ran out of attempts and was pruned
+        db.session.get(Listing, listing_id).deleted_at = datetime.utcnow()
+        db.session.commit()
+    
+    result = purge_app.test_cli_runner().invoke(args=['purge-listings'])
+    assert result.output.strip() == 'Purged 1 listing(s)'
+    assert set(remaining(purge_app, listing_id).values()) == {0}
+    assert purge_app.test_cli_runner().invoke(args=['purge-listings']).output.strip() == 'Purged 0 listing(s)'
@@ -0,0 +1,55 @@
+# tests/test_password_hasher.py
+import pytest
+from werkzeug.security import generate_password_hash
+from app.services.password_hasher import canonical_method, password_hasher
+
+@pytest.mark.parametrize('method, expected', [
+    ('pbkdf2', 'pbkdf2:sha256:600000'),
+    ('pbkdf2:sha512', 'pbkdf2:sha512:600000'),
+    ('pbkdf2:sha256:1000', 'pbkdf2:sha256:1000'),
+    ('scrypt', 'scrypt:32768:8:1'),
+])
+def test_canonical_method_matches_what_werkzeug_stores(method, expected):
+    assert canonical_method(method)[0] == expected
+    assert generate_password_hash('x', method, 16).split('$')[0] == expected
+
+@pytest.mark.parametrize('method', ['sha256', 'plain', 'pbkdf2:sha256:1:2'])
+def test_unsupported_methods_are_rejected(make_app, method):
+    with pytest.raises(ValueError):
+        make_app(PASSWORD_HASH_METHOD=method)
+
+def test_hash_that_would_not_fit_the_column_is_rejected(make_app):
+    with pytest.raises(ValueError):
+        make_app(PASSWORD_HASH_METHOD='scrypt', PASSWORD_SALT_LENGTH=128)
+
+def test_needs_rehash_compares_every_parameter(app):
+    with app.app_context():
+        app.config.update(PASSWORD_HASH_METHOD='pbkdf2', PASSWORD_SALT_LENGTH=16)
+        current = generate_password_hash('x', 'pbkdf2:sha256:600000', 16)
+        assert not password_hasher.needs_rehash(current)
+        assert password_hasher.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:1000', 16))
+        assert password_hasher.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:600000', 8))
+        assert password_hasher.needs_rehash(generate_password_hash('x', 'scrypt', 16))
+
+def test_login_rehashes_when_parameters_change(app, client, register):
+    from app import db
+    from app.models.user import User
+    
+    user_id, _ = register('tenant')
+    app.config['PASSWORD_SALT_LENGTH'] = 24
+    response = client.post('/api/auth/login', json={'email': 'tenant@example.com', 'password': 'secret'})
+    assert response.status_code == 200
+    with app.app_context():
+        stored = db.session.get(User, user_id).password_hash
+        assert len(stored.split('$')[1]) == 24
+        assert not password_hasher.needs_rehash(stored)
+
+def test_pool_processes_are_not_forked(make_app):
+    app = make_app(PASSWORD_HASH_WORKERS=1)
+    with app.app_context():
+        try:
+            pool = password_hasher._ensure_pool()
+            assert pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+            assert password_hasher.verify(password_hasher.hash('secret'), 'secret')
+        finally:
+            password_hasher.shutdown()
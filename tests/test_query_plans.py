@@ -0,0 +1,51 @@
+# tests/test_query_plans.py
+import pytest
+from app import db
+from app.query_plans import ENDPOINT_QUERIES, endpoint_context, explain_endpoint
+
+@pytest.fixture
+def seeded_app(make_app, register):
+    """Migrated schema with a landlord, a tenant, an amenity, listings and reviews."""
+    app = make_app(migrate=True)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    _, tenant = register('tenant', verified=True, client=client)
+    amenity = client.post('/api/listings/amenities', json={'name': 'Parking'}, headers=landlord).get_json()['amenity']
+    for number in range(3):
+        listing = client.post('/api/listings/', json={
+            'title': f'Flat {number}', 'description': 'd', 'price': 1000 + number, 'bedrooms': 2,
+            'bathrooms': 1, 'address': 'a', 'city': 'Springfield', 'state': 'IL', 'zip_code': '1',
+            'amenity_ids': [amenity['id']], 'images': [{'url': f'https://img/{number}.jpg'}]
+        }, headers=landlord).get_json()['listing']
+        client.post('/api/reviews/', json={'listing_id': listing['id'], 'rating': 4, 'content': 'ok'},
+                    headers=tenant)
+    return app
+
+@pytest.mark.parametrize('description, path, role', ENDPOINT_QUERIES, ids=[query[0] for query in ENDPOINT_QUERIES])
+def test_endpoint_queries_do_not_scan_hot_tables(seeded_app, description, path, role):
+    with seeded_app.app_context():
+        values, tokens = endpoint_context()
+        status, plans = explain_endpoint(seeded_app, path.format(**values), tokens.get(role))
+        db.session.remove()
+    
+    assert status < 500
+    assert plans, f'{description} issued no queries'
+    for statement, plan, scans in plans:
+        assert not scans, f'{description} scans a hot table:\n{statement}\n' + '\n'.join(plan)
+
+@pytest.mark.parametrize('path, role, index', [
+    ('/api/listings/', None, 'ix_listings_published_created_at'),
+    ('/api/listings/?per_page=60', None, 'ix_listings_published_created_at'),
+    ('/api/reviews/listing/{listing_id}', None, 'ix_reviews_listing_id_created_at'),
+    ('/api/users/me/listings', 'landlord', 'ix_listings_user_id_created_at'),
+    ('/api/listings/{listing_id}', None, 'ix_listing_images_listing_id'),
+])
+def test_endpoint_queries_use_their_index(seeded_app, path, role, index):
+    with seeded_app.app_context():
+        values, tokens = endpoint_context()
+        status, plans = explain_endpoint(seeded_app, path.format(**values), tokens.get(role))
+        db.session.remove()
+    
+    assert status == 200
+    used = [line for statement, plan, scans in plans for line in plan if index in line]
+    assert used, f'{index} not used by any query of {path}'
@@ -0,0 +1,93 @@
+# tests/test_rate_limits.py
+import pytest
+from app.services.rate_limiter import DEFAULT_POLICIES, SlidingWindowLog, TokenBucket, rate_limiter
+from config import rate_limit_backend
+
+POLICIES = {'auth.login': {'algorithm': 'sliding_window', 'limit': 1, 'period': 60, 'key': 'ip'}}
+
+def login(client, forwarded_for):
+    return client.post('/api/auth/login', json={'email': 'nobody@example.com', 'password': 'x'},
+                       headers={'X-Forwarded-For': forwarded_for})
+
+@pytest.mark.parametrize('backend', ['memory', 'database'])
+def test_clients_behind_a_proxy_are_limited_separately(make_app, backend):
+    app = make_app(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BACKEND=backend, RATE_LIMIT_POLICIES=POLICIES,
+                   TRUSTED_PROXY_HOPS=1)
+    client = app.test_client()
+    assert login(client, '203.0.113.1').status_code == 401
+    assert login(client, '203.0.113.1').status_code == 429
+    assert login(client, '203.0.113.2').status_code == 401
+    # Only the address the trusted proxy appended counts, not one the client made up
+    assert login(client, '198.51.100.7, 203.0.113.1').status_code == 429
+
+def test_forwarded_for_is_ignored_without_a_trusted_proxy(make_app):
+    app = make_app(RATE_LIMIT_ENABLED=True, RATE_LIMIT_POLICIES=POLICIES)
+    client = app.test_client()
+    assert login(client, '203.0.113.1').status_code == 401
+    assert login(client, '203.0.113.2').status_code == 429
+
+def test_token_bucket_allows_bursts_then_refills():
+    bucket = TokenBucket(2, 60)
+    state = bucket.new_state(0)
+    assert bucket.consume(state, 0) == 0
+    assert bucket.consume(state, 0) == 0
+    assert bucket.consume(state, 0) == pytest.approx(30)
+    assert bucket.consume(state, 15) == pytest.approx(15)
+    assert bucket.consume(state, 30) == 0
+
+def test_sliding_window_counts_requests_in_the_last_period():
+    window = SlidingWindowLog(2, 10)
+    state = window.new_state(0)
+    assert window.consume(state, 0) == 0
+    assert window.consume(state, 1) == 0
+    assert window.consume(state, 2) == pytest.approx(8)
+    assert window.consume(state, 10.5) == 0
+    assert window.consume(state, 10.6) == pytest.approx(0.4)
+
+@pytest.mark.parametrize('backend', ['memory', 'database'])
+@pytest.mark.parametrize('algorithm', ['token_bucket', 'sliding_window'])
+def test_requests_over_the_limit_get_429_with_retry_after(make_app, backend, algorithm):
+    app = make_app(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BACKEND=backend, RATE_LIMIT_POLICIES={
+        'auth.login': {'algorithm': algorithm, 'limit': 2, 'period': 60, 'key': 'ip'}
+    })
+    client = app.test_client()
+    assert login(client, '203.0.113.1').status_code == 401
+    assert login(client, '203.0.113.1').status_code == 401
+    
+    response = login(client, '203.0.113.1')
+    assert response.status_code == 429
+    assert response.get_json() == {'error': 'Too many requests'}
+    assert 1 <= int(response.headers['Retry-After']) <= 60
+    # Other endpoints have no policy here
+    assert client.post('/api/auth/register', json={}).status_code == 400
+
+def test_default_policies_apply_per_endpoint_then_per_blueprint(make_app):
+    app = make_app(RATE_LIMIT_ENABLED=True)
+    assert rate_limiter.policy_for('auth.login', 'auth').name == 'auth.login'
+    assert rate_limiter.policy_for('auth.logout', 'auth').name == 'auth'
+    assert rate_limiter.policy_for('search.search_listings', 'search') is None
+    
+    client = app.test_client()
+    for _ in range(5):
+        assert client.post('/api/auth/register', json={}).status_code == 400
+    assert client.post('/api/auth/register', json={}).status_code == 429
+
+def test_blueprint_policies_limit_writes_per_user(make_app, register):
+    app = make_app(RATE_LIMIT_ENABLED=True, RATE_LIMIT_POLICIES={
+        'reviews': dict(DEFAULT_POLICIES['reviews'], limit=3)
+    })
+    client = app.test_client()
+    _, tenant = register('tenant', verified=True, client=client)
+    _, other = register('other', verified=True, client=client)
+    
+    for _ in range(3):
+        assert client.post('/api/reviews/', json={}, headers=tenant).status_code == 400
+    assert client.post('/api/reviews/', json={}, headers=tenant).status_code == 429
+    assert client.post('/api/reviews/', json={}, headers=other).status_code == 400
+    # Reads are not throttled by the write policy
+    for _ in range(5):
+        assert client.get('/api/reviews/listing/missing', headers=tenant).status_code != 429
+
+def test_production_backend_defaults_to_memory_on_sqlite():
+    assert rate_limit_backend('sqlite:///app.db') == 'memory'
+    assert rate_limit_backend('postgresql://db.internal/apartments') == 'database'
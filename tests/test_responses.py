@@ -0,0 +1,103 @@
+# tests/test_responses.py
+import pytest
+from app.responses import COLUMNAR_MIMETYPE, wants_columnar
+
+COLUMNAR = {'Accept': COLUMNAR_MIMETYPE}
+
+def rows(columns):
+    """Transpose columnar field arrays back into one dict per item."""
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+@pytest.fixture
+def listings(register, create_listing, create_review, client):
+    _, landlord = register('landlord', role='landlord')
+    amenity_ids = [
+        client.post('/api/listings/amenities', json={'name': name}, headers=landlord).get_json()['amenity']['id']
+        for name in ('Balcony', 'Parking')
+    ]
+    created = [
+        create_listing(landlord, title='Loft', amenity_ids=amenity_ids,
+                       images=[{'url': 'https://example.com/loft.jpg'}]),
+        create_listing(landlord, title='Studio', amenity_ids=amenity_ids[:1]),
+        create_listing(landlord, title='Cabin')
+    ]
+    for number in range(3):
+        _, tenant = register(f'tenant{number}', verified=True)
+        create_review(tenant, created[0]['id'], rating=number + 2, content=f'Review {number}')
+    return created
+
+@pytest.mark.parametrize('accept, columnar', [
+    (None, False),
+    ('*/*', False),
+    ('application/json', False),
+    (COLUMNAR_MIMETYPE, True),
+    (f'application/json;q=0.5, {COLUMNAR_MIMETYPE}', True),
+    (f'application/json, {COLUMNAR_MIMETYPE};q=0.5', False)
+])
+def test_wants_columnar_follows_the_accept_header(app, accept, columnar):
+    with app.test_request_context(headers={'Accept': accept} if accept else {}):
+        assert wants_columnar() is columnar
+
+@pytest.mark.parametrize('url', ['/api/listings/', '/api/search/'])
+def test_listing_pages_in_columnar_form(client, listings, url):
+    plain = client.get(url)
+    assert plain.mimetype == 'application/json'
+    assert 'Accept' in plain.vary
+    
+    response = client.get(url, headers=COLUMNAR)
+    assert response.status_code == 200
+    assert response.mimetype == COLUMNAR_MIMETYPE
+    assert 'Accept' in response.vary
+    body = response.get_json()
+    assert set(body) == {'columns', 'amenities', 'total', 'pages', 'page', 'per_page'}
+    assert {key: body[key] for key in ('total', 'pages', 'page', 'per_page')} == {
+        key: plain.get_json()[key] for key in ('total', 'pages', 'page', 'per_page')
+    }
+    
+    # Every column has one value per listing, and amenity ids resolve to the shared objects
+    columns = body['columns']
+    assert {len(values) for values in columns.values()} == {3}
+    items = rows(columns)
+    for item in items:
+        item['amenities'] = [body['amenities'][str(amenity_id)] for amenity_id in item.pop('amenity_ids')]
+    assert items == plain.get_json()['items']
+    assert [item['title'] for item in items] == ['Cabin', 'Studio', 'Loft']
+    assert len(body['amenities']) == 2
+
+def test_empty_columnar_page_keeps_its_columns(client, listings):
+    body = client.get('/api/search/', query_string={'q': 'Castle'}, headers=COLUMNAR).get_json()
+    assert body['total'] == 0 and body['amenities'] == {}
+    assert body['columns']['id'] == body['columns']['amenity_ids'] == []
+
+def test_large_columnar_pages_are_not_streamed(make_app, register, create_listing):
+    app = make_app(STREAM_JSON_MIN_PER_PAGE=2)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    for title in ('Loft', 'Studio'):
+        create_listing(landlord, client=client, title=title)
+    
+    # Streamed bodies go out without a Content-Length
+    assert 'Content-Length' not in client.get('/api/listings/?per_page=2').headers
+    response = client.get('/api/listings/?per_page=2', headers=COLUMNAR)
+    assert int(response.headers['Content-Length']) == len(response.data)
+    assert response.mimetype == COLUMNAR_MIMETYPE
+    assert response.get_json()['columns']['title'] == ['Studio', 'Loft']
+
+def test_reviews_in_columnar_form(client, listings):
+    url = f'/api/reviews/listing/{listings[0]["id"]}'
+    plain = client.get(url, query_string={'per_page': 2})
+    response = client.get(url, query_string={'per_page': 2}, headers=COLUMNAR)
+    assert response.mimetype == COLUMNAR_MIMETYPE
+    assert 'Accept' in response.vary
+    body = response.get_json()
+    assert set(body) == {'columns', 'users', 'total', 'next_cursor', 'per_page'}
+    assert (body['total'], body['next_cursor'], body['per_page']) == (3, plain.get_json()['next_cursor'], 2)
+    
+    # Authors are sent once, keyed by the ids in the user_id column
+    items = rows(body['columns'])
+    for item in items:
+        item['user'] = body['users'][item['user_id']]
+    assert [item['content'] for item in items] == ['Review 2', 'Review 1']
+    assert set(body['users']) == set(body['columns']['user_id'])
+    expected = plain.get_json()['items']
+    assert [{key: item[key] for key in expected[0]} for item in items] == expected
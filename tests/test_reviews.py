@@ -0,0 +1,138 @@
+# tests/test_reviews.py
+from datetime import datetime
+import pytest
+from app import db
+from app.models.listing import LandlordRollup, ListingRating
+from app.models.review import Review
+
+def test_review_of_deleted_listing_cannot_be_changed(app, client, register, create_listing, create_review):
+    landlord_id, landlord = register('landlord', role='landlord')
+    _, tenant = register('tenant', verified=True)
+    kept = create_listing(landlord, title='Kept')
+    deleted = create_listing(landlord, title='Deleted')
+    create_review(tenant, kept['id'], rating=5)
+    review = create_review(tenant, deleted['id'], rating=3)
+    
+    assert client.delete(f"/api/listings/{deleted['id']}", headers=landlord).status_code == 200
+    assert client.put(f"/api/reviews/{review['id']}", json={'rating': 1}, headers=tenant).status_code == 404
+    assert client.delete(f"/api/reviews/{review['id']}", headers=tenant).status_code == 404
+    
+    with app.app_context():
+        rollup = db.session.get(LandlordRollup, landlord_id)
+        assert (rollup.review_count, rollup.rating_sum) == (1, 5)
+        # The deleted listing's own aggregates are left for the purge
+        rating = db.session.get(ListingRating, deleted['id'])
+        assert (rating.review_count, rating.rating_sum) == (1, 3)
+
+def test_review_updates_adjust_rollups(app, client, register, create_listing, create_review):
+    landlord_id, landlord = register('landlord', role='landlord')
+    _, tenant = register('tenant', verified=True)
+    listing = create_listing(landlord)
+    review = create_review(tenant, listing['id'], rating=2)
+    
+    assert client.put(f"/api/reviews/{review['id']}", json={'rating': 4}, headers=tenant).status_code == 200
+    with app.app_context():
+        rollup = db.session.get(LandlordRollup, landlord_id)
+        assert (rollup.review_count, rollup.rating_sum) == (1, 4)
+    
+    assert client.delete(f"/api/reviews/{review['id']}", headers=tenant).status_code == 200
+    with app.app_context():
+        rollup = db.session.get(LandlordRollup, landlord_id)
+        assert (rollup.review_count, rollup.rating_sum) == (0, 0)
+
+def test_tenant_verified_after_login_can_review(client, register, create_listing):
+    _, landlord = register('landlord', role='landlord')
+    tenant_id, tenant = register('tenant')
+    listing = create_listing(landlord)
+    payload = {'listing_id': listing['id'], 'rating': 5, 'content': 'Great'}
+    
+    assert client.post('/api/reviews/', json=payload, headers=tenant).status_code == 403
+    client.get(f'/api/auth/verify/{tenant_id}')
+    assert client.post('/api/reviews/', json=payload, headers=tenant).status_code == 201
+
+def test_review_payloads_keep_author_and_total(client, register, create_listing, create_review):
+    _, landlord = register('landlord', role='landlord')
+    _, tenant = register('tenant', verified=True)
+    listing = create_listing(landlord)
+    review = create_review(tenant, listing['id'])
+    assert review['user'] == client.get('/api/users/me', headers=tenant).get_json()
+    
+    _, other = register('other', verified=True)
+    create_review(other, listing['id'])
+    page = client.get(f"/api/reviews/listing/{listing['id']}?per_page=1").get_json()
+    assert len(page['items']) == 1 and page['total'] == 2
+
+@pytest.mark.parametrize('per_page', [0, -5])
+def test_listing_reviews_page_size_is_at_least_one(client, register, create_listing, create_review, per_page):
+    _, landlord = register('landlord', role='landlord')
+    listing = create_listing(landlord)
+    for number in range(2):
+        _, tenant = register(f'tenant{number}', verified=True)
+        create_review(tenant, listing['id'])
+    
+    response = client.get(f"/api/reviews/listing/{listing['id']}?per_page={per_page}")
+    assert response.status_code == 200
+    page = response.get_json()
+    assert (len(page['items']), page['per_page'], page['total']) == (1, 1, 2)
+    assert page['next_cursor'] is not None
+
+def test_embedded_reviews_continue_into_reviews_next(make_app, register, create_listing, create_review):
+    app = make_app(LISTING_REVIEWS_PREVIEW=2)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    listing = create_listing(landlord, client=client)
+    review_ids = set()
+    for number in range(5):
+        _, tenant = register(f'tenant{number}', verified=True, client=client)
+        review_ids.add(create_review(tenant, listing['id'], client=client)['id'])
+    with app.app_context():
+        # Reviews written in the same instant are ordered by id
+        db.session.query(Review).update({Review.created_at: datetime(2024, 1, 1)})
+        db.session.commit()
+    
+    data = client.get(f"/api/listings/{listing['id']}").get_json()
+    seen = [review['id'] for review in data['reviews']]
+    next_url = data['reviews_next']
+    while next_url:
+        page = client.get(next_url).get_json()
+        seen += [review['id'] for review in page['items']]
+        next_url = page['next_cursor'] and url_with_cursor(next_url, page['next_cursor'])
+    assert len(seen) == 5 and set(seen) == review_ids
+
+def url_with_cursor(url, cursor):
+    path, _, query = url.partition('?')
+    params = dict(param.split('=', 1) for param in query.split('&'))
+    params['cursor'] = cursor
+    return path + '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+
+def test_reviews_next_without_a_preview(make_app, register, create_listing, create_review):
+    app = make_app(LISTING_REVIEWS_PREVIEW=0)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    listing = create_listing(landlord, client=client)
+    assert client.get(f"/api/listings/{listing['id']}").get_json()['reviews_next'] is None
+    
+    _, tenant = register('tenant', verified=True, client=client)
+    review = create_review(tenant, listing['id'], client=client)
+    data = client.get(f"/api/listings/{listing['id']}").get_json()
+    assert data['reviews'] == []
+    assert data['reviews_next'] == f"/api/reviews/listing/{listing['id']}"
+    assert [item['id'] for item in client.get(data['reviews_next']).get_json()['items']] == [review['id']]
+
+def test_review_summary_reads_the_rollup(app, client, register, create_listing, create_review):
+    _, landlord = register('landlord', role='landlord')
+    listing = create_listing(landlord)
+    assert client.get(f"/api/listings/{listing['id']}").get_json()['review_summary'] == {
+        'count': 0, 'average_rating': None
+    }
+    for number, rating in enumerate((2, 3, 5)):
+        _, tenant = register(f'tenant{number}', verified=True)
+        create_review(tenant, listing['id'], rating=rating)
+    
+    with app.app_context():
+        # Not recounted from the reviews: the summary is whatever the rollup holds
+        db.session.get(ListingRating, listing['id']).rating_sum = 12
+        db.session.commit()
+    assert client.get(f"/api/listings/{listing['id']}").get_json()['review_summary'] == {
+        'count': 3, 'average_rating': 4.0
+    }
@@ -0,0 +1,88 @@
+# tests/test_routing.py
+import pytest
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models.listing import Listing
+from app.models.user import User
+from app.routing import replica_router
+
+@pytest.fixture
+def replica_app(make_app, tmp_path):
+    """An app with a ``replica_0`` bind on its own SQLite file, which nothing replicates to."""
+    def factory(**overrides):
+        app = make_app(SQLALCHEMY_BINDS={'replica_0': 'sqlite:///' + str(tmp_path / 'replica.db')}, **overrides)
+        with app.app_context():
+            db.metadata.create_all(db.engines['replica_0'])
+        return app
+    return factory
+
+def replicate(app, *models):
+    """Copy the primary's rows of ``models`` to the replica, as replication catching up would."""
+    with app.app_context():
+        with db.engines['replica_0'].begin() as connection:
+            for model in models:
+                rows = db.session.execute(db.select(model.__table__)).mappings().all()
+                connection.execute(model.__table__.delete())
+                connection.execute(model.__table__.insert(), [dict(row) for row in rows])
+
+def drop_on_replica(app, model):
+    with app.app_context():
+        model.__table__.drop(db.engines['replica_0'])
+
+def titles(client, per_page=10, **kwargs):
+    response = client.get(f'/api/listings/?per_page={per_page}', **kwargs)
+    return [item['title'] for item in response.get_json()['items']]
+
+def test_reads_are_served_from_the_replica(replica_app, register, create_listing):
+    app = replica_app(READ_YOUR_WRITES_WINDOW=0)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    listing = create_listing(landlord, client=client)
+    
+    # The replica has not caught up yet, streamed pages included
+    assert titles(client) == []
+    assert titles(client, per_page=50) == []
+    assert client.get(f"/api/reviews/listing/{listing['id']}").status_code == 404
+    
+    replicate(app, User, Listing)
+    assert titles(client) == ['Sunny flat']
+    assert titles(client, per_page=50) == ['Sunny flat']
+
+def test_writers_read_from_the_primary_after_a_write(replica_app, register, create_listing):
+    app = replica_app(READ_YOUR_WRITES_WINDOW=60)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    create_listing(landlord, client=client)
+    
+    # Pinned by the cookie, and by the token for clients that drop cookies
+    assert titles(client) == ['Sunny flat']
+    assert titles(app.test_client(), headers=landlord) == ['Sunny flat']
+    assert titles(app.test_client()) == []
+
+def test_failing_replica_falls_back_to_the_primary(replica_app, register, create_listing):
+    app = replica_app(READ_YOUR_WRITES_WINDOW=0, REPLICA_CHECK_INTERVAL=0)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    create_listing(landlord, client=client)
+    drop_on_replica(app, Listing)
+    
+    # The health probe still passes, so each read hits the replica, fails and is re-run on the primary
+    assert titles(client) == ['Sunny flat']
+    assert replica_router.status()['replica_0']['healthy'] is False
+    assert titles(client, per_page=50) == ['Sunny flat']
+    assert replica_router.status()['replica_0']['healthy'] is False
+
+def test_replica_failing_mid_stream_is_marked_down(replica_app, register, create_listing):
+    app = replica_app(READ_YOUR_WRITES_WINDOW=0)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    create_listing(landlord, client=client)
+    replicate(app, User, Listing)
+    # Images are loaded per batch, after the envelope has been sent
+    drop_on_replica(app, Listing.images.property.mapper.class_)
+    
+    response = client.get('/api/listings/?per_page=50')
+    with pytest.raises(OperationalError):
+        response.get_data()
+    assert replica_router.status()['replica_0']['healthy'] is False
+    assert titles(client, per_page=50) == ['Sunny flat']
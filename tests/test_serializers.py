@@ -0,0 +1,110 @@
+# tests/test_serializers.py
+import uuid
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from app import db
+from app.models.listing import Listing, ListingImage, Amenity, listing_serializer
+from app.models.review import Review, review_serializer, review_with_author_serializer
+from app.models.user import User, user_serializer
+
+def iso(value):
+    return value.isoformat() + 'Z' if value is not None else None
+
+# The hand-written to_dict bodies the generated encoders replaced
+def expected_user(user):
+    return {
+        'id': user.id, 'username': user.username, 'email': user.email, 'role': user.role,
+        'is_verified': user.is_verified, 'created_at': iso(user.created_at), 'updated_at': iso(user.updated_at)
+    }
+
+def expected_review(review):
+    return {
+        'id': review.id, 'content': review.content, 'rating': review.rating, 'created_at': iso(review.created_at),
+        'updated_at': iso(review.updated_at), 'user_id': review.user_id, 'listing_id': review.listing_id
+    }
+
+def expected_listing(listing):
+    return {
+        'id': listing.id, 'title': listing.title, 'description': listing.description, 'price': listing.price,
+        'bedrooms': listing.bedrooms, 'bathrooms': listing.bathrooms, 'square_feet': listing.square_feet,
+        'address': listing.address, 'city': listing.city, 'state': listing.state, 'zip_code': listing.zip_code,
+        'latitude': listing.latitude, 'longitude': listing.longitude, 'is_published': listing.is_published,
+        'created_at': iso(listing.created_at), 'updated_at': iso(listing.updated_at), 'user_id': listing.user_id
+    }
+
+def as_row(serializer, obj):
+    return tuple(getattr(obj, column.key) for column in serializer.columns)
+
+@pytest.fixture
+def seeded(app):
+    """A landlord with two listings (one with every optional field empty), a tenant and a review.
+    
+    Tests using it run inside the app context it was seeded in.
+    """
+    with app.app_context():
+        landlord = User(id=str(uuid.uuid4()), username='landlord', email='landlord@example.com', password_hash='x',
+                        role='landlord', is_verified=True, created_at=datetime(2024, 1, 2, 3, 4, 5, 678901))
+        tenant = User(id=str(uuid.uuid4()), username='tenant', email='tenant@example.com', password_hash='x')
+        full = Listing(id=str(uuid.uuid4()), title='Full', description='d', price=1250.5, bedrooms=2, bathrooms=1.5,
+                       square_feet=800, address='a', city='c', state='s', zip_code='z', latitude=30.27,
+                       longitude=-97.74, user_id=landlord.id, created_at=datetime(2024, 5, 6))
+        bare = Listing(id=str(uuid.uuid4()), title='Bare', description='d', price=900, bedrooms=1, bathrooms=1,
+                       address='a', city='c', state='s', zip_code='z', is_published=False, user_id=landlord.id)
+        full.amenities = [Amenity(name='Gym', icon='dumbbell'), Amenity(name='Pool')]
+        db.session.add_all([landlord, tenant, full, bare])
+        db.session.add_all([
+            ListingImage(url='https://example.com/1.jpg', is_primary=True, listing=full),
+            ListingImage(url='https://example.com/2.jpg', caption='Kitchen', listing=full),
+            Review(id=str(uuid.uuid4()), content='ok', rating=4, user_id=tenant.id, listing_id=full.id,
+                   landlord_id=landlord.id)
+        ])
+        db.session.commit()
+        yield
+
+def test_users_encode_like_to_dict(seeded):
+    for user in User.query.all():
+        row = db.session.query(*user_serializer.columns).filter(User.id == user.id).one()
+        assert user_serializer.from_row(row) == user.to_dict() == expected_user(user)
+
+def test_reviews_encode_like_to_dict(seeded):
+    review = Review.query.one()
+    row = db.session.query(*review_serializer.columns).filter(Review.id == review.id).one()
+    assert review_serializer.from_row(row) == review.to_dict() == expected_review(review)
+    
+    author = {key: value for key, value in expected_user(review.author).items()
+              if key in ('id', 'username', 'is_verified')}
+    row = db.session.query(*review_with_author_serializer.columns).join(User, User.id == Review.user_id).one()
+    assert review_with_author_serializer.from_row(row) == dict(expected_review(review), user=author)
+    assert review.to_dict(include_user=True) == dict(expected_review(review), user=expected_user(review.author))
+
+def test_listing_pages_encode_like_to_dict(seeded):
+    query = db.session.query(*listing_serializer.columns).order_by(Listing.title)
+    listings = Listing.query.order_by(Listing.title).all()
+    assert [listing.square_feet for listing in listings] == [None, 800]
+    
+    assert Listing.page_dicts(query.all()) == [listing.to_dict() for listing in listings]
+    for listing in listings:
+        expected = dict(
+            expected_listing(listing),
+            amenities=[amenity.to_dict() for amenity in listing.amenities],
+            images=[{
+                'id': image.id, 'url': image.url, 'caption': image.caption, 'is_primary': image.is_primary,
+                'created_at': iso(image.created_at), 'listing_id': image.listing_id
+            } for image in listing.images]
+        )
+        assert listing.to_dict() == expected
+    
+    columns = listing_serializer.columnar(query.all())
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == listing_serializer.many(query.all())
+
+def test_unsaved_values_pass_through_unchanged():
+    # Numeric columns come back as Decimal on some drivers; timestamps may still be unset
+    listing = Listing(id=str(uuid.uuid4()), title='t', description='d', price=Decimal('1250.50'), bedrooms=2,
+                      bathrooms=Decimal('1.5'), latitude=Decimal('30.2672'), address='a', city='c', state='s',
+                      zip_code='z', user_id=str(uuid.uuid4()), created_at=datetime(2024, 2, 29, 23, 59, 59, 1))
+    encoded = listing_serializer.from_object(listing)
+    assert encoded == listing_serializer.from_row(as_row(listing_serializer, listing)) == expected_listing(listing)
+    assert encoded['price'] == Decimal('1250.50') and isinstance(encoded['price'], Decimal)
+    assert encoded['created_at'] == '2024-02-29T23:59:59.000001Z'
+    assert encoded['updated_at'] is None and encoded['longitude'] is None
@@ -0,0 +1,43 @@
+# tests/test_sqlite_writer.py
+import pytest
+from app import db
+from app.models.listing import Amenity
+from app.services.sqlite_writer import sqlite_writer
+
+def test_run_rejects_uncommitted_changes(app):
+    with app.app_context():
+        db.session.add(Amenity(name='Gym'))
+        with pytest.raises(RuntimeError):
+            sqlite_writer.run(lambda: None)
+        
+        # Flushed but not committed is still the caller's to commit
+        db.session.flush()
+        with pytest.raises(RuntimeError):
+            sqlite_writer.run(lambda: None)
+        db.session.rollback()
+        
+        assert sqlite_writer.run(lambda: 'ok') == 'ok'
+        assert Amenity.query.count() == 0
+
+def test_content_writes_go_through_the_writer(make_app, register, create_listing, create_review, monkeypatch):
+    app = make_app(migrate=True)
+    assert sqlite_writer._enabled
+    client = app.test_client()
+    batches = []
+    commit_batch = sqlite_writer._commit_batch
+    monkeypatch.setattr(sqlite_writer, '_commit_batch', lambda batch: batches.append(len(batch)) or commit_batch(batch))
+    
+    _, landlord = register('landlord', role='landlord', client=client)
+    _, tenant = register('tenant', verified=True, client=client)
+    listing = create_listing(landlord, client=client)
+    review = create_review(tenant, listing['id'], client=client)
+    assert client.put(f"/api/reviews/{review['id']}", json={'rating': 5}, headers=tenant).status_code == 200
+    assert client.delete(f"/api/reviews/{review['id']}", headers=tenant).status_code == 200
+    response = client.put(f"/api/listings/{listing['id']}", json={'title': 'Renamed'}, headers=landlord)
+    assert response.get_json()['listing']['title'] == 'Renamed'
+    assert client.delete(f"/api/listings/{listing['id']}", headers=landlord).status_code == 200
+    assert client.post('/api/auth/logout', headers=tenant).status_code == 200
+    assert len(batches) == 7
+    
+    assert client.get(f"/api/listings/{listing['id']}").status_code == 404
+    assert client.get('/api/users/me', headers=tenant).status_code == 401
@@ -0,0 +1,69 @@
+# tests/test_streaming.py
+import json
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.models.listing import Listing
+
+@pytest.fixture
+def stream_app(make_app):
+    # Every page is streamed, two listings per batch
+    return make_app(STREAM_JSON_MIN_PER_PAGE=1, STREAM_JSON_BATCH_SIZE=2)
+
+def chunks(client, path):
+    response = client.get(path, buffered=False)
+    assert response.status_code == 200
+    return [chunk.decode() for chunk in response.response]
+
+@pytest.mark.parametrize('count', [4, 5])
+def test_items_are_sent_one_batch_per_chunk(stream_app, register, create_listing, count):
+    client = stream_app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    for number in range(count):
+        create_listing(landlord, client=client, title=f'Flat {number}')
+    
+    body = chunks(client, '/api/listings/?per_page=10')
+    assert body[0] == '{"page":1,"pages":1,"per_page":10,"total":%d,"items":[' % count
+    assert body[-1] == ']}'
+    # One chunk per batch, each joined to the previous one by a leading comma
+    batches = body[1:-1]
+    assert len(batches) == (count + 1) // 2
+    assert all(batch.startswith(',') for batch in batches[1:])
+    
+    streamed = json.loads(''.join(body))
+    stream_app.config['STREAM_JSON_MIN_PER_PAGE'] = 1000
+    assert streamed == client.get('/api/listings/?per_page=10').get_json()
+    assert [item['title'] for item in streamed['items']] == [f'Flat {number}' for number in reversed(range(count))]
+
+def test_empty_results_stream_an_empty_page(stream_app):
+    client = stream_app.test_client()
+    assert json.loads(''.join(chunks(client, '/api/listings/?per_page=10'))) == {
+        'total': 0, 'pages': 0, 'page': 1, 'per_page': 10, 'items': []
+    }
+    assert client.get('/api/listings/?per_page=10&page=2').status_code == 404
+
+def test_errors_mid_stream_end_the_body(stream_app, register, create_listing, monkeypatch):
+    client = stream_app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    for number in range(3):
+        create_listing(landlord, client=client)
+    
+    page_dicts = Listing.page_dicts
+    batches = []
+    
+    def failing(rows):
+        batches.append(len(rows))
+        if len(batches) == 2:
+            raise OperationalError('SELECT', {}, Exception('connection lost'))
+        return page_dicts(rows)
+    monkeypatch.setattr(Listing, 'page_dicts', failing)
+    
+    response = client.get('/api/listings/?per_page=10', buffered=False)
+    # The status and envelope went out before the first row was read
+    assert response.status_code == 200
+    body = iter(response.response)
+    assert next(body) == b'{"page":1,"pages":1,"per_page":10,"total":3,"items":['
+    assert next(body).count(b'"title"') == 2
+    with pytest.raises(OperationalError):
+        next(body)
+    response.close()
+    assert batches == [2, 1]
@@ -0,0 +1,116 @@
+# tests/test_token_revocations.py
+import threading
+import time
+from datetime import datetime, timedelta
+from flask_jwt_extended import decode_token
+from app import db
+from app.models.user import TokenRevocation, User
+from app.services.token_revocations import BloomFilter, token_revocations
+
+def login(client, username):
+    response = client.post('/api/auth/login', json={'email': f'{username}@example.com', 'password': 'secret'})
+    return {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+
+def status(client, headers):
+    return client.get('/api/users/me', headers=headers).status_code
+
+def test_logout_revokes_only_the_presented_token(client, register):
+    _, first = register('tenant')
+    second = login(client, 'tenant')
+    
+    assert client.post('/api/auth/logout', headers=first).status_code == 200
+    assert status(client, first) == 401
+    assert client.get('/api/users/me', headers=first).get_json() == {'error': 'Token has been revoked'}
+    assert status(client, second) == 200
+
+def test_logout_all_revokes_every_earlier_token(client, register):
+    _, first = register('tenant')
+    second = login(client, 'tenant')
+    
+    assert client.post('/api/auth/logout-all', headers=second).status_code == 200
+    assert status(client, first) == 401
+    assert status(client, second) == 401
+    assert status(client, login(client, 'tenant')) == 200
+
+def test_token_version_bumps_revoke_tokens(client, register):
+    _, headers = register('tenant')
+    assert client.put('/api/users/me', json={'password': 'changed'}, headers=headers).status_code == 200
+    assert status(client, headers) == 401
+    
+    response = client.post('/api/auth/login', json={'email': 'tenant@example.com', 'password': 'changed'})
+    assert status(client, {'Authorization': 'Bearer ' + response.get_json()['access_token']}) == 200
+
+def test_admin_role_change_revokes_tokens(app, client, register):
+    user_id, headers = register('tenant')
+    admin_id, _ = register('admin')
+    with app.app_context():
+        db.session.get(User, admin_id).role = 'admin'
+        db.session.commit()
+    admin = login(client, 'admin')
+    
+    response = client.post('/api/users/batch', json={
+        'action': 'set_role', 'role': 'landlord', 'user_ids': [user_id]
+    }, headers=admin)
+    assert response.get_json()['updated'] == 1
+    assert status(client, headers) == 401
+    assert status(client, admin) == 200
+
+def test_bloom_false_positives_are_confirmed_against_the_table(client, register, monkeypatch):
+    _, kept = register('tenant')
+    revoked = login(client, 'tenant')
+    client.post('/api/auth/logout', headers=revoked)
+    
+    # Every jti now looks revoked to the filter; only the table can tell them apart
+    monkeypatch.setattr(BloomFilter, '__contains__', lambda self, value: True)
+    assert status(client, kept) == 200
+    assert status(client, revoked) == 401
+    assert token_revocations._checked and False in token_revocations._checked.values()
+
+def test_revocations_from_another_worker_are_synced(make_app, register):
+    app = make_app(REVOCATION_SYNC_INTERVAL=0)
+    client = app.test_client()
+    _, headers = register('tenant', client=client)
+    assert status(client, headers) == 200
+    
+    with app.app_context():
+        token = decode_token(headers['Authorization'].split()[1])
+        # What another worker's logout does, committed a moment after its timestamp
+        db.session.execute(db.insert(TokenRevocation).values(
+            jti=token['jti'], revoked_at=datetime.utcnow() - timedelta(seconds=1),
+            expires_at=datetime.utcfromtimestamp(token['exp'])
+        ))
+        db.session.commit()
+    
+    assert status(client, headers) == 401
+
+def test_filter_is_rebuilt_in_the_background(make_app, register, monkeypatch):
+    app = make_app(migrate=True)
+    client = app.test_client()
+    rebuild = token_revocations.rebuild
+    gate = threading.Event()
+    threads = []
+    
+    def gated_rebuild():
+        threads.append(threading.current_thread().name)
+        gate.wait(10)
+        rebuild()
+    monkeypatch.setattr(token_revocations, 'rebuild', gated_rebuild)
+    
+    _, revoked = register('tenant', client=client)
+    kept = login(client, 'tenant')
+    assert client.post('/api/auth/logout', headers=revoked).status_code == 200
+    
+    # No filter in this worker yet: every token is checked against the table
+    assert not token_revocations._loaded
+    assert status(client, revoked) == 401
+    assert status(client, kept) == 200
+    
+    gate.set()
+    for _ in range(100):
+        if token_revocations._loaded:
+            break
+        time.sleep(0.05)
+    assert token_revocations._loaded
+    assert threads == ['revocation-rebuild']
+    assert status(client, revoked) == 401
+    assert status(client, kept) == 200
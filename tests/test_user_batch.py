@@ -0,0 +1,41 @@
+# tests/test_user_batch.py
+from datetime import datetime
+import pytest
+from app import db
+from app.models.user import User
+
+@pytest.fixture
+def admin(app, client, register):
+    admin_id, _ = register('admin')
+    with app.app_context():
+        db.session.get(User, admin_id).role = 'admin'
+        db.session.commit()
+    # Log in again for a token carrying the new role
+    response = client.post('/api/auth/login', json={'email': 'admin@example.com', 'password': 'secret'})
+    return {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+
+def test_ids_are_matched_in_any_spelling(client, register, admin):
+    first_id, _ = register('first')
+    second_id, _ = register('second', verified=True)
+    user_ids = [first_id.upper(), second_id.replace('-', ''), first_id]
+    
+    response = client.post('/api/users/batch', json={'action': 'verify', 'user_ids': user_ids}, headers=admin)
+    assert response.get_json()['results'] == {
+        first_id.upper(): 'updated', second_id.replace('-', ''): 'unchanged', first_id: 'updated'
+    }
+    assert response.get_json()['updated'] == 2
+
+def test_users_changed_by_another_worker_leave_the_cache(make_app, register):
+    app = make_app(USER_CACHE_SYNC_INTERVAL=0)
+    client = app.test_client()
+    user_id, headers = register('tenant', client=client)
+    assert client.get('/api/users/me', headers=headers).get_json()['is_verified'] is False
+    
+    with app.app_context():
+        # What another worker's batch does: a bulk UPDATE this worker's session never sees
+        db.session.execute(
+            db.update(User).where(User.id == user_id).values(is_verified=True, updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+    
+    assert client.get('/api/users/me', headers=headers).get_json()['is_verified'] is True
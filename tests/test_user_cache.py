@@ -0,0 +1,86 @@
+# tests/test_user_cache.py
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User
+from app.services.user_cache import user_cache
+
+# No polling unless a test asks for it, so only the behaviour under test drops entries
+QUIET = {'USER_CACHE_SYNC_INTERVAL': 3600}
+
+def me(client, headers):
+    return client.get('/api/users/me', headers=headers).get_json()
+
+def test_entries_expire_after_the_ttl(make_app, register):
+    app = make_app(USER_CACHE_TTL=3600, **QUIET)
+    user_id, _ = register('tenant', client=app.test_client())
+    with app.app_context():
+        assert user_cache.get(user_id) is user_cache.get(user_id)
+    
+    app = make_app(USER_CACHE_TTL=0, **QUIET)
+    user_id, _ = register('tenant', client=app.test_client())
+    with app.app_context():
+        assert user_cache.get(user_id) is not user_cache.get(user_id)
+
+def test_least_recently_used_entries_are_evicted(make_app, register):
+    app = make_app(USER_CACHE_SIZE=2, **QUIET)
+    client = app.test_client()
+    first, second, third = (register(name, client=client)[0] for name in ('first', 'second', 'third'))
+    with app.app_context():
+        user_cache.clear()
+        cached = user_cache.get(first)
+        user_cache.get(second)
+        assert user_cache.get(first) is cached
+        user_cache.get(third)
+        
+        assert list(user_cache._entries) == [first, third]
+        assert user_cache.get(first) is cached
+        # Unknown ids aren't cached
+        assert user_cache.get('0' * 32) is None
+        assert list(user_cache._entries) == [third, first]
+
+def test_committed_changes_invalidate_the_entry(make_app, register):
+    app = make_app(**QUIET)
+    user_id, _ = register('tenant', client=app.test_client())
+    with app.app_context():
+        cached = user_cache.get(user_id)
+        
+        # Flushed but rolled back: the entry is still accurate
+        db.session.get(User, user_id).role = 'landlord'
+        db.session.flush()
+        db.session.rollback()
+        assert user_cache.get(user_id) is cached
+        
+        db.session.get(User, user_id).role = 'landlord'
+        db.session.commit()
+        assert user_cache.get(user_id).role == 'landlord'
+        
+        # Bulk UPDATEs skip the mapper events and are invalidated explicitly
+        db.session.execute(db.update(User).where(User.id == user_id).values(is_verified=True))
+        user_cache.invalidate_after_commit([user_id])
+        db.session.commit()
+        assert user_cache.get(user_id).is_verified is True
+
+def test_role_change_is_visible_on_the_next_request(make_app, register):
+    app = make_app(**QUIET)
+    client = app.test_client()
+    user_id, headers = register('tenant', client=client)
+    assert me(client, headers)['role'] == 'tenant'
+    
+    with app.app_context():
+        db.session.get(User, user_id).role = 'landlord'
+        db.session.commit()
+    assert me(client, headers)['role'] == 'landlord'
+
+def test_changes_committed_after_their_timestamp_are_polled(make_app, register):
+    app = make_app(USER_CACHE_SYNC_INTERVAL=0, USER_CACHE_SYNC_OVERLAP=5)
+    client = app.test_client()
+    user_id, headers = register('tenant', client=client)
+    assert me(client, headers)['is_verified'] is False
+    
+    with app.app_context():
+        # Another worker's transaction, stamped a moment before it committed
+        db.session.execute(db.update(User).where(User.id == user_id).values(
+            is_verified=True, updated_at=datetime.utcnow() - timedelta(seconds=2)
+        ))
+        db.session.commit()
+    assert me(client, headers)['is_verified'] is True
@@ -0,0 +1,134 @@
+# tests/test_view_counter.py
+import threading
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models.listing import Listing, ListingImage, ListingStat
+from app.services.sqlite_writer import sqlite_writer
+from app.services.view_counter import ViewCounter, hour_bucket, view_counter
+
+@pytest.fixture
+def flush(monkeypatch):
+    """Flush the view counter; the background flusher is paused so only the test flushes."""
+    monkeypatch.setattr(view_counter, 'flush', lambda direct=False: 0)
+    view_counter._drain()
+    yield lambda direct=False: ViewCounter.flush(view_counter, direct)
+    view_counter._drain()
+
+def stored_views(app, listing_id):
+    with app.app_context():
+        return ListingStat.view_totals(listing_id, datetime.min)[0]
+
+def test_views_are_buffered_until_flushed(app, client, register, create_listing, flush):
+    _, landlord = register('landlord', role='landlord')
+    listing = create_listing(landlord)
+    
+    for number in range(1, 4):
+        assert client.get(f'/api/listings/{listing["id"]}').get_json()['views'] == {'total': number, 'last_24h': number}
+    assert view_counter.pending(listing['id']) == 3
+    assert stored_views(app, listing['id']) == 0
+    
+    assert flush() == 1
+    assert view_counter.pending(listing['id']) == 0
+    assert stored_views(app, listing['id']) == 3
+    # Flushed and pending views add up
+    assert client.get(f'/api/listings/{listing["id"]}').get_json()['views'] == {'total': 4, 'last_24h': 4}
+
+def test_flushes_go_through_the_sqlite_writer(make_app, register, create_listing, flush, monkeypatch):
+    app = make_app(migrate=True)
+    client = app.test_client()
+    _, landlord = register('landlord', role='landlord', client=client)
+    listing = create_listing(landlord, client=client)
+    
+    add_views = ListingStat.add_views
+    threads = []
+    
+    def recording(counts):
+        threads.append(threading.current_thread())
+        return add_views(counts)
+    monkeypatch.setattr(ListingStat, 'add_views', recording)
+    
+    view_counter.increment(listing['id'], 5)
+    assert flush() == 1
+    view_counter.increment(listing['id'], 2)
+    # At exit the writer may be gone, so those flushes commit directly
+    assert flush(direct=True) == 1
+    
+    assert threads == [sqlite_writer._thread, threading.current_thread()]
+    assert stored_views(app, listing['id']) == 7
+
+def test_failed_flushes_keep_views_up_to_the_cap(make_app, flush, monkeypatch):
+    make_app(LISTING_VIEWS_MAX_PENDING=32)
+    
+    def failing(counts):
+        raise OperationalError('INSERT', {}, Exception('database is locked'))
+    monkeypatch.setattr(ListingStat, 'add_views', failing)
+    
+    kept = str(uuid.uuid4())
+    view_counter.increment(kept, 3)
+    assert flush() == 0
+    assert view_counter.pending(kept) == 3
+    
+    for _ in range(100):
+        view_counter.increment(str(uuid.uuid4()))
+    assert flush() == 0
+    assert sum(len(shard.counts) for shard in view_counter._shards) <= 32
+    # Counters already buffered keep counting
+    assert view_counter.pending(kept) == 3
+
+def test_trending_orders_by_recent_views(app, client, register, create_listing, flush):
+    _, landlord = register('landlord', role='landlord')
+    quiet, busy, busiest, stale, hidden = (
+        create_listing(landlord, title=title)['id'] for title in ('Quiet', 'Busy', 'Busiest', 'Stale', 'Hidden')
+    )
+    client.put(f'/api/listings/{hidden}', json={'is_published': False}, headers=landlord)
+    now = hour_bucket(datetime.utcnow())
+    with app.app_context():
+        db.session.add_all([ListingImage(url=f'https://example.com/{listing_id}.jpg', listing_id=listing_id)
+                            for listing_id in (quiet, busy, busiest)])
+        ListingStat.add_views({
+            (quiet, now): 1, (busy, now): 5, (busy, now - timedelta(hours=2)): 2, (busiest, now): 9,
+            (stale, now - timedelta(hours=30)): 50, (hidden, now): 100
+        })
+        db.session.commit()
+    
+    def trending(**params):
+        return client.get('/api/listings/trending', query_string=params).get_json()['items']
+    items = trending()
+    assert [(item['title'], item['recent_views']) for item in items] == [('Busiest', 9), ('Busy', 7), ('Quiet', 1)]
+    assert items[0]['images'][0]['url'] == f'https://example.com/{busiest}.jpg'
+    assert [item['title'] for item in trending(hours=48)] == ['Stale', 'Busiest', 'Busy', 'Quiet']
+    assert [item['title'] for item in trending(hours=1, limit=2)] == ['Busiest', 'Busy']
+    
+    with app.app_context():
+        listing = db.session.get(Listing, busiest)
+        assert {key: value for key, value in items[0].items() if key != 'recent_views'} == listing.to_dict()
+
+def test_trending_query_count_does_not_grow_with_the_list(app, client, register, create_listing, flush):
+    _, landlord = register('landlord', role='landlord')
+    now = hour_bucket(datetime.utcnow())
+    
+    def statements(listings):
+        listing_ids = [create_listing(landlord, title=f'Flat {number}')['id'] for number in range(listings)]
+        with app.app_context():
+            db.session.add_all([ListingImage(url=f'https://example.com/{listing_id}.jpg', listing_id=listing_id)
+                                for listing_id in listing_ids])
+            ListingStat.add_views({(listing_id, now): 1 for listing_id in listing_ids})
+            db.session.commit()
+            engine = db.engine
+        
+        executed = []
+        
+        def count(connection, cursor, statement, *args):
+            executed.append(statement)
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            assert len(client.get('/api/listings/trending?limit=50').get_json()['items']) >= listings
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        return len(executed)
+    
+    assert statements(2) == statements(10)